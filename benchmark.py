@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+THW Toolbox Plugin - Benchmark
+==============================
+
+Misst die Marker-Layer-Operationen des Plugins gegen eine QgsApplication
+ohne Oberfläche mit synthetischen GeoPackages (Standard: 100, 1.000,
+10.000 und 50.000 Marker). Die Ergebnisse werden als JSON geschrieben und
+mit einer gespeicherten Baseline verglichen.
+
+Muss mit dem Python-Interpreter von QGIS ausgeführt werden.
+
+Verwendung:
+    python benchmark.py [--sizes 100 1000 ...] [--output Datei] [--baseline Datei]
+
+Beispiele:
+    python benchmark.py
+    python benchmark.py --sizes 100 1000 --repeat 3
+    python benchmark.py --save-baseline
+    python benchmark.py --baseline benchmark_baseline.json --threshold 0.25
+"""
+
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+
+# Ohne Bildschirm lauffähig (z.B. auf Build-Rechnern)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+PLUGIN_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SIZES = [100, 1000, 10000, 50000]
+DEFAULT_OUTPUT = os.path.join(PLUGIN_DIR, "benchmark_results.json")
+DEFAULT_BASELINE = os.path.join(PLUGIN_DIR, "benchmark_baseline.json")
+LAYER_NAME = "taktische_zeichen"
+CRS = "EPSG:25832"
+# Synthetische Marker liegen in einem 20 x 20 km großen Gebiet
+ORIGIN_X, ORIGIN_Y, EXTENT = 480000.0, 5780000.0, 20000.0
+
+
+def load_plugin_module():
+    """Importiert das Plugin als Paket (die Module nutzen relative Imports)."""
+    sys.path.insert(0, os.path.dirname(PLUGIN_DIR))
+    package = os.path.basename(PLUGIN_DIR)
+    return (
+        importlib.import_module(f"{package}.thwtoolboxplugin"),
+        importlib.import_module(f"{package}.instrumentation"),
+    )
+
+
+class MarkerBenchmark:
+    """Führt die Messungen für eine Layer-Größe nach der anderen aus."""
+
+    def __init__(self, repeat=5, heavy_repeat=3, queries=500, verbose=False, seed=42):
+        from qgis.testing import start_app
+        from qgis.testing.mocked import get_iface
+
+        self.app = start_app()
+        self.repeat = repeat
+        self.heavy_repeat = heavy_repeat
+        self.queries = queries
+        self.verbose = verbose
+        self.random = random.Random(seed)
+
+        plugin_module, instrumentation_module = load_plugin_module()
+        self.Instrumentation = instrumentation_module.Instrumentation
+        self.plugin = plugin_module.THWToolboxPlugin(get_iface())
+        self.errors = []
+        # Fehlerdialoge würden ohne Oberfläche blockieren - nur mitschreiben
+        self.plugin._show_error_alert = self._record_error
+        self.svg_files = self._library_svgs()
+
+    def _record_error(self, title, message, details=None):
+        self.errors.append(f"{title}: {message}")
+        print(f"   [ERROR] {title}: {message}")
+
+    def _library_svgs(self, count=20):
+        """Einige Symbole der Bibliothek für die synthetischen Marker."""
+        svg_files = []
+        for root, dirs, files in os.walk(os.path.join(PLUGIN_DIR, "svgs")):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(".svg"):
+                    svg_files.append(os.path.join(root, name))
+                    if len(svg_files) >= count:
+                        return svg_files
+        if not svg_files:
+            raise RuntimeError("Keine SVG-Dateien im Ordner svgs/ gefunden")
+        return svg_files
+
+    @contextlib.contextmanager
+    def _quiet(self):
+        """Unterdrückt die DEBUG-Ausgaben des Plugins während der Messung."""
+        if self.verbose:
+            yield
+            return
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+
+    def _random_point(self):
+        from qgis.core import QgsPointXY
+        return QgsPointXY(
+            ORIGIN_X + self.random.random() * EXTENT,
+            ORIGIN_Y + self.random.random() * EXTENT
+        )
+
+    # --- Testdaten ---
+
+    def create_template(self, workdir, size):
+        """Erstellt eine GeoPackage mit ``size`` synthetischen Markern."""
+        from qgis.core import QgsFeature, QgsGeometry
+        svg_store_module = importlib.import_module(f"{os.path.basename(PLUGIN_DIR)}.svg_store")
+
+        gpkg = os.path.join(workdir, "template.gpkg")
+        with self._quiet():
+            layer = self.plugin._create_new_layer(gpkg, LAYER_NAME, CRS)
+        if layer is None or not layer.isValid():
+            raise RuntimeError(f"Synthetische GeoPackage konnte nicht erstellt werden: {gpkg}")
+
+        store = svg_store_module.SvgBlobStore(gpkg)
+        symbols = []
+        for svg_file in self.svg_files:
+            with open(svg_file, "r", encoding="utf-8") as f:
+                content_hash = store.put(f.read())
+            symbols.append((svg_file, os.path.relpath(svg_file, PLUGIN_DIR), content_hash))
+
+        batch = []
+        for i in range(size):
+            svg_file, relative_path, content_hash = symbols[i % len(symbols)]
+            feat = QgsFeature(layer.fields())
+            feat.setGeometry(QgsGeometry.fromPointXY(self._random_point()))
+            feat.setAttribute("name", os.path.basename(svg_file))
+            feat.setAttribute("svg_path", relative_path)
+            feat.setAttribute("svg_hash", content_hash)
+            feat.setAttribute("size", 10.0 + self.random.random() * 50.0)
+            feat.setAttribute("scale_with_map", bool(i % 2))
+            feat.setAttribute("unique_id", str(uuid.uuid4()))
+            feat.setAttribute("label", f"Marker {i}")
+            feat.setAttribute("show_label", i % 10 == 0)
+            batch.append(feat)
+            if len(batch) >= 5000:
+                layer.dataProvider().addFeatures(batch)
+                batch = []
+        if batch:
+            layer.dataProvider().addFeatures(batch)
+        del layer
+        return gpkg
+
+    def open_copy(self, template, workdir, name, connect=True):
+        """Lädt eine Kopie der Vorlage als Marker-Layer des Plugins."""
+        from qgis.core import QgsProject, QgsVectorLayer
+        gpkg = os.path.join(workdir, f"{name}.gpkg")
+        shutil.copy2(template, gpkg)
+        layer = QgsVectorLayer(f"{gpkg}|layername={LAYER_NAME}", "THW Toolbox Marker", "ogr")
+        if not layer.isValid():
+            raise RuntimeError(f"Layer konnte nicht geladen werden: {gpkg}")
+        QgsProject.instance().addMapLayer(layer)
+        self.plugin.layer = layer
+        self.plugin.canvas.setDestinationCrs(layer.crs())
+        self.plugin.canvas.setExtent(layer.extent())
+        if connect:
+            with self._quiet():
+                self.plugin._connect_layer_signals(layer)
+        return layer, gpkg
+
+    def release(self):
+        """Trennt den Layer vom Plugin und leert das Projekt."""
+        from qgis.core import QgsProject
+        with self._quiet():
+            self.plugin._disconnect_layer_signals()
+        QgsProject.instance().removeAllMapLayers()
+        QgsProject.instance().setFileName("")
+        self.plugin.layer = None
+
+    # --- Messungen ---
+
+    def _time(self, recorder, name, func, *args):
+        errors_before = len(self.errors)
+        with self._quiet():
+            start = time.perf_counter()
+            func(*args)
+            seconds = time.perf_counter() - start
+        recorder.record(name, seconds)
+        if len(self.errors) > errors_before:
+            recorder.count(f"{name}_errors", len(self.errors) - errors_before)
+
+    def run_size(self, size):
+        """Führt alle Messungen für eine Layer-Größe aus und liefert die Kennzahlen."""
+        from qgis.core import QgsPointXY, QgsProject
+
+        recorder = self.Instrumentation(enabled=True)
+        workdir = tempfile.mkdtemp(prefix=f"thw_benchmark_{size}_")
+        try:
+            print(f"\n[{size} Marker] Erstelle synthetische GeoPackage...")
+            start = time.perf_counter()
+            template = self.create_template(workdir, size)
+            print(f"   [OK] {time.perf_counter() - start:.1f} s")
+
+            layer, gpkg = self.open_copy(template, workdir, "working")
+
+            print("   Renderer-Neuaufbau...")
+            for _ in range(self.repeat):
+                self._time(recorder, "renderer_rebuild", self.plugin._init_renderer, layer)
+
+            print("   Trefferprüfung (IdentifyTool/MoveTool)...")
+            positions = [feat.geometry().asPoint() for feat in layer.getFeatures()]
+            hit_test = self.plugin.marker_index.hit_test
+            for i in range(self.queries):
+                # Abwechselnd auf einem Marker und an einer zufälligen Stelle
+                if i % 2 == 0 and positions:
+                    point = QgsPointXY(self.random.choice(positions))
+                else:
+                    point = self._random_point()
+                start = time.perf_counter()
+                hit_test(point)
+                recorder.record("hit_test", time.perf_counter() - start)
+
+            print("   Marker platzieren...")
+            for _ in range(self.repeat):
+                self._time(recorder, "place_feature", self.plugin._place_feature,
+                           self.random.choice(self.svg_files), self._random_point())
+
+            print("   Marker löschen...")
+            fids = [feat.id() for feat in layer.getFeatures()]
+            for fid in self.random.sample(fids, min(self.repeat, len(fids))):
+                self._time(recorder, "delete_feature", self.plugin.delete_feature, fid)
+
+            print("   Portables Paket exportieren...")
+            for i in range(self.heavy_repeat):
+                export_path = os.path.join(workdir, f"export_{i}")
+                self._time(recorder, "export_portable_package", self.plugin.export_portable_package, export_path)
+                shutil.rmtree(export_path, ignore_errors=True)
+                with contextlib.suppress(OSError):
+                    os.remove(export_path + ".zip")
+            self.release()
+
+            print("   Projekt speichern (Verschieben der GeoPackage)...")
+            for i in range(self.heavy_repeat):
+                self.open_copy(template, workdir, f"save_{i}")
+                project_dir = os.path.join(workdir, f"project_{i}")
+                os.makedirs(project_dir)
+                QgsProject.instance().setFileName(os.path.join(project_dir, "projekt.qgz"))
+                self._time(recorder, "project_save", self.plugin._on_project_save)
+                self.release()
+
+            print("   Layer-Felder aktualisieren...")
+            for i in range(self.heavy_repeat):
+                old_layer, old_gpkg = self.open_copy(template, workdir, f"fields_{i}", connect=False)
+                self._time(recorder, "update_layer_fields", self.plugin._update_layer_fields,
+                           old_layer, old_gpkg, LAYER_NAME)
+                self.release()
+        finally:
+            self.release()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        stats = recorder.stats()
+        for name, values in sorted(stats["spans"].items()):
+            print(f"   {name:<26} p50 {values['p50_ms']:10.2f} ms   p95 {values['p95_ms']:10.2f} ms")
+        return stats
+
+    def run(self, sizes):
+        from qgis.core import Qgis
+        results = {
+            "meta": {
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "qgis_version": Qgis.QGIS_VERSION,
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "repeat": self.repeat,
+                "heavy_repeat": self.heavy_repeat,
+                "queries": self.queries,
+            },
+            "results": {},
+        }
+        for size in sizes:
+            results["results"][str(size)] = self.run_size(size)
+        results["meta"]["errors"] = self.errors
+        return results
+
+
+def compare_with_baseline(results, baseline, threshold, min_delta_ms=1.0):
+    """Vergleicht die Mediane (p50) mit der Baseline und liefert die Regressionen.
+
+    Als Regression gilt ein Median, der um mehr als ``threshold`` (Anteil)
+    und mindestens ``min_delta_ms`` über der Baseline liegt.
+    """
+    comparison = {}
+    regressions = []
+    for size, stats in results["results"].items():
+        baseline_spans = baseline.get("results", {}).get(size, {}).get("spans", {})
+        for name, values in stats["spans"].items():
+            reference = baseline_spans.get(name)
+            if not reference:
+                continue
+            current_ms, reference_ms = values["p50_ms"], reference["p50_ms"]
+            ratio = current_ms / reference_ms if reference_ms > 0 else float("inf")
+            regressed = ratio > 1.0 + threshold and current_ms - reference_ms >= min_delta_ms
+            comparison.setdefault(size, {})[name] = {
+                "p50_ms": current_ms,
+                "baseline_p50_ms": reference_ms,
+                "ratio": ratio,
+                "regression": regressed,
+            }
+            if regressed:
+                regressions.append(f"{name} bei {size} Markern: {reference_ms:.2f} ms -> {current_ms:.2f} ms ({ratio:.2f}x)")
+    return comparison, regressions
+
+
+def main():
+    """Hauptfunktion des Benchmarks."""
+    parser = argparse.ArgumentParser(
+        description="Misst die Marker-Layer-Operationen des THW Toolbox Plugins",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Beispiele:
+  python benchmark.py
+  python benchmark.py --sizes 100 1000 --repeat 3
+  python benchmark.py --save-baseline
+  python benchmark.py --baseline benchmark_baseline.json --threshold 0.25
+        """
+    )
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='Anzahl der Marker je synthetischer GeoPackage (Standard: 100 1000 10000 50000)')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='Wiederholungen für Renderer, Platzieren und Löschen (Standard: 5)')
+    parser.add_argument('--heavy-repeat', type=int, default=3,
+                        help='Wiederholungen für Speichern, Feld-Aktualisierung und Export (Standard: 3)')
+    parser.add_argument('--queries', type=int, default=500,
+                        help='Anzahl der Trefferprüfungen je Größe (Standard: 500)')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT,
+                        help='JSON-Datei für die Ergebnisse (Standard: benchmark_results.json)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE,
+                        help='Baseline für den Vergleich (Standard: benchmark_baseline.json)')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Erlaubte Verschlechterung des Medians als Anteil (Standard: 0.2 = 20 %%)')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='Ergebnisse zusätzlich als neue Baseline speichern')
+    parser.add_argument('--verbose', action='store_true',
+                        help='DEBUG-Ausgaben des Plugins anzeigen')
+    args = parser.parse_args()
+
+    print("THW Toolbox Plugin Benchmark")
+    print("=" * 50)
+
+    benchmark = MarkerBenchmark(args.repeat, args.heavy_repeat, args.queries, args.verbose)
+    results = benchmark.run(args.sizes)
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        results["comparison"], regressions = compare_with_baseline(results, baseline, args.threshold)
+        results["meta"]["baseline"] = os.path.abspath(args.baseline)
+    else:
+        print(f"\n[INFO] Keine Baseline verglichen ({args.baseline})")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"\n[OK] Ergebnisse gespeichert: {args.output}")
+
+    if args.save_baseline:
+        shutil.copy2(args.output, args.baseline)
+        print(f"[OK] Als Baseline gespeichert: {args.baseline}")
+
+    if benchmark.errors:
+        print(f"\n[ERROR] {len(benchmark.errors)} Fehler während der Messung")
+    if regressions:
+        print("\n[REGRESSION] Langsamer als die Baseline:")
+        for line in regressions:
+            print(f"   {line}")
+    sys.exit(1 if regressions or benchmark.errors else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# diagnostics_dock.py
+
+import os
+
+from PyQt5.QtCore import Qt, QTimer, QSettings
+from PyQt5.QtWidgets import (QDockWidget, QWidget, QVBoxLayout, QHBoxLayout, QCheckBox,
+                             QPushButton, QTableWidget, QTableWidgetItem, QHeaderView,
+                             QLabel, QFileDialog, QMessageBox)
+
+
+class DiagnosticsDock(QDockWidget):
+    """Zeigt Latenzen (p50/p95) und Zähler der Instrumentierung an.
+
+    Die Tabelle wird nur aktualisiert, solange das Dock sichtbar ist.
+    ``extra_stats`` liefert zusätzliche Kennzahlen (z.B. des Bild-Caches),
+    die im JSON-Export mitgeschrieben werden.
+    """
+
+    REFRESH_MS = 1000
+    COLUMNS = ("Messpunkt", "Anzahl", "p50 (ms)", "p95 (ms)", "Max (ms)")
+
+    def __init__(self, instrumentation, extra_stats=None, parent=None):
+        super().__init__("Diagnose", parent)
+        self.setAllowedAreas(Qt.RightDockWidgetArea | Qt.BottomDockWidgetArea)
+        self.instrumentation = instrumentation
+        self.extra_stats = extra_stats
+
+        content = QWidget()
+        self.setWidget(content)
+        layout = QVBoxLayout(content)
+
+        self.enabled_checkbox = QCheckBox("Messung aktiv")
+        self.enabled_checkbox.setChecked(instrumentation.enabled)
+        self.enabled_checkbox.stateChanged.connect(self.on_enabled_toggle)
+        layout.addWidget(self.enabled_checkbox)
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        layout.addWidget(self.table)
+
+        self.counter_label = QLabel()
+        self.counter_label.setWordWrap(True)
+        layout.addWidget(self.counter_label)
+
+        button_layout = QHBoxLayout()
+        self.btn_reset = QPushButton("Zurücksetzen")
+        self.btn_reset.clicked.connect(self.on_reset)
+        button_layout.addWidget(self.btn_reset)
+        self.btn_export = QPushButton("Als JSON exportieren")
+        self.btn_export.clicked.connect(self.on_export)
+        button_layout.addWidget(self.btn_export)
+        layout.addLayout(button_layout)
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(self.REFRESH_MS)
+        self.refresh_timer.timeout.connect(self.refresh)
+
+    def _extra(self):
+        if self.extra_stats is None:
+            return {}
+        try:
+            return self.extra_stats()
+        except Exception as e:
+            print(f"DEBUG: Zusätzliche Kennzahlen nicht verfügbar: {e}")
+            return {}
+
+    def refresh(self):
+        stats = self.instrumentation.stats()
+        spans = stats["spans"]
+        self.table.setRowCount(len(spans))
+        for row, name in enumerate(sorted(spans)):
+            values = spans[name]
+            cells = (
+                name,
+                str(values["count"]),
+                f"{values['p50_ms']:.2f}",
+                f"{values['p95_ms']:.2f}",
+                f"{values['max_ms']:.2f}",
+            )
+            for column, text in enumerate(cells):
+                item = QTableWidgetItem(text)
+                if column > 0:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.table.setItem(row, column, item)
+
+        lines = [f"{name}: {value}" for name, value in sorted(stats["counters"].items())]
+        for group, values in sorted(self._extra().items()):
+            if isinstance(values, dict):
+                lines.append(f"{group}: " + ", ".join(
+                    f"{key}={value:.2f}" if isinstance(value, float) else f"{key}={value}"
+                    for key, value in values.items()
+                ))
+        if not self.instrumentation.enabled:
+            lines.insert(0, "Messung ist ausgeschaltet.")
+        self.counter_label.setText("<br>".join(lines) if lines else "Noch keine Zähler.")
+
+    def on_enabled_toggle(self, state):
+        enabled = state == Qt.Checked
+        self.instrumentation.enabled = enabled
+        QSettings().setValue("thw_toolbox/diagnostics_enabled", enabled)
+        self.refresh()
+
+    def on_reset(self):
+        self.instrumentation.reset()
+        self.refresh()
+
+    def on_export(self):
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Diagnose exportieren",
+            os.path.join(os.path.expanduser("~"), "thw_toolbox_diagnose.json"),
+            "JSON (*.json)"
+        )
+        if not path:
+            return
+        try:
+            self.instrumentation.export_json(path, self._extra())
+        except OSError as e:
+            QMessageBox.critical(self, "Export fehlgeschlagen", f"Diagnose konnte nicht gespeichert werden:\n{e}")
+            return
+        print(f"DEBUG: Diagnose exportiert: {path}")
+
+    def showEvent(self, event):
+        self.refresh()
+        self.refresh_timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.refresh_timer.stop()
+        super().hideEvent(event)
@@ -0,0 +1,75 @@
+# edit_session.py
+
+from PyQt5.QtCore import QObject, QTimer
+
+from .instrumentation import instrumentation
+
+
+class EditSession(QObject):
+    """Bündelt Attributänderungen aus dem Marker-Dock zu einem Commit.
+
+    Jede Änderung wird sofort in den Edit-Buffer des Layers geschrieben, so
+    dass Symbol und Label ohne Verzögerung aktualisiert werden. Gespeichert
+    wird erst, wenn für ``DEBOUNCE_MS`` keine weitere Änderung kam, oder
+    beim expliziten ``flush()`` (Feature-Wechsel, Löschen, Projekt speichern).
+    """
+
+    DEBOUNCE_MS = 500
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.layer = None
+        self._dirty = False
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(self.DEBOUNCE_MS)
+        self._timer.timeout.connect(self.flush)
+
+    def set_layer(self, layer):
+        """Wechselt den Layer; offene Änderungen des alten Layers werden vorher gespeichert."""
+        if layer is self.layer:
+            return
+        self.flush()
+        self.layer = layer
+
+    def has_pending_changes(self):
+        return self._dirty
+
+    def change_attribute(self, fid, field_name, value):
+        """Schreibt einen Attributwert in den Edit-Buffer und plant den Commit ein."""
+        if not self.layer:
+            return False
+        idx = self.layer.fields().indexFromName(field_name)
+        if idx < 0:
+            print(f"DEBUG: Feld {field_name} nicht im Layer vorhanden")
+            return False
+        if not self.layer.isEditable():
+            self.layer.startEditing()
+        if not self.layer.changeAttributeValue(fid, idx, value):
+            print(f"DEBUG: Änderung von {field_name} für Feature {fid} fehlgeschlagen")
+            return False
+        self._dirty = True
+        self.layer.triggerRepaint()
+        self._timer.start()
+        return True
+
+    def flush(self):
+        """Speichert alle gepufferten Änderungen in einer Transaktion."""
+        self._timer.stop()
+        if not self._dirty:
+            return True
+        self._dirty = False
+        layer = self.layer
+        try:
+            if not layer or not layer.isEditable():
+                # Bereits von einem anderen Vorgang gespeichert
+                return True
+            if layer.commitChanges():
+                instrumentation.count("dock_commits")
+                return True
+            print(f"DEBUG: Commit der Dock-Änderungen fehlgeschlagen: {layer.commitErrors()}")
+            layer.rollBack()
+        except RuntimeError as e:
+            # Layer wurde bereits gelöscht
+            print(f"DEBUG: Dock-Änderungen konnten nicht gespeichert werden: {e}")
+        return False
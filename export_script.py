@@ -47,6 +47,27 @@ class THWPluginExporter:
             "dragmaptool.py",
             "layer_manager.py",
             "mapcanvas_dropevent_filter.py",
+            "svg_store.py",
+            "svg_cache.py",
+            "marker_index.py",
+            "marker_ghost.py",
+            "edit_session.py",
+            "symbol_catalog.py",
+            "symbol_search.py",
+            "thumbnail_atlas.py",
+            "symbol_model.py",
+            "icon_loader.py",
+            "image_cache.py",
+            "startup_report.py",
+            "instrumentation.py",
+            "diagnostics_dock.py",
+            "gpkg_relocation.py",
+            "schema_migrator.py",
+            "write_behind.py",
+            "symbol_pack.py",
+            "marker_queries.py",
+            "marker_stats.py",
+            "marker_store.py",
             "__init__.py",
             "metadata.txt"
         ]
@@ -72,9 +93,11 @@ class THWPluginExporter:
             if not file_path.exists():
                 missing_files.append(file_name)
         
-        # Prüfe erforderliche Verzeichnisse
+        # Prüfe erforderliche Verzeichnisse (svgs/ kann durch svgs.pack ersetzt sein)
         for dir_name in self.required_dirs:
             dir_path = self.plugin_dir / dir_name
+            if dir_name == "svgs" and (self.plugin_dir / "svgs.pack").exists():
+                continue
             if not dir_path.exists():
                 missing_dirs.append(dir_name)
         
@@ -122,10 +145,15 @@ class THWPluginExporter:
                 else:
                     print(f"   [WARN] {py_file} nicht gefunden")
             
-            # Kopiere SVG-Verzeichnis
+            # Kopiere die Symbolbibliothek - gepackt als eine Datei, sonst das SVG-Verzeichnis
+            pack_source = self.plugin_dir / "svgs.pack"
             svg_source = self.plugin_dir / "svgs"
             svg_dest = export_path / "svgs"
-            if svg_source.exists():
+            if pack_source.exists():
+                print("Kopiere Symbolpaket...")
+                shutil.copy2(pack_source, export_path)
+                print(f"   [OK] svgs.pack ({pack_source.stat().st_size / (1024 * 1024):.1f} MB)")
+            elif svg_source.exists():
                 print("Kopiere SVG-Symbole...")
                 shutil.copytree(svg_source, svg_dest, dirs_exist_ok=True)
                 svg_count = sum(1 for _ in svg_dest.rglob("*.svg"))
@@ -144,6 +172,13 @@ class THWPluginExporter:
             else:
                 print("   [WARN] Icons-Verzeichnis nicht gefunden")
             
+            # Kopiere gemeinsame Schriften der SVG-Symbole (von svg_minify.py angelegt)
+            font_source = self.plugin_dir / "fonts"
+            if font_source.exists():
+                print("Kopiere Schriften...")
+                shutil.copytree(font_source, export_path / "fonts", dirs_exist_ok=True)
+                print(f"   [OK] {sum(1 for _ in font_source.glob('*.ttf'))} Schriften kopiert")
+            
             # Kopiere GeoPackage-Dateien (optional)
             if include_gpkg:
                 print("Suche nach GeoPackage-Dateien...")
@@ -0,0 +1,108 @@
+# gpkg_relocation.py
+
+import os
+import shutil
+import sqlite3
+
+# Seiten pro Schritt der SQLite-Backup-API (bei 4-KB-Seiten 4 MB je Schritt)
+BACKUP_PAGES_PER_STEP = 1024
+SIDECAR_SUFFIXES = ("-wal", "-shm", "-journal")
+# Dateien, die zur GeoPackage gehören und mit ihr umziehen (Journal der Write-Behind-Sitzung)
+JOURNAL_SUFFIX = "-thwjournal"
+COMPANION_SUFFIXES = (JOURNAL_SUFFIX,)
+
+
+def _same_filesystem(source, target_dir):
+    try:
+        return os.stat(source).st_dev == os.stat(target_dir).st_dev
+    except OSError:
+        return False
+
+
+def _has_sidecars(path):
+    """Ob zur Datenbank noch WAL-/Journal-Dateien existieren (offene Transaktionen)."""
+    return any(os.path.exists(path + suffix) for suffix in SIDECAR_SUFFIXES)
+
+
+def _checkpoint(path):
+    """Überträgt den Inhalt einer WAL-Datei in die Datenbank, soweit möglich."""
+    try:
+        conn = sqlite3.connect(path, timeout=5)
+        try:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"DEBUG: WAL-Checkpoint für {path} nicht möglich: {e}")
+
+
+def move_companions(source, target):
+    """Verschiebt die zugehörigen Dateien (z.B. das Write-Behind-Journal) zur neuen GeoPackage."""
+    for suffix in COMPANION_SUFFIXES:
+        if os.path.exists(source + suffix):
+            shutil.move(source + suffix, target + suffix)
+
+
+def remove_gpkg(path):
+    """Löscht eine nicht mehr geöffnete GeoPackage samt WAL-/SHM-/Journal-Dateien.
+
+    Fehlt eine der zugehörigen Dateien, wird sie übersprungen; andere Fehler
+    (z.B. noch gesperrt) werden weitergegeben.
+    """
+    os.remove(path)
+    for suffix in SIDECAR_SUFFIXES + COMPANION_SUFFIXES:
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
+
+
+def backup_gpkg(source, target):
+    """Kopiert eine GeoPackage seitenweise mit der Online-Backup-API von SQLite.
+
+    Die Kopie ist ein konsistenter Stand, auch wenn die Quelle gerade von
+    QGIS geöffnet ist. Sie entsteht als temporäre Datei neben dem Ziel und
+    ersetzt dieses erst, wenn sie vollständig ist.
+    """
+    temp_target = target + ".tmp"
+    if os.path.exists(temp_target):
+        os.remove(temp_target)
+    src = sqlite3.connect(source, timeout=10)
+    try:
+        dst = sqlite3.connect(temp_target)
+        try:
+            src.backup(dst, pages=BACKUP_PAGES_PER_STEP)
+        finally:
+            dst.close()
+    finally:
+        src.close()
+    os.replace(temp_target, target)
+
+
+def relocate_gpkg(source, target):
+    """Verschiebt eine GeoPackage nach ``target``, ohne die Features neu zu schreiben.
+
+    Liegen Quelle und Ziel im selben Dateisystem und hat die Quelle keine
+    WAL-/Journal-Dateien (mehr), wird sie atomar umbenannt. Sonst wird sie
+    über die Backup-API kopiert; die Quelle bleibt dann bestehen und muss
+    vom Aufrufer mit ``remove_gpkg`` entfernt werden, sobald sie nicht mehr
+    geöffnet ist. Das Write-Behind-Journal zieht in beiden Fällen mit um.
+
+    Returns:
+        str: ``"rename"`` oder ``"backup"``
+    """
+    target_dir = os.path.dirname(os.path.abspath(target))
+    # WAL in die Datenbank übertragen und kürzen, damit keine Änderungen nur in der WAL-Datei stehen
+    _checkpoint(source)
+    method = "backup"
+    if _same_filesystem(source, target_dir) and not _has_sidecars(source):
+        try:
+            os.replace(source, target)
+            method = "rename"
+        except OSError as e:
+            # z.B. unter Windows, solange die Datei geöffnet ist
+            print(f"DEBUG: Umbenennen nicht möglich, kopiere per Backup-API: {e}")
+    if method == "backup":
+        backup_gpkg(source, target)
+    move_companions(source, target)
+    return method
@@ -0,0 +1,166 @@
+# icon_loader.py
+
+from PyQt5.QtCore import QByteArray, QObject, QRectF, QRunnable, QSize, QThread, QThreadPool, Qt, pyqtSignal
+import os
+
+from PyQt5.QtGui import QFontDatabase, QImage, QPainter
+from PyQt5.QtSvg import QSvgRenderer
+
+from .instrumentation import instrumentation
+
+
+def blank_image(pixel_size):
+    """Transparentes quadratisches QImage (auch Platzhalter für nicht rasterbare Symbole)."""
+    image = QImage(pixel_size, pixel_size, QImage.Format_ARGB32_Premultiplied)
+    image.fill(Qt.transparent)
+    return image
+
+
+def render_svg_image(source, pixel_size):
+    """Rastert ein SVG (Pfad oder Daten als QByteArray/bytes) seitenverhältnistreu und zentriert in ein quadratisches QImage.
+
+    Nutzt nur QImage/QPainter und darf daher auch in Worker-Threads laufen.
+    """
+    if isinstance(source, bytes):
+        source = QByteArray(source)
+    image = blank_image(pixel_size)
+    renderer = QSvgRenderer(source)
+    if not renderer.isValid():
+        return image
+    default_size = renderer.defaultSize()
+    if default_size.isEmpty():
+        default_size = QSize(pixel_size, pixel_size)
+    default_size.scale(pixel_size, pixel_size, Qt.KeepAspectRatio)
+    x = (pixel_size - default_size.width()) / 2.0
+    y = (pixel_size - default_size.height()) / 2.0
+    painter = QPainter(image)
+    painter.setRenderHint(QPainter.Antialiasing)
+    renderer.render(painter, QRectF(x, y, default_size.width(), default_size.height()))
+    painter.end()
+    return image
+
+
+def register_shared_fonts(font_dir):
+    """Registriert die gemeinsamen Schriften der SVG-Bibliothek (fonts/*.ttf) für QSvgRenderer.
+
+    Die Symbole betten keine eigene Schrift mehr ein (siehe svg_minify.py).
+
+    Returns:
+        int: Anzahl registrierter Schriften
+    """
+    if not os.path.isdir(font_dir):
+        return 0
+    count = 0
+    for name in sorted(os.listdir(font_dir)):
+        if not name.lower().endswith((".ttf", ".otf")):
+            continue
+        if QFontDatabase.addApplicationFont(os.path.join(font_dir, name)) >= 0:
+            count += 1
+        else:
+            print(f"DEBUG: Schrift konnte nicht registriert werden: {name}")
+    return count
+
+
+class _RenderTask(QRunnable):
+    """Rastert ein einzelnes SVG im Worker-Thread."""
+
+    def __init__(self, loader, key, path, pixel_size, priority):
+        super().__init__()
+        # Die Aufgabe wird bis zum Ergebnis in IconLoader referenziert (tryTake)
+        self.setAutoDelete(False)
+        self.loader = loader
+        self.key = key
+        self.path = path
+        self.pixel_size = pixel_size
+        self.priority = priority
+        self.cancelled = False
+        self.error = None
+
+    def run(self):
+        image = None
+        if not self.cancelled:
+            try:
+                image = render_svg_image(self.path, self.pixel_size)
+            except Exception as e:
+                # Meldung erst im GUI-Thread (_on_rendered) ausgeben
+                self.error = str(e)
+                # Als leere Kachel fertig melden, sonst wird das Symbol immer wieder
+                # angefordert und der Atlas des Ordners nie vollständig
+                image = blank_image(self.pixel_size)
+        self.loader._rendered.emit(self, image)
+
+
+class IconLoader(QObject):
+    """Rastert SVGs asynchron in einem eigenen Thread-Pool.
+
+    Aufträge für sichtbare Einträge laufen mit höherer Priorität; noch nicht
+    gestartete Aufträge können zurückgestuft oder abgebrochen werden. Das
+    Ergebnis kommt als ``image_ready(key, QImage)`` im GUI-Thread an; nicht
+    rasterbare SVGs liefern eine leere Kachel.
+    """
+
+    PRIORITY_VISIBLE = 10
+    PRIORITY_BACKGROUND = 0
+
+    image_ready = pyqtSignal(object, object)  # Schlüssel, QImage
+    _rendered = pyqtSignal(object, object)  # _RenderTask, QImage (aus dem Worker-Thread)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        # Einen Kern für QGIS selbst freihalten
+        self.pool.setMaxThreadCount(max(1, QThread.idealThreadCount() - 1))
+        self._tasks = {}  # Schlüssel -> _RenderTask (wartend oder laufend)
+        self._rendered.connect(self._on_rendered)
+
+    def is_pending(self, key):
+        return key in self._tasks
+
+    def request(self, key, path, pixel_size, priority=PRIORITY_BACKGROUND):
+        """Plant das Rastern ein; ein wartender Auftrag wird bei Bedarf höher priorisiert."""
+        task = self._tasks.get(key)
+        if task is not None and not task.cancelled:
+            if task.priority >= priority or not self.pool.tryTake(task):
+                # Gleich oder höher priorisiert bzw. läuft bereits
+                return
+        task = _RenderTask(self, key, path, pixel_size, priority)
+        self._tasks[key] = task
+        self.pool.start(task, priority)
+
+    def set_priority(self, key, priority):
+        """Ändert die Priorität eines noch wartenden Auftrags."""
+        task = self._tasks.get(key)
+        if task is None or task.cancelled or task.priority == priority or not self.pool.tryTake(task):
+            return
+        task.priority = priority
+        self.pool.start(task, priority)
+
+    def visible_keys(self):
+        """Schlüssel aller noch offenen Aufträge mit Sichtbarkeits-Priorität."""
+        return [
+            key for key, task in self._tasks.items()
+            if task.priority >= self.PRIORITY_VISIBLE and not task.cancelled
+        ]
+
+    def cancel(self, keys=None):
+        """Bricht wartende Aufträge ab (alle, wenn keys None ist)."""
+        for key in list(self._tasks if keys is None else keys):
+            task = self._tasks.get(key)
+            if task is None:
+                continue
+            if self.pool.tryTake(task):
+                del self._tasks[key]
+            else:
+                # Läuft bereits - Ergebnis wird verworfen
+                task.cancelled = True
+
+    def _on_rendered(self, task, image):
+        if self._tasks.get(task.key) is task:
+            del self._tasks[task.key]
+        if task.cancelled or image is None:
+            return
+        if task.error is not None:
+            print(f"DEBUG: SVG konnte nicht gerastert werden ({task.key}): {task.error}")
+            instrumentation.count("icons_failed")
+        instrumentation.count("icons_rendered")
+        self.image_ready.emit(task.key, image)
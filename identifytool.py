@@ -1,14 +1,17 @@
 # identifytool.py
 
 import os
-import time
-from PyQt5.QtCore import Qt, QTimer
+import hashlib
+from PyQt5.QtCore import Qt, QTimer, QByteArray
 from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QPushButton, QInputDialog, 
                            QLabel, QHBoxLayout, QDockWidget, QWidget, QSlider,
                            QCheckBox, QSpinBox, QApplication, QLineEdit)
 from PyQt5.QtGui import QPixmap
 from qgis.gui import QgsMapToolIdentify
 from qgis.core import QgsFeatureRequest, QgsCoordinateReferenceSystem, QgsCoordinateTransform, QgsProject
+from .icon_loader import render_svg_image
+from .image_cache import ImageCache
+from .instrumentation import instrumentation
 
 class FeatureDock(QDockWidget):
     def __init__(self, parent=None):
@@ -109,23 +112,12 @@ class FeatureDock(QDockWidget):
         
         self.main_layout.addLayout(self.button_layout)
         
-        # Tracker für letzte Preview-Datei
-        self.last_preview_path = None
-        
         # Initial verstecken und Platzhalter anzeigen
         self.hide()
         self.show_placeholder()
         
     def show_placeholder(self):
         """Zeigt Platzhalter-Text mit Anweisungen an"""
-        # Lösche letzte Preview-Datei, falls vorhanden
-        try:
-            if getattr(self, 'last_preview_path', None) and os.path.exists(self.last_preview_path):
-                os.remove(self.last_preview_path)
-                self.last_preview_path = None
-        except Exception:
-            pass
-        
         self.svg_label.clear()
         self.svg_label.setText("Kein Marker ausgewählt")
         self.svg_label.setStyleSheet("QLabel { border: 2px dashed #ccc; background-color: #f9f9f9; color: #999; font-size: 14px; }")
@@ -173,120 +165,96 @@ class FeatureDock(QDockWidget):
             return f"UTM 32N: Fehler"
     
         
+    def _flush_edits(self):
+        """Speichert gepufferte Änderungen des aktuell angezeigten Features."""
+        layer_manager = getattr(self, 'layer_manager', None)
+        if layer_manager is not None and hasattr(layer_manager, 'edit_session'):
+            layer_manager.edit_session.flush()
+
+    def _change_attribute(self, field_name, value):
+        """Leitet eine Änderung an die Edit-Session weiter (Commit gebündelt und verzögert)."""
+        if not hasattr(self, 'feat') or not self.feat:
+            return
+        # Beim Befüllen der Widgets in show_feature feuern die Signale mit unveränderten Werten
+        if field_name in self.feat.fields().names() and self.feat.attribute(field_name) == value:
+            return
+        if self.layer_manager.edit_session.change_attribute(self.feat.id(), field_name, value):
+            self.feat.setAttribute(field_name, value)
+
+    PREVIEW_SIZE = 180
+
+    def _preview_cache_key(self, feat, svg_content):
+        """Schlüssel der Vorschau im Bild-Cache: Inhalts-Hash, sonst der SVG-Pfad."""
+        fields = feat.fields().names()
+        content_hash = feat.attribute('svg_hash') if 'svg_hash' in fields else None
+        if not content_hash and svg_content and svg_content.strip():
+            content_hash = hashlib.sha256(svg_content.encode('utf-8')).hexdigest()
+        if not content_hash:
+            content_hash = f"path:{feat.attribute('svg_path')}"
+        return ImageCache.key(content_hash, self.PREVIEW_SIZE, 1.0)
+
+    def _render_preview(self, svg_content, svg_path):
+        """Rastert die Vorschau direkt aus den gespeicherten SVG-Bytes (QSvgRenderer).
+
+        Nur ohne gespeicherten Inhalt wird die Bibliotheksdatei gelesen.
+        """
+        if svg_content and svg_content.strip():
+            source = QByteArray(svg_content.encode('utf-8'))
+        elif svg_path:
+            source = svg_path if os.path.isabs(svg_path) else os.path.join(os.path.dirname(__file__), svg_path)
+            if not os.path.exists(source):
+                return None
+        else:
+            return None
+        return QPixmap.fromImage(render_svg_image(source, self.PREVIEW_SIZE))
+
+    @instrumentation.timed("show_feature")
     def show_feature(self, feat, layer_manager):
+        # Änderungen am zuvor angezeigten Feature nicht verlieren
+        self._flush_edits()
         self.feat = feat
         self.layer_manager = layer_manager
         
         # Debug: Zeige Feature-Daten
-        print(f"DEBUG: Feature-Daten:")
-        print(f"  - ID: {feat.id()}")
-        print(f"  - SVG-Pfad: {feat.attribute('svg_path') if feat.attribute('svg_path') else 'N/A'}")
-        print(f"  - SVG-Inhalt vorhanden: {bool(feat.attribute('svg_content'))}")
-        print(f"  - SVG-Inhalt Länge: {len(feat.attribute('svg_content')) if feat.attribute('svg_content') else 0}")
-        print(f"  - Größe: {feat.attribute('size') if feat.attribute('size') else 'N/A'}")
+        instrumentation.debug(f"DEBUG: Feature-Daten:")
+        instrumentation.debug(f"  - ID: {feat.id()}")
+        instrumentation.debug(f"  - SVG-Pfad: {feat.attribute('svg_path') if feat.attribute('svg_path') else 'N/A'}")
+        instrumentation.debug(f"  - Größe: {feat.attribute('size') if feat.attribute('size') else 'N/A'}")
         
         # Platzhalter verstecken
         self.placeholder_label.hide()
         
-        # SVG-Preview aktualisieren
+        # SVG-Preview aktualisieren (ohne Dateizugriff, solange die Vorschau im Bild-Cache liegt)
         try:
-            pixmap = None
-            svg_path_feat = feat.attribute('svg_path')
-            svg_content_feat = feat.attribute('svg_content') or ''
-            
-            # Versuche zuerst den SVG-Inhalt zu verwenden
-            if svg_content_feat and svg_content_feat.strip():
-                print("DEBUG: Versuche SVG-Inhalt zu verwenden")
-                # Erstelle temporäre SVG-Datei für Preview
-                temp_svg = self._create_temp_svg_for_preview(svg_content_feat)
-                if temp_svg and os.path.exists(temp_svg):
-                    print(f"DEBUG: Temporäre SVG-Datei erstellt: {temp_svg}")
-                    # Versuche zuerst mit QIcon (bessere SVG-Unterstützung)
-                    from PyQt5.QtGui import QIcon
-                    icon = QIcon(temp_svg)
-                    pixmap = icon.pixmap(180, 180)
-                    if pixmap.isNull():
-                        print("DEBUG: QIcon-Pixmap ist null, versuche QPixmap")
-                        # Fallback auf QPixmap
-                        pixmap = QPixmap(temp_svg)
-                    else:
-                        print("DEBUG: QIcon-Pixmap erfolgreich geladen")
-                else:
-                    print("DEBUG: Temporäre SVG-Datei konnte nicht erstellt werden")
+            image_cache = getattr(layer_manager, 'image_cache', None)
+            svg_content_feat = None
+            fields = feat.fields().names()
+            if 'svg_hash' in fields and feat.attribute('svg_hash'):
+                preview_key = self._preview_cache_key(feat, None)
+            else:
+                # Alte Features mit eingebettetem Inhalt
+                # (NULL, wenn das Feature ohne svg_content abgefragt wurde - dann nachladen)
+                svg_content_feat = (feat.attribute('svg_content') if 'svg_content' in fields else None) or None
+                preview_key = self._preview_cache_key(feat, svg_content_feat)
+            pixmap = image_cache.get(preview_key) if image_cache is not None else None
             
-            # Falls SVG-Inhalt nicht funktioniert hat, versuche den Pfad
-            if pixmap is None or pixmap.isNull():
-                print("DEBUG: Versuche SVG-Pfad zu verwenden")
-                # Konvertiere relativen Pfad zu absolutem Pfad (wie im Haupt-Plugin)
-                if not os.path.isabs(svg_path_feat):
-                    plugin_dir = os.path.dirname(__file__)
-                    absolute_path = os.path.join(plugin_dir, svg_path_feat)
-                    print(f"DEBUG: Konvertierter absoluter Pfad: {absolute_path}")
-                    if os.path.exists(absolute_path):
-                        print("DEBUG: Absoluter Pfad existiert, lade SVG")
-                        # Versuche zuerst mit QIcon (bessere SVG-Unterstützung)
-                        from PyQt5.QtGui import QIcon
-                        icon = QIcon(absolute_path)
-                        pixmap = icon.pixmap(180, 180)
-                        if pixmap.isNull():
-                            print("DEBUG: QIcon-Pixmap ist null, versuche QPixmap")
-                            # Fallback auf QPixmap
-                            pixmap = QPixmap(absolute_path)
-                        else:
-                            print("DEBUG: QIcon-Pixmap erfolgreich geladen")
-                    else:
-                        print("DEBUG: Absoluter Pfad existiert nicht, verwende ursprünglichen Pfad")
-                        # Fallback: Verwende den ursprünglichen Pfad
-                        pixmap = QPixmap(svg_path_feat)
-                else:
-                    print("DEBUG: Pfad ist bereits absolut")
-                    # Versuche zuerst mit QIcon (bessere SVG-Unterstützung)
-                    from PyQt5.QtGui import QIcon
-                    icon = QIcon(svg_path_feat)
-                    pixmap = icon.pixmap(180, 180)
-                    if pixmap.isNull():
-                        print("DEBUG: QIcon-Pixmap ist null, versuche QPixmap")
-                        # Fallback auf QPixmap
-                        pixmap = QPixmap(svg_path_feat)
-                    else:
-                        print("DEBUG: QIcon-Pixmap erfolgreich geladen")
+            if pixmap is None:
+                if svg_content_feat is None and hasattr(layer_manager, 'get_svg_content'):
+                    # SVG-Inhalt aus der Blob-Tabelle (svg_hash)
+                    svg_content_feat = layer_manager.get_svg_content(feat)
+                pixmap = self._render_preview(svg_content_feat, feat.attribute('svg_path'))
+                if image_cache is not None and pixmap is not None:
+                    image_cache.put(preview_key, pixmap)
             
-            # Prüfe ob das Pixmap erfolgreich geladen wurde
             if pixmap is not None and not pixmap.isNull():
-                print("DEBUG: Pixmap erfolgreich geladen, skaliere für Vorschau")
-                # Skaliere das Bild für die Vorschau
-                scaled_pixmap = pixmap.scaled(180, 180, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                self.svg_label.setPixmap(scaled_pixmap)
+                self.svg_label.setPixmap(pixmap)
                 self.svg_label.setStyleSheet("QLabel { border: 2px solid #2E86AB; background-color: white; }")
-                print("DEBUG: SVG-Preview erfolgreich angezeigt")
             else:
-                print("DEBUG: Pixmap ist None oder null")
                 raise Exception("Pixmap konnte nicht geladen werden")
             
         except Exception as e:
             print(f"Fehler beim Laden des SVG-Previews: {e}")
             print(f"SVG-Pfad: {feat.attribute('svg_path') if feat.attribute('svg_path') else 'N/A'}")
-            print(f"SVG-Inhalt vorhanden: {bool(feat.attribute('svg_content'))}")
-            print(f"SVG-Inhalt Länge: {len(feat.attribute('svg_content')) if feat.attribute('svg_content') else 0}")
-            
-            # Versuche alternative SVG-Loading-Methoden
-            try:
-                # Versuche mit QIcon (funktioniert oft besser mit SVG)
-                from PyQt5.QtGui import QIcon
-                svg_path_feat = feat.attribute('svg_path')
-                if not os.path.isabs(svg_path_feat):
-                    plugin_dir = os.path.dirname(__file__)
-                    absolute_path = os.path.join(plugin_dir, svg_path_feat)
-                    if os.path.exists(absolute_path):
-                        icon = QIcon(absolute_path)
-                        pixmap = icon.pixmap(180, 180)
-                        if not pixmap.isNull():
-                            self.svg_label.setPixmap(pixmap)
-                            self.svg_label.setStyleSheet("QLabel { border: 2px solid #2E86AB; background-color: white; }")
-                            return
-            except Exception as e2:
-                print(f"Alternative SVG-Loading-Methode fehlgeschlagen: {e2}")
-            
             self.svg_label.setText("SVG konnte nicht geladen werden")
             self.svg_label.setStyleSheet("QLabel { border: 2px dashed #ccc; background-color: #f9f9f9; color: #999; font-size: 12px; }")
         
@@ -375,41 +343,8 @@ class FeatureDock(QDockWidget):
         
         self.show()
         
-    def _create_temp_svg_for_preview(self, svg_content):
-        """Erstellt eine temporäre SVG-Datei für die Vorschau"""
-        try:
-            # Lösche vorherige Preview-Datei, falls vorhanden
-            try:
-                if getattr(self, 'last_preview_path', None) and os.path.exists(self.last_preview_path):
-                    os.remove(self.last_preview_path)
-                    self.last_preview_path = None
-            except Exception:
-                pass
-            
-            # Erstelle temporäres Verzeichnis falls es nicht existiert
-            temp_dir = os.path.join(os.path.dirname(__file__), "temp_files", "preview_cache")
-            os.makedirs(temp_dir, exist_ok=True)
-            
-            # Erstelle eindeutigen Dateinamen für Preview
-            temp_filename = f"preview_{int(time.time() * 1000)}.svg"
-            temp_path = os.path.join(temp_dir, temp_filename)
-            
-            # Schreibe SVG-Inhalt in temporäre Datei
-            with open(temp_path, 'w', encoding='utf-8') as f:
-                f.write(svg_content)
-            
-            # Prüfe ob die Datei erfolgreich erstellt wurde
-            if os.path.exists(temp_path) and os.path.getsize(temp_path) > 0:
-                # Merke die zuletzt erzeugte Preview-Datei
-                self.last_preview_path = temp_path
-                return temp_path
-            else:
-                return None
-                
-        except Exception:
-            return None
-        
     def on_delete(self):
+        self._flush_edits()
         self.layer_manager.delete_feature(self.feat.id())
         self.show_placeholder()
         self.show()
@@ -432,10 +367,10 @@ class FeatureDock(QDockWidget):
         self.btn_copy_coords.setStyleSheet("QPushButton { background-color: #2E86AB; color: white; border: none; padding: 2px 6px; border-radius: 3px; font-size: 10px; } QPushButton:hover { background-color: #1B5A7A; }")
         
     def on_size_change(self, value):
-        self.layer_manager.resize_feature(self.feat.id(), value)
+        self._change_attribute("size", value)
         
     def on_scale_toggle(self, state):
-        self.layer_manager.toggle_scale(self.feat.id(), state == Qt.Checked)
+        self._change_attribute("scale_with_map", state == Qt.Checked)
         
     def on_spinbox_changed(self, value):
         """Synchronisiert den Schieberegler mit der SpinBox"""
@@ -451,26 +386,17 @@ class FeatureDock(QDockWidget):
         
     def on_label_changed(self, text):
         """Wird aufgerufen, wenn der Label-Text geändert wird"""
-        if not hasattr(self, 'feat') or not self.feat:
-            return
-            
-        # Label im Feature aktualisieren
-        self.layer_manager.update_feature_label(self.feat.id(), text)
-        
-        # Feature-Daten aktualisieren
-        updated_feat = self.layer_manager.layer.getFeature(self.feat.id())
-        if updated_feat.isValid():
-            self.feat = updated_feat
+        # Label im Edit-Buffer aktualisieren, gespeichert wird nach der Tipp-Pause
+        self._change_attribute("label", text)
                 
     def on_show_label_toggle(self, state):
         """Schaltet die Label-Anzeige ein/aus"""
-        if not hasattr(self, 'feat') or not self.feat:
-            return
-            
-        show_label = state == Qt.Checked
-        self.layer_manager.toggle_label_visibility(self.feat.id(), show_label)
+        self._change_attribute("show_label", state == Qt.Checked)
         
     def hideEvent(self, event):
+        # Gepufferte Änderungen speichern
+        self._flush_edits()
+        
         # Verschieben-Modus deaktivieren wenn Dock geschlossen wird
         if hasattr(self, 'layer_manager') and hasattr(self.layer_manager, 'move_tool'):
             self.layer_manager.move_tool.set_move_mode(False)
@@ -481,14 +407,6 @@ class FeatureDock(QDockWidget):
         # Zeige Platzhalter wenn Dock versteckt wird
         self.show_placeholder()
         
-        # Versuche verbleibende Preview-Datei zu löschen
-        try:
-            if getattr(self, 'last_preview_path', None) and os.path.exists(self.last_preview_path):
-                os.remove(self.last_preview_path)
-                self.last_preview_path = None
-        except Exception:
-            pass
-        
         super().hideEvent(event)
 
 
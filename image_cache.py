@@ -0,0 +1,75 @@
+# image_cache.py
+
+from collections import OrderedDict
+
+
+class ImageCache:
+    """Begrenzter LRU-Cache für gerasterte Symbolbilder (QPixmap).
+
+    Schlüssel ist ``(Symbol-Hash, Größe in Pixeln, devicePixelRatio)``, so
+    dass jedes Symbol pro Größe nur einmal dekodiert wird - egal ob im
+    Symbolbaum, in der Marker-Vorschau oder als Drag-Pixmap. Übersteigen die
+    Bilder das Speicherbudget, werden die am längsten ungenutzten verdrängt.
+    Nur im GUI-Thread verwenden.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # Schlüssel -> (QPixmap, Bytes)
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(content_hash, size, dpr=1.0):
+        return (content_hash, int(size), float(dpr))
+
+    @staticmethod
+    def _cost(pixmap):
+        return max(1, pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8)
+
+    def get(self, key):
+        """Liefert das Bild zu einem Schlüssel oder None (zählt Treffer/Fehlgriffe)."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, pixmap):
+        """Legt ein Bild ab und verdrängt bei Bedarf die ältesten Einträge."""
+        if pixmap is None or pixmap.isNull():
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._total_bytes -= old[1]
+        cost = self._cost(pixmap)
+        self._entries[key] = (pixmap, cost)
+        self._total_bytes += cost
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            _, (_, evicted_cost) = self._entries.popitem(last=False)
+            self._total_bytes -= evicted_cost
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._total_bytes = 0
+
+    def stats(self):
+        """Kennzahlen für Diagnose und Tests."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,142 @@
+# instrumentation.py
+
+import functools
+import json
+import math
+import time
+from collections import deque
+
+
+class _NullSpan:
+    """Span ohne Wirkung, solange die Messung ausgeschaltet ist."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("recorder", "name", "start")
+
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.recorder.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Instrumentation:
+    """Benannte Zeitmessungen (Spans) und Zähler für die heißen Pfade des Plugins.
+
+    Ausgeschaltet kostet ein Span nur die Abfrage von ``enabled``. Pro Name
+    werden die letzten ``MAX_SAMPLES`` Dauern gehalten, daraus berechnet
+    ``stats()`` Median (p50) und p95.
+    """
+
+    MAX_SAMPLES = 1000
+
+    def __init__(self, enabled=False, debug_output=False):
+        self.enabled = enabled
+        # DEBUG-Ausgaben der gemessenen Pfade (Konsolen-I/O ginge sonst in die Messwerte ein)
+        self.debug_output = debug_output
+        self._samples = {}  # Name -> deque der Dauern in Sekunden
+        self._span_counts = {}  # Name -> Anzahl aller Messungen (auch verdrängter)
+        self._counters = {}  # Name -> Zählerstand
+        self._started = time.time()
+
+    def span(self, name):
+        """Context-Manager, der die Dauer des Blocks unter ``name`` erfasst."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def debug(self, message):
+        """DEBUG-Ausgabe aus einem gemessenen Pfad, nur wenn ``debug_output`` gesetzt ist."""
+        if self.debug_output:
+            print(message)
+
+    def timed(self, name):
+        """Dekorator: misst jeden Aufruf der Funktion als Span ``name``."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(name, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def record(self, name, seconds):
+        samples = self._samples.get(name)
+        if samples is None:
+            samples = self._samples[name] = deque(maxlen=self.MAX_SAMPLES)
+        samples.append(seconds)
+        self._span_counts[name] = self._span_counts.get(name, 0) + 1
+
+    def count(self, name, amount=1):
+        """Erhöht einen Zähler (nur bei eingeschalteter Messung)."""
+        if self.enabled:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def reset(self):
+        self._samples.clear()
+        self._span_counts.clear()
+        self._counters.clear()
+        self._started = time.time()
+
+    @staticmethod
+    def _percentile(sorted_values, fraction):
+        """Perzentil nach dem Nearest-Rank-Verfahren."""
+        rank = max(1, math.ceil(fraction * len(sorted_values)))
+        return sorted_values[rank - 1]
+
+    def stats(self):
+        """Kennzahlen je Span (Millisekunden) und alle Zählerstände."""
+        spans = {}
+        for name, samples in self._samples.items():
+            values = sorted(samples)
+            if not values:
+                continue
+            spans[name] = {
+                "count": self._span_counts.get(name, len(values)),
+                "p50_ms": self._percentile(values, 0.50) * 1000.0,
+                "p95_ms": self._percentile(values, 0.95) * 1000.0,
+                "max_ms": values[-1] * 1000.0,
+                "mean_ms": sum(values) / len(values) * 1000.0,
+            }
+        return {"spans": spans, "counters": dict(self._counters)}
+
+    def export_json(self, path, extra=None):
+        """Schreibt die Kennzahlen als JSON (z.B. als Anhang für Fehlerberichte)."""
+        data = {
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self._started)),
+            "exported": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "enabled": self.enabled,
+        }
+        data.update(self.stats())
+        if extra:
+            data.update(extra)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+
+
+# Gemeinsame Instanz für alle Module des Plugins (ausgeschaltet bis zur Aktivierung)
+instrumentation = Instrumentation()
@@ -0,0 +1,57 @@
+# marker_ghost.py
+
+from PyQt5.QtCore import Qt, QRectF
+from PyQt5.QtGui import QColor, QPen
+from PyQt5.QtSvg import QSvgRenderer
+from qgis.core import QgsRectangle
+from qgis.gui import QgsMapCanvasItem
+
+
+class MarkerGhostItem(QgsMapCanvasItem):
+    """Halbtransparente Vorschau eines Markers während des Verschiebens.
+
+    Das Item liegt nur in der Szene des Map-Canvas und folgt dem Cursor,
+    ohne den Layer zu verändern oder Kartenebenen neu zu zeichnen. Die
+    Geometrie wird erst beim Loslassen einmalig geschrieben.
+    """
+
+    OPACITY = 0.6
+
+    def __init__(self, canvas, svg_file, size, scale_with_map):
+        super().__init__(canvas)
+        self.canvas = canvas
+        self.size = size
+        self.scale_with_map = scale_with_map
+        self.renderer = QSvgRenderer(svg_file) if svg_file else None
+        if self.renderer is not None and not self.renderer.isValid():
+            self.renderer = None
+        self.setZValue(1000)
+
+    def _size_in_map_units(self):
+        """Symbolgröße in Map Units (scale_with_map: Größe in Millimetern am Bildschirm)."""
+        if not self.scale_with_map:
+            return self.size
+        dpi = self.canvas.mapSettings().outputDpi()
+        return self.size * dpi / 25.4 * self.canvas.mapUnitsPerPixel()
+
+    def set_center(self, point):
+        """Verschiebt die Vorschau auf die angegebene Kartenposition."""
+        half = self._size_in_map_units() / 2.0
+        self.setRect(QgsRectangle(point.x() - half, point.y() - half,
+                                  point.x() + half, point.y() + half))
+
+    def paint(self, painter, option=None, widget=None):
+        rect = self.boundingRect().adjusted(1, 1, 0, 0)
+        painter.setOpacity(self.OPACITY)
+        if self.renderer is not None:
+            self.renderer.render(painter, QRectF(rect))
+        else:
+            # Ohne gültiges SVG nur den Umriss des Symbols anzeigen
+            painter.setPen(QPen(QColor(0, 0, 255), 2, Qt.DashLine))
+            painter.drawRect(rect)
+
+    def remove(self):
+        """Entfernt die Vorschau aus dem Canvas."""
+        scene = self.canvas.scene()
+        if scene is not None:
+            scene.removeItem(self)
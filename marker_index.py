@@ -0,0 +1,109 @@
+# marker_index.py
+
+import math
+from qgis.core import QgsSpatialIndex, QgsFeature, QgsGeometry, QgsPointXY, QgsRectangle
+
+from .instrumentation import instrumentation
+
+
+class MarkerIndex:
+    """Räumlicher Index der Marker-Positionen und -Größen für die Trefferprüfung.
+
+    Der Index hängt am ``MarkerStore``: er wird beim Anmelden bzw. Neuaufbau
+    des Speichers gefüllt und danach nur über dessen Änderungsmeldungen
+    inkrementell gepflegt. Eine Trefferprüfung fragt nur die Kandidaten im
+    Umkreis der größten Toleranz ab, statt alle Features im sichtbaren
+    Ausschnitt zu laden.
+    """
+
+    MIN_TOLERANCE = 10.0  # Mindesttoleranz in Map Units
+    DEFAULT_SIZE = 30.0   # Größe für Features ohne gültiges size-Attribut
+
+    def __init__(self, store):
+        self._index = QgsSpatialIndex()
+        self._markers = {}  # fid -> (x, y, size)
+        self._max_size = 0.0
+        self._max_size_dirty = False
+        store.subscribe(self)
+
+    @classmethod
+    def tolerance_for_size(cls, size):
+        """Toleranz für die Feature-Erkennung: halbe Symbolgröße, mindestens MIN_TOLERANCE."""
+        return max(size * 0.5, cls.MIN_TOLERANCE)
+
+    # --- Meldungen des MarkerStore ---
+
+    def store_reset(self, store):
+        """Baut den Index vollständig aus dem Speicher auf."""
+        self._index = QgsSpatialIndex()
+        self._markers = {}
+        self._max_size = 0.0
+        self._max_size_dirty = False
+        for record in store.records():
+            self.record_changed(record)
+
+    def record_changed(self, record):
+        if record.x is None:
+            self._remove(record.fid)
+            return
+        size = record.size if record.size and record.size > 0 else self.DEFAULT_SIZE
+        self._insert(record.fid, record.x, record.y, size)
+
+    def record_removed(self, fid):
+        self._remove(fid)
+
+    # --- Pflege ---
+
+    def _insert(self, fid, x, y, size):
+        if fid in self._markers:
+            self._remove(fid)
+        self._markers[fid] = (x, y, size)
+        self._index.addFeature(fid, QgsRectangle(x, y, x, y))
+        if size > self._max_size:
+            self._max_size = size
+
+    def _remove(self, fid):
+        marker = self._markers.pop(fid, None)
+        if marker is None:
+            return
+        x, y, size = marker
+        index_feature = QgsFeature(fid)
+        index_feature.setGeometry(QgsGeometry.fromPointXY(QgsPointXY(x, y)))
+        self._index.deleteFeature(index_feature)
+        if size >= self._max_size:
+            self._max_size_dirty = True
+
+    def _current_max_size(self):
+        if self._max_size_dirty:
+            self._max_size = max((m[2] for m in self._markers.values()), default=0.0)
+            self._max_size_dirty = False
+        return self._max_size
+
+    @instrumentation.timed("hit_test")
+    def hit_test(self, point):
+        """Liefert die ID des nächstgelegenen Markers innerhalb seiner Toleranz oder None.
+
+        Args:
+            point (QgsPointXY): Position in Layer-Koordinaten
+        """
+        if not self._markers:
+            return None
+        radius = self.tolerance_for_size(self._current_max_size())
+        px, py = point.x(), point.y()
+        search = QgsRectangle(px - radius, py - radius, px + radius, py + radius)
+
+        closest_fid = None
+        min_distance = float('inf')
+        for fid in self._index.intersects(search):
+            marker = self._markers.get(fid)
+            if marker is None:
+                continue
+            x, y, size = marker
+            distance = math.hypot(x - px, y - py)
+            if distance < min_distance and distance < self.tolerance_for_size(size):
+                min_distance = distance
+                closest_fid = fid
+        return closest_fid
+
+    def __len__(self):
+        return len(self._markers)
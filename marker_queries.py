@@ -0,0 +1,83 @@
+# marker_queries.py
+
+from qgis.core import QgsFeature, QgsFeatureRequest
+
+
+class MarkerQueries:
+    """Benannte Abfragen auf den Marker-Layer, die nur die benötigten Spalten laden.
+
+    ``svg_content`` kann bei alten Features mehrere zehn KB groß sein.
+    Index, Trefferprüfung, Größenberechnung und Renderer lesen deshalb nur
+    Geometrie bzw. die wenigen Attribute, die sie brauchen. Die Feldindizes
+    jeder Abfrage werden pro Layer zwischengespeichert und bei
+    Schemaänderungen (``updatedFields``) verworfen.
+    """
+
+    # Name -> (Attribute, mit Geometrie)
+    QUERIES = {
+        # Zuordnung Feature-ID <-> unique_id
+        "ids": (("unique_id",), False),
+        # Symbol eines Features (Renderer-Kategorien, SVG-Cache)
+        "styling": (("name", "svg_path", "svg_hash", "size", "scale_with_map", "unique_id"), False),
+        # MarkerStore (Index, Kennzahlen, Marker-Dock, Verschieben; alles außer dem eingebetteten SVG-Inhalt)
+        "marker": (("name", "svg_path", "svg_hash", "size", "scale_with_map", "unique_id", "label", "show_label"), True),
+        # Eingebetteter SVG-Inhalt alter Features (nur gezielt pro Feature)
+        "svg_content": (("svg_content",), False),
+    }
+
+    def __init__(self, layer=None):
+        self.layer = None
+        self._indices = {}
+        self.set_layer(layer)
+
+    def set_layer(self, layer):
+        if self.layer is not None:
+            try:
+                self.layer.updatedFields.disconnect(self._invalidate)
+            except (TypeError, RuntimeError):
+                # Layer wurde bereits gelöscht
+                pass
+        self.layer = layer
+        self._indices = {}
+        if layer is not None:
+            layer.updatedFields.connect(self._invalidate)
+
+    def _invalidate(self):
+        self._indices = {}
+
+    def attribute_indices(self, name):
+        """Feldindizes einer Abfrage (Felder, die der Layer nicht hat, entfallen)."""
+        indices = self._indices.get(name)
+        if indices is None:
+            fields = self.layer.fields()
+            attributes, _ = self.QUERIES[name]
+            indices = [idx for idx in (fields.indexFromName(attribute) for attribute in attributes) if idx >= 0]
+            self._indices[name] = indices
+        return indices
+
+    def request(self, name):
+        """QgsFeatureRequest der Abfrage (nur deren Attribute, Geometrie nur bei Bedarf)."""
+        _, with_geometry = self.QUERIES[name]
+        request = QgsFeatureRequest().setSubsetOfAttributes(self.attribute_indices(name))
+        if not with_geometry:
+            request.setFlags(QgsFeatureRequest.NoGeometry)
+        return request
+
+    def features(self, name):
+        """Alle Features des Layers mit den Spalten der Abfrage."""
+        return self.layer.getFeatures(self.request(name))
+
+    def feature(self, name, fid):
+        """Ein Feature mit den Spalten der Abfrage (ungültiges QgsFeature, wenn es fehlt)."""
+        for feat in self.layer.getFeatures(self.request(name).setFilterFid(fid)):
+            return feat
+        return QgsFeature()
+
+    def svg_content(self, fid):
+        """Lädt nur den eingebetteten SVG-Inhalt eines Features nach (oder None)."""
+        if self.layer is None or self.layer.fields().indexFromName("svg_content") < 0:
+            return None
+        feat = self.feature("svg_content", fid)
+        if not feat.isValid():
+            return None
+        return feat.attribute("svg_content") or None
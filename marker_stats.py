@@ -0,0 +1,124 @@
+# marker_stats.py
+
+import bisect
+import os
+from collections import Counter
+
+
+class MarkerStatistics:
+    """Inkrementell gepflegte Kennzahlen des Marker-Layers.
+
+    Kleinste/größte/mittlere Symbolgröße sowie Anzahl je Symbol und je
+    Ordner der Bibliothek. Wie der ``MarkerIndex`` hängt alles am
+    ``MarkerStore``: aufgebaut beim Anmelden bzw. Neuaufbau des Speichers,
+    danach nur über dessen Änderungsmeldungen gepflegt; Abfragen lesen nie
+    den Layer.
+    """
+
+    def __init__(self, store):
+        self._markers = {}  # fid -> (size oder None, Symbol, Ordner)
+        self._sizes = []  # sortierte gültige Größen (> 0)
+        self._symbols = Counter()
+        self._folders = Counter()
+        store.subscribe(self)
+
+    # --- Meldungen des MarkerStore ---
+
+    def store_reset(self, store):
+        """Baut alle Kennzahlen vollständig aus dem Speicher auf."""
+        self._markers = {}
+        self._sizes = []
+        self._symbols = Counter()
+        self._folders = Counter()
+        for record in store.records():
+            self.record_changed(record)
+
+    def record_changed(self, record):
+        self._insert(record.fid, self._size(record.size), record.name or None,
+                     self._folder(record.svg_path))
+
+    def record_removed(self, fid):
+        self._remove(fid)
+
+    # --- Pflege ---
+
+    @staticmethod
+    def _size(value):
+        try:
+            size = float(value)
+        except (TypeError, ValueError):
+            return None
+        return size if size > 0 else None
+
+    @staticmethod
+    def _folder(svg_path):
+        """Ordner der Bibliothek aus dem SVG-Pfad (z.B. svgs/THW_Einheiten/Zug.svg -> THW_Einheiten)."""
+        if not svg_path:
+            return None
+        return os.path.basename(os.path.dirname(str(svg_path).replace("\\", "/"))) or None
+
+    def _insert(self, fid, size, symbol, folder):
+        if fid in self._markers:
+            self._remove(fid)
+        self._markers[fid] = (size, symbol, folder)
+        if size is not None:
+            bisect.insort(self._sizes, size)
+        if symbol:
+            self._symbols[symbol] += 1
+        if folder:
+            self._folders[folder] += 1
+
+    def _remove(self, fid):
+        marker = self._markers.pop(fid, None)
+        if marker is None:
+            return
+        size, symbol, folder = marker
+        if size is not None:
+            del self._sizes[bisect.bisect_left(self._sizes, size)]
+        for counter, key in ((self._symbols, symbol), (self._folders, folder)):
+            if key:
+                counter[key] -= 1
+                if counter[key] <= 0:
+                    del counter[key]
+
+    # --- Abfragen (ohne Zugriff auf den Layer) ---
+
+    def count(self):
+        return len(self._markers)
+
+    def min_size(self):
+        """Kleinste gültige Symbolgröße oder None."""
+        return self._sizes[0] if self._sizes else None
+
+    def max_size(self):
+        """Größte gültige Symbolgröße oder None."""
+        return self._sizes[-1] if self._sizes else None
+
+    def median_size(self):
+        """Median der gültigen Symbolgrößen oder None."""
+        n = len(self._sizes)
+        if not n:
+            return None
+        middle = n // 2
+        if n % 2:
+            return self._sizes[middle]
+        return (self._sizes[middle - 1] + self._sizes[middle]) / 2.0
+
+    def symbol_counts(self):
+        """Anzahl der Marker je Symbol (Dateiname)."""
+        return dict(self._symbols)
+
+    def folder_counts(self):
+        """Anzahl der Marker je Ordner der Bibliothek (Organisation/Kategorie)."""
+        return dict(self._folders)
+
+    def summary(self):
+        """Kennzahlen für Statusanzeigen (z.B. das Diagnose-Dock)."""
+        return {
+            "count": self.count(),
+            "min_size": self.min_size(),
+            "median_size": self.median_size(),
+            "max_size": self.max_size(),
+            "symbols": len(self._symbols),
+            "folders": len(self._folders),
+        }
@@ -0,0 +1,251 @@
+# marker_store.py
+
+from qgis.core import QgsFeature, QgsGeometry, QgsPointXY, NULL
+
+from .marker_queries import MarkerQueries
+
+
+def _value(value):
+    """Attributwert ohne QVariant-NULL."""
+    if value is None or value == NULL:
+        return None
+    return value
+
+
+class MarkerRecord:
+    """Kompakter Datensatz eines Markers (ohne SVG-Inhalt)."""
+
+    __slots__ = ("fid", "unique_id", "x", "y", "size", "scale_with_map", "show_label",
+                 "label", "svg_hash", "svg_path", "name")
+
+    # Attribute, die 1:1 aus gleichnamigen Layer-Feldern kommen
+    FIELDS = ("unique_id", "size", "scale_with_map", "show_label", "label", "svg_hash", "svg_path", "name")
+
+    def __init__(self, fid, x=None, y=None):
+        self.fid = fid
+        self.x = x
+        self.y = y
+        for name in self.FIELDS:
+            setattr(self, name, None)
+
+    def set_field(self, name, value):
+        value = _value(value)
+        if name in ("scale_with_map", "show_label"):
+            value = bool(value)
+        elif name == "size" and value is not None:
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                value = None
+        setattr(self, name, value)
+
+    def point(self):
+        return QgsPointXY(self.x, self.y)
+
+
+class MarkerStore:
+    """Spiegel aller Marker im Speicher für die Lesezugriffe der Werkzeuge.
+
+    Enthält pro Marker Position, Größe, Flags, Label und Symbolverweis
+    (``MarkerRecord``) sowie die Zuordnungen Feature-ID -> Datensatz und
+    unique_id -> Feature-ID. Wird einmal beim Verbinden mit dem Layer
+    aufgebaut und danach über die Edit-Signale gepflegt, sodass Klicken,
+    Verschieben und Auswahl den Data-Provider (SQLite) nicht mehr abfragen.
+
+    Der Speicher ist der einzige Abnehmer der Layer-Signale. Abgeleitete
+    Strukturen (``MarkerIndex``, ``MarkerStatistics``) melden sich mit
+    ``subscribe`` an und werden über ``store_reset(store)``,
+    ``record_changed(record)`` und ``record_removed(fid)`` benachrichtigt;
+    auch temporäre Feature-IDs und deren Ersetzung werden nur hier verwaltet.
+    """
+
+    def __init__(self):
+        self.layer = None
+        self.queries = MarkerQueries()
+        self._records = {}  # fid -> MarkerRecord
+        self._by_uid = {}  # unique_id -> fid
+        self._field_names = []  # Feldindex -> Name (für die Edit-Signale)
+        self._field_index = {}  # Name -> Feldindex (für feature())
+        self._listeners = []  # abgeleitete Strukturen (Index, Kennzahlen)
+
+    def subscribe(self, listener):
+        """Meldet eine abgeleitete Struktur an; sie wird sofort mit dem aktuellen Stand gefüllt."""
+        self._listeners.append(listener)
+        listener.store_reset(self)
+
+    def set_layer(self, layer):
+        """Verbindet den Speicher mit einem (neuen) Layer und baut ihn neu auf."""
+        if self.layer is not None:
+            try:
+                self.layer.featureAdded.disconnect(self._on_feature_added)
+                self.layer.featureDeleted.disconnect(self._on_feature_deleted)
+                self.layer.geometryChanged.disconnect(self._on_geometry_changed)
+                self.layer.attributeValueChanged.disconnect(self._on_attribute_value_changed)
+                self.layer.committedFeaturesAdded.disconnect(self._on_committed_features_added)
+                self.layer.afterRollBack.disconnect(self.rebuild)
+                self.layer.updatedFields.disconnect(self._on_fields_changed)
+            except (TypeError, RuntimeError):
+                # Layer wurde bereits gelöscht
+                pass
+        self.layer = layer
+        self.queries.set_layer(layer)
+        if layer is not None:
+            layer.featureAdded.connect(self._on_feature_added)
+            layer.featureDeleted.connect(self._on_feature_deleted)
+            layer.geometryChanged.connect(self._on_geometry_changed)
+            layer.attributeValueChanged.connect(self._on_attribute_value_changed)
+            layer.committedFeaturesAdded.connect(self._on_committed_features_added)
+            layer.afterRollBack.connect(self.rebuild)
+            layer.updatedFields.connect(self._on_fields_changed)
+        self.rebuild()
+
+    def rebuild(self):
+        """Lädt alle Marker neu aus dem Layer (nur die Spalten der Abfrage "marker")."""
+        self._records = {}
+        self._by_uid = {}
+        self._field_names = []
+        self._field_index = {}
+        if self.layer is not None:
+            self._on_fields_changed()
+            for feat in self.queries.features("marker"):
+                self._insert_feature(feat, notify=False)
+        for listener in self._listeners:
+            listener.store_reset(self)
+
+    # --- Pflege ---
+
+    def _notify_changed(self, record):
+        for listener in self._listeners:
+            listener.record_changed(record)
+
+    def _notify_removed(self, fid):
+        for listener in self._listeners:
+            listener.record_removed(fid)
+
+    def _insert_feature(self, feat, notify=True):
+        geom = feat.geometry()
+        if geom is None or geom.isEmpty():
+            x = y = None
+        else:
+            point = geom.asPoint()
+            x, y = point.x(), point.y()
+        record = MarkerRecord(feat.id(), x, y)
+        names = feat.fields().names()
+        for name in MarkerRecord.FIELDS:
+            if name in names:
+                record.set_field(name, feat.attribute(name))
+        self._remove(record.fid, notify=False)
+        self._records[record.fid] = record
+        if record.unique_id:
+            self._by_uid[record.unique_id] = record.fid
+        if notify:
+            self._notify_changed(record)
+
+    def _remove(self, fid, notify=True):
+        record = self._records.pop(fid, None)
+        if record is None:
+            return
+        if record.unique_id and self._by_uid.get(record.unique_id) == fid:
+            del self._by_uid[record.unique_id]
+        if notify:
+            self._notify_removed(fid)
+
+    def _on_fields_changed(self):
+        self._field_names = self.layer.fields().names()
+        self._field_index = {name: idx for idx, name in enumerate(self._field_names)}
+
+    def _on_feature_added(self, fid):
+        feat = self.queries.feature("marker", fid)
+        if feat.isValid():
+            self._insert_feature(feat)
+
+    def _on_feature_deleted(self, fid):
+        self._remove(fid)
+
+    def _on_geometry_changed(self, fid, geometry):
+        record = self._records.get(fid)
+        if record is None:
+            return
+        if geometry is None or geometry.isEmpty():
+            record.x = record.y = None
+        else:
+            point = geometry.asPoint()
+            record.x, record.y = point.x(), point.y()
+        self._notify_changed(record)
+
+    def _on_attribute_value_changed(self, fid, idx, value):
+        record = self._records.get(fid)
+        if record is None or idx >= len(self._field_names):
+            return
+        name = self._field_names[idx]
+        if name not in MarkerRecord.FIELDS:
+            return
+        if name == "unique_id":
+            if record.unique_id and self._by_uid.get(record.unique_id) == fid:
+                del self._by_uid[record.unique_id]
+            record.set_field(name, value)
+            if record.unique_id:
+                self._by_uid[record.unique_id] = fid
+        else:
+            record.set_field(name, value)
+        self._notify_changed(record)
+
+    def _on_committed_features_added(self, layer_id, features):
+        # Temporäre (negative) IDs aus dem Edit-Buffer durch die endgültigen ersetzen
+        for fid in [fid for fid in self._records if fid < 0]:
+            self._remove(fid)
+        for feat in features:
+            self._insert_feature(feat)
+
+    def remap_fids(self, remap):
+        """Übernimmt geänderte Feature-IDs (alt -> neu), z.B. nach dem Speichern neuer Marker."""
+        for old_fid, new_fid in remap.items():
+            record = self._records.get(old_fid)
+            if record is None:
+                continue
+            self._remove(old_fid)
+            record.fid = new_fid
+            self._remove(new_fid)
+            self._records[new_fid] = record
+            if record.unique_id:
+                self._by_uid[record.unique_id] = new_fid
+            self._notify_changed(record)
+
+    # --- Lesezugriffe (ohne Data-Provider) ---
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, fid):
+        return fid in self._records
+
+    def records(self):
+        """Alle Datensätze (für den Neuaufbau abgeleiteter Strukturen)."""
+        return self._records.values()
+
+    def get(self, fid):
+        """Datensatz zu einer Feature-ID oder None."""
+        return self._records.get(fid)
+
+    def fid_for(self, unique_id):
+        """Feature-ID zu einer unique_id oder None."""
+        return self._by_uid.get(unique_id)
+
+    def feature(self, fid):
+        """Baut aus dem Datensatz ein QgsFeature (ohne svg_content) für Docks und Werkzeuge.
+
+        Liefert ein ungültiges QgsFeature, wenn der Marker nicht existiert.
+        """
+        record = self._records.get(fid)
+        if record is None or self.layer is None:
+            return QgsFeature()
+        feat = QgsFeature(self.layer.fields(), fid)
+        for name in MarkerRecord.FIELDS:
+            idx = self._field_index.get(name)
+            if idx is not None:
+                value = getattr(record, name)
+                feat.setAttribute(idx, NULL if value is None else value)
+        if record.x is not None:
+            feat.setGeometry(QgsGeometry.fromPointXY(record.point()))
+        feat.setValid(True)
+        return feat
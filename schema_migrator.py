@@ -0,0 +1,237 @@
+# schema_migrator.py
+
+import json
+import sqlite3
+import uuid
+
+from .svg_store import SvgBlobStore
+
+# Felder der Marker-Tabelle in der Reihenfolge des Layers (Name, SQLite-Typ)
+MARKER_FIELDS = (
+    ("name", "TEXT"),
+    ("svg_path", "TEXT"),
+    ("svg_content", "TEXT"),  # Altes Feld für eingebetteten SVG-Inhalt
+    ("svg_hash", "TEXT"),  # Hash des SVG-Inhalts in der Tabelle svg_blobs
+    ("size", "REAL"),
+    ("scale_with_map", "BOOLEAN"),
+    ("unique_id", "TEXT"),  # Eindeutige ID für jedes Zeichen
+    ("label", "TEXT"),  # Label-Text für das Zeichen
+    ("show_label", "BOOLEAN"),  # Ob das Label angezeigt werden soll
+)
+
+
+class SchemaMigrator:
+    """Versionierte Migration der Marker-Tabelle direkt in der GeoPackage.
+
+    Die Schema-Version steht in ``gpkg_metadata`` (Erweiterung
+    ``gpkg_metadata``, bezogen auf die Marker-Tabelle). Fehlende Schritte
+    laufen als ``ALTER TABLE ... ADD COLUMN`` / ``UPDATE`` in einer einzigen
+    SQLite-Transaktion - ohne die Features über Python zu kopieren und ohne
+    temporäre Kopie der Datei. Neue Spalten mit Standardwert kosten dabei
+    keine Zeit pro Feature. Fehlt der räumliche Index (R-Tree), wird er
+    danach über OGR angelegt.
+    """
+
+    VERSION = 3
+    METADATA_URI = "urn:thw-toolbox:schema"
+
+    def __init__(self, gpkg_path, table_name="taktische_zeichen"):
+        self.gpkg_path = gpkg_path
+        self.table_name = table_name
+        self.steps = (
+            (1, "Grundfelder", self._step_base_fields),
+            (2, "Eindeutige IDs und Labels", self._step_ids_and_labels),
+            (3, "SVG-Inhalte in svg_blobs", self._step_svg_blobs),
+        )
+
+    def _connect(self):
+        conn = sqlite3.connect(self.gpkg_path, timeout=10)
+        # Transaktionen selbst steuern (BEGIN/COMMIT), auch für ALTER TABLE
+        conn.isolation_level = None
+        return conn
+
+    # --- Schema-Version in gpkg_metadata ---
+
+    @staticmethod
+    def _table_exists(conn, name):
+        return conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+        ).fetchone() is not None
+
+    def _columns(self, conn):
+        return {row[1] for row in conn.execute(f'PRAGMA table_info("{self.table_name}")')}
+
+    def _metadata_id(self, conn):
+        if not self._table_exists(conn, "gpkg_metadata") or not self._table_exists(conn, "gpkg_metadata_reference"):
+            return None
+        row = conn.execute(
+            "SELECT m.id FROM gpkg_metadata m JOIN gpkg_metadata_reference r ON r.md_file_id = m.id "
+            "WHERE m.md_standard_uri = ? AND r.reference_scope = 'table' AND r.table_name = ?",
+            (self.METADATA_URI, self.table_name)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _read_version(self, conn):
+        md_id = self._metadata_id(conn)
+        if md_id is None:
+            return 0
+        metadata = conn.execute("SELECT metadata FROM gpkg_metadata WHERE id = ?", (md_id,)).fetchone()[0]
+        try:
+            return int(json.loads(metadata).get("schema_version", 0))
+        except (ValueError, TypeError, AttributeError):
+            return 0
+
+    @staticmethod
+    def _ensure_metadata_tables(conn):
+        """Legt die Tabellen der GeoPackage-Erweiterung gpkg_metadata an (wie in der Spezifikation)."""
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS gpkg_metadata ("
+            "id INTEGER CONSTRAINT m_pk PRIMARY KEY ASC NOT NULL, "
+            "md_scope TEXT NOT NULL DEFAULT 'dataset', "
+            "md_standard_uri TEXT NOT NULL, "
+            "mime_type TEXT NOT NULL DEFAULT 'text/xml', "
+            "metadata TEXT NOT NULL DEFAULT '')"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS gpkg_metadata_reference ("
+            "reference_scope TEXT NOT NULL, "
+            "table_name TEXT, "
+            "column_name TEXT, "
+            "row_id_value INTEGER, "
+            "timestamp DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ','now')), "
+            "md_file_id INTEGER NOT NULL, "
+            "md_parent_id INTEGER, "
+            "CONSTRAINT crmr_mfi_fk FOREIGN KEY (md_file_id) REFERENCES gpkg_metadata(id), "
+            "CONSTRAINT crmr_mpi_fk FOREIGN KEY (md_parent_id) REFERENCES gpkg_metadata(id))"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS gpkg_extensions ("
+            "table_name TEXT, column_name TEXT, extension_name TEXT NOT NULL, "
+            "definition TEXT NOT NULL, scope TEXT NOT NULL, "
+            "CONSTRAINT ge_tce UNIQUE (table_name, column_name, extension_name))"
+        )
+        for table in ("gpkg_metadata", "gpkg_metadata_reference"):
+            conn.execute(
+                "INSERT OR IGNORE INTO gpkg_extensions (table_name, column_name, extension_name, definition, scope) "
+                "VALUES (?, NULL, 'gpkg_metadata', 'http://www.geopackage.org/spec120/#extension_metadata', 'read-write')",
+                (table,)
+            )
+
+    def _write_version(self, conn, version):
+        metadata = json.dumps({"schema_version": version})
+        md_id = self._metadata_id(conn)
+        if md_id is not None:
+            conn.execute("UPDATE gpkg_metadata SET metadata = ? WHERE id = ?", (metadata, md_id))
+            conn.execute(
+                "UPDATE gpkg_metadata_reference SET timestamp = strftime('%Y-%m-%dT%H:%M:%fZ','now') "
+                "WHERE md_file_id = ?", (md_id,)
+            )
+            return
+        self._ensure_metadata_tables(conn)
+        cursor = conn.execute(
+            "INSERT INTO gpkg_metadata (md_scope, md_standard_uri, mime_type, metadata) "
+            "VALUES ('dataset', ?, 'application/json', ?)",
+            (self.METADATA_URI, metadata)
+        )
+        conn.execute(
+            "INSERT INTO gpkg_metadata_reference (reference_scope, table_name, md_file_id) "
+            "VALUES ('table', ?, ?)",
+            (self.table_name, cursor.lastrowid)
+        )
+
+    # --- Migrationsschritte (idempotent, laufen innerhalb der Transaktion) ---
+
+    def _add_missing_columns(self, conn, columns, definitions):
+        existing = self._columns(conn)
+        for name in columns:
+            if name not in existing:
+                conn.execute(f'ALTER TABLE "{self.table_name}" ADD COLUMN "{name}" {definitions[name]}')
+
+    def _step_base_fields(self, conn):
+        self._add_missing_columns(conn, ("name", "svg_path", "svg_content", "size", "scale_with_map"), {
+            "name": "TEXT",
+            "svg_path": "TEXT",
+            "svg_content": "TEXT",
+            "size": "REAL",
+            "scale_with_map": "BOOLEAN DEFAULT 0",
+        })
+
+    def _step_ids_and_labels(self, conn):
+        self._add_missing_columns(conn, ("unique_id", "label", "show_label"), {
+            "unique_id": "TEXT",
+            "label": "TEXT",
+            "show_label": "BOOLEAN DEFAULT 0",
+        })
+        conn.create_function("thw_uuid4", 0, lambda: str(uuid.uuid4()))
+        conn.execute(f'UPDATE "{self.table_name}" SET unique_id = thw_uuid4() WHERE unique_id IS NULL OR unique_id = \'\'')
+        # Standard-Label aus dem SVG-Namen (ohne .svg, Unterstriche als Leerzeichen)
+        conn.execute(
+            f'UPDATE "{self.table_name}" SET label = replace('
+            "CASE WHEN lower(substr(name, -4)) = '.svg' THEN substr(name, 1, length(name) - 4) ELSE name END, "
+            "'_', ' ') WHERE (label IS NULL OR label = '') AND name IS NOT NULL"
+        )
+
+    def _step_svg_blobs(self, conn):
+        self._add_missing_columns(conn, ("svg_hash",), {"svg_hash": "TEXT"})
+        SvgBlobStore(self.gpkg_path).migrate_layer_table(self.table_name, conn)
+
+    # --- Ablauf ---
+
+    def _geometry_column(self, conn):
+        if not self._table_exists(conn, "gpkg_geometry_columns"):
+            return None
+        row = conn.execute(
+            "SELECT column_name FROM gpkg_geometry_columns WHERE table_name = ?", (self.table_name,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _ensure_spatial_index(self, geometry_column):
+        """Legt den R-Tree der Marker-Tabelle über OGR an (inkl. Trigger), falls er fehlt."""
+        try:
+            from osgeo import gdal
+        except ImportError:
+            print("DEBUG: GDAL nicht verfügbar, räumlicher Index wird nicht angelegt")
+            return False
+        dataset = gdal.OpenEx(self.gpkg_path, gdal.OF_VECTOR | gdal.OF_UPDATE)
+        if dataset is None:
+            return False
+        try:
+            dataset.ExecuteSQL(f"SELECT CreateSpatialIndex('{self.table_name}', '{geometry_column}')")
+        finally:
+            dataset = None
+        print(f"DEBUG: Räumlicher Index für {self.table_name} angelegt")
+        return True
+
+    def migrate(self):
+        """Bringt die Marker-Tabelle auf ``VERSION``.
+
+        Returns:
+            int: Schema-Version vor der Migration
+        """
+        conn = self._connect()
+        try:
+            if not self._table_exists(conn, self.table_name):
+                return self.VERSION
+            version = self._read_version(conn)
+            if version < self.VERSION:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    for step_version, description, step in self.steps:
+                        if step_version > version:
+                            print(f"DEBUG: Schema-Migration {step_version}: {description}")
+                            step(conn)
+                    self._write_version(conn, self.VERSION)
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+            geometry_column = self._geometry_column(conn)
+            has_rtree = geometry_column is not None and self._table_exists(
+                conn, f"rtree_{self.table_name}_{geometry_column}"
+            )
+        finally:
+            conn.close()
+
+        if geometry_column is not None and not has_rtree:
+            self._ensure_spatial_index(geometry_column)
+        return version
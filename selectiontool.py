@@ -137,7 +137,7 @@ class SelectionTool(QgsMapTool):
             return
             
         # Hole die aktuelle Größe des Features
-        feature_size = self.selected_feature["size"] if "size" in [field.name() for field in self.layer.fields()] else 30.0
+        feature_size = self._current_size()
         
         # Konvertiere Map Units zu Pixeln
         map_units_per_pixel = self.canvas.mapUnitsPerPixel()
@@ -246,12 +246,33 @@ class SelectionTool(QgsMapTool):
             self.active_handle = handle_index
             self.is_resizing = True
             self.resize_start_pos = event.pos()
-            self.resize_start_size = self.selected_feature["size"]
+            self.resize_start_size = self._current_size()
             self.setCursor(self._get_cursor_for_handle(handle_index))
         else:
             # Klick außerhalb der Resize-Punkte - Feature deselektieren
             self.set_selected_feature(None)
             
+    def _current_fid(self):
+        """Aktuelle Feature-ID des ausgewählten Markers (neue Marker erhalten beim Hintergrund-Speichern eine neue ID)."""
+        feat = self.selected_feature
+        store = getattr(self.layer_manager, 'marker_store', None)
+        if store is None or feat.id() in store:
+            return feat.id()
+        unique_id = feat.attribute("unique_id") if "unique_id" in feat.fields().names() else None
+        fid = store.fid_for(unique_id) if unique_id else None
+        if fid is None:
+            return feat.id()
+        feat.setId(fid)
+        return fid
+
+
+        """Aktuelle Größe des ausgewählten Features aus dem Speicher-Spiegel (ohne Layer-Zugriff)."""
+        store = getattr(self.layer_manager, 'marker_store', None)
+        record = store.get(self._current_fid()) if store is not None else None
+        if record is not None:
+            return record.size or 30.0
+        return self.selected_feature["size"] if "size" in self.selected_feature.fields().names() else 30.0
+
     def canvasReleaseEvent(self, event):
         """Behandelt Mausloslassen"""
         if event.button() == Qt.LeftButton and self.is_resizing:
@@ -290,7 +311,7 @@ class SelectionTool(QgsMapTool):
         
         # Feature-Größe aktualisieren
         if hasattr(self.layer_manager, 'resize_feature'):
-            self.layer_manager.resize_feature(self.selected_feature.id(), new_size)
+            self.layer_manager.resize_feature(self._current_fid(), new_size)
             
         # Bounds neu berechnen
         self._calculate_selection_bounds()
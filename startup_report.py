@@ -0,0 +1,60 @@
+# startup_report.py
+
+import time
+from contextlib import contextmanager
+
+
+class StartupReport:
+    """Misst die Startzeit des Plugins und was davon auf später verschoben wurde.
+
+    ``initGui`` registriert nur Aktionen; alles Weitere (Docks, Layer,
+    Renderer, Aufräumen) wird beim ersten Gebrauch oder im Hintergrund
+    erledigt und hier mit seiner Dauer nachgetragen.
+    """
+
+    def __init__(self):
+        self._created = time.perf_counter()
+        self.timings = {}  # Name -> Sekunden
+        self.deferred = {}  # Name -> Sekunden (None = noch nicht ausgeführt)
+
+    @contextmanager
+    def measure(self, name):
+        """Misst einen Abschnitt des Starts (z.B. ``initGui``)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = time.perf_counter() - start
+
+    def defer(self, name):
+        """Merkt einen Schritt vor, der nicht beim Start ausgeführt wird."""
+        self.deferred.setdefault(name, None)
+
+    @contextmanager
+    def run_deferred(self, name):
+        """Misst einen verschobenen Schritt, wenn er tatsächlich ausgeführt wird."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self.deferred.get(name) is None:
+                self.deferred[name] = time.perf_counter() - start
+
+    def record_deferred(self, name, seconds):
+        """Trägt die Dauer eines anderswo (z.B. in einem QgsTask) gemessenen Schritts nach."""
+        if self.deferred.get(name) is None:
+            self.deferred[name] = seconds
+
+    def lines(self):
+        lines = [f"{name}: {seconds * 1000:.1f} ms" for name, seconds in self.timings.items()]
+        for name, seconds in self.deferred.items():
+            if seconds is None:
+                lines.append(f"{name}: verschoben (noch nicht ausgeführt)")
+            else:
+                lines.append(f"{name}: verschoben, {seconds * 1000:.1f} ms beim ersten Gebrauch")
+        return lines
+
+    def print_report(self):
+        print("DEBUG: Startbericht THW Toolbox:")
+        for line in self.lines():
+            print(f"DEBUG:   {line}")
@@ -0,0 +1,113 @@
+# svg_cache.py
+
+import os
+import time
+
+
+class SvgFileCache:
+    """Persistenter Datei-Cache für SVG-Inhalte, adressiert über den Inhalts-Hash.
+
+    QGIS braucht für SVG-Symbole einen Dateipfad. Jeder unterschiedliche
+    Inhalt wird genau einmal als ``<hash>.svg`` geschrieben und danach nur
+    noch wiederverwendet. Übersteigt der Cache das Größenbudget, werden die
+    am längsten nicht genutzten Dateien gelöscht (LRU) – außer solchen, die
+    vom aktiven Layer referenziert werden (``pin``).
+    """
+
+    def __init__(self, cache_dir, max_bytes=64 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._entries = None  # hash -> [Größe, letzter Zugriff]
+        self._total_bytes = 0
+        self._pinned = set()
+
+    def _load(self):
+        """Liest den Bestand einmalig vom Datenträger (Zugriffszeit = Änderungszeit)."""
+        if self._entries is not None:
+            return
+        self._entries = {}
+        self._total_bytes = 0
+        if not os.path.isdir(self.cache_dir):
+            return
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith(".svg"):
+                stat = entry.stat()
+                self._entries[entry.name[:-4]] = [stat.st_size, stat.st_mtime]
+                self._total_bytes += stat.st_size
+
+    def file_path(self, content_hash):
+        """Pfad der Cache-Datei zu einem Hash (unabhängig davon, ob sie existiert)."""
+        return os.path.join(self.cache_dir, f"{content_hash}.svg")
+
+    def contains(self, content_hash):
+        self._load()
+        return content_hash in self._entries
+
+    def path_for(self, content_hash, svg_content=None, loader=None):
+        """Liefert den Dateipfad zu einem Hash und schreibt die Datei nur, wenn sie fehlt.
+
+        Args:
+            content_hash (str): Inhalts-Hash des SVGs
+            svg_content (str, optional): Inhalt, falls bereits bekannt
+            loader (callable, optional): Liefert den Inhalt bei Bedarf nach (z.B. aus svg_blobs)
+
+        Returns:
+            str: Pfad der Cache-Datei oder None, wenn kein Inhalt verfügbar ist
+        """
+        self._load()
+        path = self.file_path(content_hash)
+        entry = self._entries.get(content_hash)
+        if entry is not None:
+            if os.path.exists(path):
+                entry[1] = time.time()
+                return path
+            # Datei wurde extern gelöscht
+            self._total_bytes -= entry[0]
+            del self._entries[content_hash]
+
+        if svg_content is None and loader is not None:
+            svg_content = loader()
+        if not svg_content:
+            return None
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        data = svg_content.encode("utf-8")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        self._entries[content_hash] = [len(data), time.time()]
+        self._total_bytes += len(data)
+        self.evict()
+        return path
+
+    def pin(self, content_hashes):
+        """Schützt die übergebenen Hashes vor der Verdrängung."""
+        self._pinned.update(h for h in content_hashes if h)
+
+    def unpin_all(self):
+        """Hebt den Schutz aller Hashes auf (z.B. vor einem Layer-Wechsel)."""
+        self._pinned.clear()
+
+    def evict(self):
+        """Löscht die am längsten ungenutzten Dateien, bis das Größenbudget eingehalten ist."""
+        self._load()
+        if self._total_bytes <= self.max_bytes:
+            return
+        candidates = sorted(
+            (h for h in self._entries if h not in self._pinned),
+            key=lambda h: self._entries[h][1]
+        )
+        for content_hash in candidates:
+            if self._total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(self.file_path(content_hash))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                # Datei ist noch gesperrt (z.B. unter Windows), später erneut versuchen
+                print(f"DEBUG: Cache-Datei konnte nicht gelöscht werden: {e}")
+                continue
+            self._total_bytes -= self._entries.pop(content_hash)[0]
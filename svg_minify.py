@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+THW Toolbox Plugin - SVG-Bibliothek verschlanken
+================================================
+
+Entfernt die in jedes Symbol eingebettete Schrift (@font-face mit
+base64-WOFF) und minimiert das Markup der Dateien unter ``svgs/``. Die
+Schrift wird einmalig als TrueType-Datei unter ``fonts/`` abgelegt und vom
+Plugin beim Start registriert.
+
+Vor dem Schreiben wird jede Datei vorher und nachher mit dem Renderer des
+Plugins (QSvgRenderer, gemeinsame Schrift registriert) in den
+Referenzgrößen gerastert; nur pixelgleiche Ergebnisse werden übernommen.
+Für die Prüfung muss das Script mit dem Python-Interpreter von QGIS
+ausgeführt werden.
+
+Verwendung:
+    python svg_minify.py [--svg-dir Ordner] [--font-dir Ordner] [--dry-run]
+
+Beispiele:
+    python svg_minify.py --dry-run
+    python svg_minify.py
+    python svg_minify.py --sizes 16 32 64 256
+"""
+
+import argparse
+import base64
+import importlib
+import os
+import re
+import struct
+import sys
+import zlib
+
+# Ohne Bildschirm lauffähig (z.B. auf Build-Rechnern)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+PLUGIN_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SVG_DIR = os.path.join(PLUGIN_DIR, "svgs")
+DEFAULT_FONT_DIR = os.path.join(PLUGIN_DIR, "fonts")
+# Größen der Symbolliste, der Vorschau und der Marker-Symbole
+REFERENCE_SIZES = [24, 48, 180, 256]
+
+FONT_FACE_PATTERN = re.compile(r"@font-face\s*\{[^}]*\}", re.S)
+FONT_DATA_PATTERN = re.compile(r"url\(\s*[\"']?data:[^;,]*(?:;[^;,]*)*;base64,([A-Za-z0-9+/=\s]+)[\"']?\s*\)")
+STYLE_PATTERN = re.compile(r"(<style\b[^>]*>)(.*?)(</style>)", re.S)
+TEXT_PATTERN = re.compile(r"<text\b.*?</text>", re.S)
+
+
+def woff_to_sfnt(data):
+    """Wandelt eine WOFF-1.0-Schrift in TrueType/OpenType (sfnt) um.
+
+    Qt lädt WOFF nicht auf allen Plattformen, TrueType dagegen überall.
+    """
+    signature, flavor, _, num_tables = struct.unpack(">4sIIH", data[:14])
+    if signature != b"wOFF":
+        raise ValueError("Keine WOFF-Schrift")
+    tables = []
+    for i in range(num_tables):
+        entry = data[44 + i * 20:44 + (i + 1) * 20]
+        tag, offset, comp_length, orig_length, checksum = struct.unpack(">4sIIII", entry)
+        table = data[offset:offset + comp_length]
+        if comp_length < orig_length:
+            table = zlib.decompress(table)
+        if len(table) != orig_length:
+            raise ValueError(f"Tabelle {tag!r} hat eine unerwartete Länge")
+        tables.append((tag, checksum, table))
+
+    # Offset-Tabelle des sfnt-Formats
+    entry_selector = max(num_tables.bit_length() - 1, 0)
+    search_range = (1 << entry_selector) * 16
+    header = struct.pack(">IHHHH", flavor, num_tables, search_range, entry_selector,
+                         num_tables * 16 - search_range)
+    offset = 12 + 16 * num_tables
+    directory, body = [], []
+    for tag, checksum, table in sorted(tables):
+        directory.append(struct.pack(">4sIII", tag, checksum, offset, len(table)))
+        padded = table + b"\0" * (-len(table) % 4)
+        body.append(padded)
+        offset += len(padded)
+    return header + b"".join(directory) + b"".join(body)
+
+
+def _font_file_name(font_face):
+    """Dateiname der gemeinsamen Schrift aus Familie, Gewicht und Stil (z.B. RobotoSlab-Bold.ttf)."""
+    def css_value(name, default):
+        match = re.search(name + r"\s*:\s*([^;]+);", font_face)
+        return match.group(1).strip().strip("'\"") if match else default
+    family = re.sub(r"[^A-Za-z0-9]", "", css_value("font-family", "Font"))
+    weight = css_value("font-weight", "normal").lower()
+    style = css_value("font-style", "normal").lower()
+    suffix = ("Bold" if weight in ("bold", "700", "800", "900") else "") + ("Italic" if style == "italic" else "")
+    return f"{family}-{suffix or 'Regular'}.ttf"
+
+
+def extract_fonts(svg_text):
+    """Entfernt @font-face-Regeln mit eingebetteten Daten.
+
+    Returns:
+        tuple: (SVG ohne Schriftdaten, {Dateiname: WOFF-Bytes})
+    """
+    fonts = {}
+
+    def strip(match):
+        font_face = match.group(0)
+        data = FONT_DATA_PATTERN.search(font_face)
+        if data is None:
+            # Nur lokale Schrift, nichts eingebettet
+            return font_face
+        fonts[_font_file_name(font_face)] = base64.b64decode(re.sub(r"\s+", "", data.group(1)))
+        return ""
+
+    return FONT_FACE_PATTERN.sub(strip, svg_text), fonts
+
+
+def _minify_css(css):
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};:,])\s*", r"\1", css)
+    return css.replace(";}", "}").strip()
+
+
+def _minify_markup(markup):
+    """Entfernt Leerraum zwischen Tags und doppelte Leerzeichen zwischen Attributen."""
+    markup = re.sub(r">\s+<", "><", markup)
+    markup = re.sub(r"<([\w:.-]+)\s+", r"<\1 ", markup)
+    markup = re.sub(r"\"\s+(?=[\w:.-]+=)", "\" ", markup)
+    return re.sub(r"\s+(/?>)", r"\1", markup)
+
+
+def minify_svg(svg_text):
+    """Entfernt DOCTYPE, Kommentare und überflüssigen Leerraum.
+
+    Der Inhalt von ``<text>``-Elementen bleibt unverändert, weil Leerzeichen
+    dort Teil des dargestellten Textes sind.
+    """
+    svg_text = re.sub(r"<!DOCTYPE[^>]*>", "", svg_text)
+    svg_text = re.sub(r"<!--.*?-->", "", svg_text, flags=re.S)
+
+    def style(match):
+        css = match.group(2)
+        cdata = re.fullmatch(r"\s*<!\[CDATA\[(.*)\]\]>\s*", css, re.S)
+        css = _minify_css(cdata.group(1) if cdata else css)
+        return match.group(1) + (f"<![CDATA[{css}]]>" if cdata else css) + match.group(3)
+
+    svg_text = STYLE_PATTERN.sub(style, svg_text)
+
+    # Platzhalter für Text-Elemente, damit deren Leerraum erhalten bleibt
+    texts = []
+
+    def keep(match):
+        texts.append(match.group(0))
+        return f"<thw-text-{len(texts) - 1}/>"
+
+    svg_text = _minify_markup(TEXT_PATTERN.sub(keep, svg_text)).strip()
+    return re.sub(r"<thw-text-(\d+)/>", lambda m: texts[int(m.group(1))], svg_text) + "\n"
+
+
+def slim_svg(svg_text):
+    """Schriftdaten entfernen und minimieren.
+
+    Returns:
+        tuple: (schlankes SVG, {Dateiname: WOFF-Bytes})
+    """
+    svg_text, fonts = extract_fonts(svg_text)
+    return minify_svg(svg_text), fonts
+
+
+def load_plugin_module():
+    """Importiert den Renderer des Plugins als Paket (die Module nutzen relative Imports)."""
+    sys.path.insert(0, os.path.dirname(PLUGIN_DIR))
+    package = os.path.basename(PLUGIN_DIR)
+    return importlib.import_module(f"{package}.icon_loader")
+
+
+class SvgRenderComparer:
+    """Vergleicht zwei SVG-Fassungen Pixel für Pixel mit dem Renderer des Plugins."""
+
+    def __init__(self, font_dir, sizes):
+        from PyQt5.QtGui import QGuiApplication
+        self.app = QGuiApplication.instance() or QGuiApplication(sys.argv[:1])
+        self.icon_loader = load_plugin_module()
+        self.font_dir = font_dir
+        self.sizes = sizes
+        self.registered = set()
+
+    def register_fonts(self):
+        """Registriert neu extrahierte Schriften (wie das Plugin beim Start)."""
+        if not os.path.isdir(self.font_dir):
+            return
+        new_files = set(os.listdir(self.font_dir)) - self.registered
+        if new_files:
+            self.icon_loader.register_shared_fonts(self.font_dir)
+            self.registered |= new_files
+
+    def identical(self, original, slim):
+        from PyQt5.QtCore import QByteArray
+        for size in self.sizes:
+            before = self.icon_loader.render_svg_image(QByteArray(original.encode("utf-8")), size)
+            after = self.icon_loader.render_svg_image(QByteArray(slim.encode("utf-8")), size)
+            if before != after:
+                return False
+        return True
+
+
+class SvgLibraryMinifier:
+    """Verschlankt alle SVG-Dateien eines Ordners und legt gemeinsame Schriften ab."""
+
+    def __init__(self, svg_dir, font_dir, comparer=None, dry_run=False):
+        self.svg_dir = svg_dir
+        self.font_dir = font_dir
+        self.comparer = comparer
+        self.dry_run = dry_run
+        self.stats = {"files": 0, "changed": 0, "bytes_before": 0, "bytes_after": 0, "fonts": []}
+        self.mismatches = []
+
+    def _svg_files(self):
+        for root, dirs, files in os.walk(self.svg_dir):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(".svg"):
+                    yield os.path.join(root, name)
+
+    def _write_font(self, file_name, woff_data):
+        path = os.path.join(self.font_dir, file_name)
+        if file_name in self.stats["fonts"] and os.path.exists(path):
+            return
+        sfnt = woff_to_sfnt(woff_data)
+        if not self.dry_run:
+            os.makedirs(self.font_dir, exist_ok=True)
+            if not os.path.exists(path):
+                with open(path, "wb") as f:
+                    f.write(sfnt)
+                print(f"Schrift abgelegt: {path} ({len(sfnt) / 1024:.0f} KB)")
+        if file_name not in self.stats["fonts"]:
+            self.stats["fonts"].append(file_name)
+
+    @staticmethod
+    def _write_atomic(path, text):
+        temp_path = path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8", newline="\n") as f:
+            f.write(text)
+        os.replace(temp_path, path)
+
+    def run(self):
+        for path in self._svg_files():
+            with open(path, "r", encoding="utf-8") as f:
+                original = f.read()
+            slim, fonts = slim_svg(original)
+            size_before = len(original.encode("utf-8"))
+            self.stats["files"] += 1
+            self.stats["bytes_before"] += size_before
+            for file_name, woff_data in fonts.items():
+                self._write_font(file_name, woff_data)
+
+            if slim == original:
+                self.stats["bytes_after"] += size_before
+                continue
+            if self.comparer is not None:
+                self.comparer.register_fonts()
+                if not self.comparer.identical(original, slim):
+                    self.mismatches.append(os.path.relpath(path, self.svg_dir))
+                    self.stats["bytes_after"] += size_before
+                    continue
+            self.stats["changed"] += 1
+            self.stats["bytes_after"] += len(slim.encode("utf-8"))
+            if not self.dry_run:
+                self._write_atomic(path, slim)
+        return self.stats
+
+
+def main():
+    """Hauptfunktion."""
+    parser = argparse.ArgumentParser(
+        description="Entfernt eingebettete Schriften aus der SVG-Bibliothek und minimiert die Dateien",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Beispiele:
+  python svg_minify.py --dry-run
+  python svg_minify.py
+  python svg_minify.py --sizes 16 32 64 256
+        """
+    )
+    parser.add_argument("--svg-dir", default=DEFAULT_SVG_DIR, help="SVG-Ordner (Standard: svgs/)")
+    parser.add_argument("--font-dir", default=DEFAULT_FONT_DIR, help="Ordner der gemeinsamen Schriften (Standard: fonts/)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=REFERENCE_SIZES,
+                        help="Referenzgrößen in Pixeln für den Pixelvergleich")
+    parser.add_argument("--dry-run", action="store_true", help="Nur prüfen und Einsparung anzeigen, nichts schreiben")
+    parser.add_argument("--no-verify", action="store_true",
+                        help="Ohne Pixelvergleich schreiben (nicht empfohlen)")
+    args = parser.parse_args()
+
+    comparer = None
+    if not args.no_verify:
+        try:
+            comparer = SvgRenderComparer(args.font_dir, args.sizes)
+        except ImportError as e:
+            print(f"FEHLER: Pixelvergleich nicht möglich ({e}). Mit dem Python von QGIS ausführen oder --no-verify angeben.")
+            sys.exit(2)
+        if args.dry_run:
+            # Für den Vergleich muss die Schrift registriert sein, auch ohne zu schreiben
+            print("Hinweis: Mit --dry-run wird ohne neu extrahierte Schriften verglichen")
+
+    minifier = SvgLibraryMinifier(args.svg_dir, args.font_dir, comparer, args.dry_run)
+    stats = minifier.run()
+
+    before_mb = stats["bytes_before"] / (1024 * 1024)
+    after_mb = stats["bytes_after"] / (1024 * 1024)
+    print(f"{stats['files']} SVG-Dateien, {stats['changed']} verschlankt{' (Probelauf)' if args.dry_run else ''}")
+    print(f"Größe: {before_mb:.1f} MB -> {after_mb:.1f} MB")
+    if stats["fonts"]:
+        print(f"Gemeinsame Schriften: {', '.join(stats['fonts'])}")
+    if minifier.mismatches:
+        print(f"FEHLER: {len(minifier.mismatches)} Dateien rendern abweichend und wurden nicht geändert:")
+        for path in minifier.mismatches:
+            print(f"   {path}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+# svg_store.py
+
+import hashlib
+import sqlite3
+from collections import OrderedDict
+
+from .instrumentation import instrumentation
+
+
+class SvgBlobStore:
+    """Inhaltsadressierte Ablage der SVG-Inhalte in der Marker-GeoPackage.
+
+    Jeder unterschiedliche SVG-Inhalt wird genau einmal in der Tabelle
+    ``svg_blobs`` gespeichert; die Features enthalten nur noch den
+    SHA-256-Hash im Feld ``svg_hash``.
+    """
+
+    TABLE = "svg_blobs"
+    # Zuletzt gelesene Inhalte; davor liegen SvgFileCache und ImageCache,
+    # sodass hier nur wenige Inhalte wiederholt gebraucht werden
+    MAX_CACHED_CONTENTS = 32
+
+    def __init__(self, gpkg_path):
+        self.gpkg_path = gpkg_path
+        self._content_cache = OrderedDict()  # hash -> SVG-Inhalt (LRU)
+        self._stored = set()  # Hashes, die sicher in der Tabelle stehen
+
+    def _remember(self, content_hash, svg_content):
+        self._stored.add(content_hash)
+        self._content_cache[content_hash] = svg_content
+        self._content_cache.move_to_end(content_hash)
+        while len(self._content_cache) > self.MAX_CACHED_CONTENTS:
+            self._content_cache.popitem(last=False)
+
+    @staticmethod
+    def content_hash(svg_content):
+        """Berechnet den Inhalts-Hash eines SVG-Textes."""
+        return hashlib.sha256(svg_content.encode("utf-8")).hexdigest()
+
+    def _connect(self):
+        return sqlite3.connect(self.gpkg_path, timeout=10)
+
+    @classmethod
+    def _ensure_table(cls, conn, schema="main"):
+        """Legt die Blob-Tabelle an und registriert sie als GeoPackage-Attributtabelle."""
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {schema}.{cls.TABLE} ("
+            "fid INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL, "
+            "hash TEXT NOT NULL UNIQUE, "
+            "content TEXT NOT NULL)"
+        )
+        has_contents = conn.execute(
+            f"SELECT 1 FROM {schema}.sqlite_master WHERE type = 'table' AND name = 'gpkg_contents'"
+        ).fetchone()
+        if has_contents:
+            conn.execute(
+                f"INSERT OR IGNORE INTO {schema}.gpkg_contents "
+                "(table_name, data_type, identifier, description, last_change) "
+                "VALUES (?, 'attributes', ?, 'SVG-Inhalte der taktischen Zeichen (SHA-256)', "
+                "strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))",
+                (cls.TABLE, cls.TABLE)
+            )
+
+    def ensure_table(self):
+        """Stellt sicher, dass die Blob-Tabelle in der GeoPackage existiert."""
+        with self._connect() as conn:
+            self._ensure_table(conn)
+
+    def put(self, svg_content):
+        """Speichert einen SVG-Inhalt (falls noch nicht vorhanden) und liefert dessen Hash."""
+        content_hash = self.content_hash(svg_content)
+        if content_hash in self._stored:
+            return content_hash
+        with self._connect() as conn:
+            self._ensure_table(conn)
+            conn.execute(
+                f"INSERT OR IGNORE INTO {self.TABLE} (hash, content) VALUES (?, ?)",
+                (content_hash, svg_content)
+            )
+        self._remember(content_hash, svg_content)
+        return content_hash
+
+    def get(self, content_hash):
+        """Liefert den SVG-Inhalt zu einem Hash oder None."""
+        if not content_hash:
+            return None
+        if content_hash in self._content_cache:
+            self._content_cache.move_to_end(content_hash)
+            return self._content_cache[content_hash]
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    f"SELECT content FROM {self.TABLE} WHERE hash = ?", (content_hash,)
+                ).fetchone()
+        except sqlite3.OperationalError:
+            # Tabelle existiert (noch) nicht
+            return None
+        if row is None:
+            return None
+        self._remember(content_hash, row[0])
+        return row[0]
+
+    def copy_to(self, target_gpkg):
+        """Überträgt alle Blobs in eine andere GeoPackage (z.B. nach Export oder Umbau)."""
+        with self._connect() as conn:
+            has_table = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (self.TABLE,)
+            ).fetchone()
+            if not has_table:
+                return
+            conn.execute("ATTACH DATABASE ? AS target", (target_gpkg,))
+            try:
+                self._ensure_table(conn, "target")
+                conn.execute(
+                    f"INSERT OR IGNORE INTO target.{self.TABLE} (hash, content) "
+                    f"SELECT hash, content FROM main.{self.TABLE}"
+                )
+                conn.commit()
+            finally:
+                conn.execute("DETACH DATABASE target")
+
+    def migrate_layer_table(self, table_name, conn=None):
+        """Verschiebt eingebettete svg_content-Werte in die Blob-Tabelle.
+
+        Ergänzt bei Bedarf das Feld ``svg_hash``, schreibt jeden Inhalt einmal
+        nach ``svg_blobs`` und leert ``svg_content``. Läuft in einer einzigen
+        Transaktion und ist idempotent. Mit ``conn`` läuft sie in der
+        Transaktion des Aufrufers (z.B. der Schema-Migration).
+
+        Returns:
+            int: Anzahl der migrierten Features
+        """
+        if conn is not None:
+            return self._migrate_rows(conn, table_name)
+        with self._connect() as conn:
+            return self._migrate_rows(conn, table_name)
+
+    def _migrate_rows(self, conn, table_name):
+        columns = {row[1]: row for row in conn.execute(f'PRAGMA table_info("{table_name}")')}
+        if not columns:
+            return 0
+
+        self._ensure_table(conn)
+        if "svg_hash" not in columns:
+            conn.execute(f'ALTER TABLE "{table_name}" ADD COLUMN svg_hash TEXT')
+        if "svg_content" not in columns:
+            return 0
+
+        pk = next((name for name, row in columns.items() if row[5] == 1), "fid")
+        rows = conn.execute(
+            f'SELECT "{pk}", svg_content FROM "{table_name}" '
+            "WHERE svg_content IS NOT NULL AND svg_content != ''"
+        ).fetchall()
+
+        for fid, svg_content in rows:
+            content_hash = self.content_hash(svg_content)
+            conn.execute(
+                f"INSERT OR IGNORE INTO {self.TABLE} (hash, content) VALUES (?, ?)",
+                (content_hash, svg_content)
+            )
+            conn.execute(
+                f'UPDATE "{table_name}" SET svg_hash = ?, svg_content = NULL WHERE "{pk}" = ?',
+                (content_hash, fid)
+            )
+
+        if rows:
+            instrumentation.debug(f"DEBUG: {len(rows)} SVG-Inhalte nach {self.TABLE} migriert")
+        return len(rows)
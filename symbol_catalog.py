@@ -0,0 +1,215 @@
+# symbol_catalog.py
+
+import hashlib
+import html
+import json
+import os
+import re
+
+_TITLE_RE = re.compile(r"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+_DIMENSION_RE = re.compile(r"<svg\b[^>]*?\bwidth=\"([^\"]*)\"[^>]*?\bheight=\"([^\"]*)\"", re.IGNORECASE | re.DOTALL)
+
+
+class SymbolCatalog:
+    """Index aller Symbole unter ``svgs/``, gespeichert als JSON-Manifest.
+
+    Das Manifest enthält pro SVG den relativen Pfad, Ordner, Kategorie,
+    Anzeigename, ``<title>``, Dateigröße und den Inhalts-Hash (SHA-256). Es wird nur neu aufgebaut, wenn
+    sich die Änderungszeit eines Ordners (oder die Kategorie-Zuordnung)
+    unterscheidet; Baum und Suche im
+    SvgDock lesen danach nur noch aus dem Index statt aus dem Dateisystem.
+    Mit einer gepackten Bibliothek (``SymbolPack``) kommen Index und Inhalte
+    direkt aus dem Paket, ``svgs/`` wird dann nicht gelesen.
+    """
+
+    VERSION = 2
+    MANIFEST_NAME = "symbol_catalog.json"
+    # <title> wird nur im Dateikopf gesucht - er steht vor den eingebetteten Schriften
+    HEADER_BYTES = 4096
+
+    def __init__(self, svg_dir, categories=None, manifest_path=None, pack=None):
+        self.svg_dir = svg_dir
+        self.pack = pack
+        self.manifest_path = manifest_path or os.path.join(
+            os.path.dirname(svg_dir.rstrip(os.sep)), self.MANIFEST_NAME
+        )
+        self.categories = self._flatten_categories(categories or {})
+        self._entries = None
+        self._by_folder = {}
+        self._folders = set()
+
+    @staticmethod
+    def _flatten_categories(categories, parents=()):
+        """Bildet Ordnernamen auf ihren Kategoriepfad ab (z.B. Bundeswehr_Fahrzeuge -> [...])."""
+        result = {}
+        for name, value in categories.items():
+            if isinstance(value, dict):
+                result.update(SymbolCatalog._flatten_categories(value, parents + (name,)))
+            else:
+                result[value] = list(parents + (name,))
+        return result
+
+    def _folder_mtimes(self):
+        """Änderungszeiten aller Ordner unter svgs/ (relativer Pfad -> mtime)."""
+        mtimes = {}
+        if not os.path.isdir(self.svg_dir):
+            return mtimes
+        stack = [""]
+        while stack:
+            rel_dir = stack.pop()
+            abs_dir = os.path.join(self.svg_dir, rel_dir) if rel_dir else self.svg_dir
+            try:
+                mtimes[rel_dir] = os.stat(abs_dir).st_mtime
+                with os.scandir(abs_dir) as it:
+                    for entry in it:
+                        if entry.is_dir():
+                            stack.append(os.path.join(rel_dir, entry.name) if rel_dir else entry.name)
+            except OSError as e:
+                print(f"DEBUG: Ordner {abs_dir} nicht lesbar: {e}")
+        return mtimes
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != self.VERSION:
+            return None
+        return data
+
+    def _write_manifest(self, data):
+        tmp_path = self.manifest_path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.manifest_path)
+        except OSError as e:
+            # z.B. schreibgeschütztes Plugin-Verzeichnis - Index bleibt im Speicher
+            print(f"DEBUG: Symbolkatalog konnte nicht gespeichert werden: {e}")
+
+    def _read_svg(self, path):
+        """Liest Inhalts-Hash sowie <title> und Abmessungen aus dem Dateikopf."""
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return "", "", "", ""
+        head = data[:self.HEADER_BYTES].decode("utf-8", errors="ignore")
+        match = _TITLE_RE.search(head)
+        title = html.unescape(match.group(1).strip()) if match else ""
+        match = _DIMENSION_RE.search(head)
+        width, height = (match.group(1), match.group(2)) if match else ("", "")
+        return hashlib.sha256(data).hexdigest(), title, width, height
+
+    def _scan(self, folder_mtimes):
+        """Baut die Einträge aus dem Dateisystem auf."""
+        entries = []
+        for rel_dir in sorted(folder_mtimes):
+            if not rel_dir:
+                continue
+            abs_dir = os.path.join(self.svg_dir, rel_dir)
+            folder = rel_dir.split(os.sep)[0]
+            try:
+                with os.scandir(abs_dir) as it:
+                    files = sorted(
+                        (e for e in it if e.is_file() and e.name.endswith(".svg")),
+                        key=lambda e: e.name
+                    )
+                    for entry in files:
+                        content_hash, title, width, height = self._read_svg(entry.path)
+                        entries.append({
+                            "path": os.path.join(rel_dir, entry.name).replace(os.sep, "/"),
+                            "dir": rel_dir.replace(os.sep, "/"),
+                            "folder": folder,
+                            "category": self.categories.get(folder, [folder]),
+                            "name": os.path.splitext(entry.name)[0],
+                            "title": title,
+                            "size": entry.stat().st_size,
+                            "hash": content_hash,
+                            "width": width,
+                            "height": height,
+                        })
+            except OSError as e:
+                print(f"DEBUG: Ordner {abs_dir} nicht lesbar: {e}")
+        return entries
+
+    def scan(self):
+        """Baut die Einträge neu aus dem Dateisystem auf (ohne Manifest)."""
+        return self._scan(self._folder_mtimes())
+
+    def _load_pack(self):
+        """Übernimmt den Index des Symbolpakets und ordnet die Kategorien zu."""
+        entries = []
+        folders = set()
+        for entry in self.pack.entries:
+            entries.append(dict(entry, category=self.categories.get(entry["folder"], [entry["folder"]])))
+            parts = entry["dir"].split("/")
+            folders.update("/".join(parts[:i]) for i in range(1, len(parts) + 1))
+        self._set_entries(entries, folders)
+        return self._entries
+
+    def load(self):
+        """Lädt das Manifest bzw. baut es neu auf, wenn sich ein Ordner geändert hat."""
+        if self.pack is not None:
+            return self._load_pack()
+        folder_mtimes = self._folder_mtimes()
+        data = self._read_manifest()
+        if (data is None or data.get("folders") != folder_mtimes
+                or data.get("categories") != self.categories):
+            print("DEBUG: Symbolkatalog wird neu aufgebaut")
+            data = {
+                "version": self.VERSION,
+                "folders": folder_mtimes,
+                "categories": self.categories,
+                "entries": self._scan(folder_mtimes),
+            }
+            self._write_manifest(data)
+        self._set_entries(data["entries"], data["folders"])
+        return self._entries
+
+    def _set_entries(self, entries, folders):
+        self._entries = entries
+        self._folders = {rel_dir.replace(os.sep, "/") for rel_dir in folders if rel_dir}
+        self._by_folder = {}
+        for entry in entries:
+            self._by_folder.setdefault(entry["dir"], []).append(entry)
+
+    def entries(self):
+        """Alle Einträge des Katalogs."""
+        if self._entries is None:
+            self.load()
+        return self._entries
+
+    def entries_in(self, folder_name):
+        """Einträge direkt in einem Ordner (ohne Unterordner), nach Name sortiert."""
+        if self._entries is None:
+            self.load()
+        return self._by_folder.get(folder_name, [])
+
+    def has_folder(self, folder_name):
+        if self._entries is None:
+            self.load()
+        return folder_name in self._folders
+
+    def subfolders_of(self, folder_name):
+        """Direkte Unterordner eines Ordners (relative Pfade), alphabetisch sortiert."""
+        if self._entries is None:
+            self.load()
+        prefix = folder_name + "/"
+        return sorted(
+            rel_dir for rel_dir in self._folders
+            if rel_dir.startswith(prefix) and "/" not in rel_dir[len(prefix):]
+        )
+
+    def full_path(self, entry):
+        """Absoluter Dateipfad eines Eintrags (mit Symbolpaket nur als Kennung, ohne Datei)."""
+        return os.path.join(self.svg_dir, *entry["path"].split("/"))
+
+    def source(self, entry):
+        """Was der Renderer für einen Eintrag bekommt: Inhalt aus dem Symbolpaket oder der Dateipfad."""
+        if self.pack is not None:
+            data = self.pack.read(entry["path"])
+            if data is not None:
+                return data
+        return self.full_path(entry)
@@ -0,0 +1,195 @@
+# symbol_model.py
+
+from PyQt5.QtCore import QAbstractItemModel, QModelIndex, QSortFilterProxyModel, Qt
+from PyQt5.QtGui import QIcon, QPixmap
+
+
+class _SymbolNode:
+    """Knoten des Symbolbaums: Kategorie/Ordner (entry None) oder Symbol."""
+
+    __slots__ = ("name", "parent", "children", "row", "folder", "entry", "path")
+
+    def __init__(self, name, parent=None, folder=None, entry=None, path=None):
+        self.name = name
+        self.parent = parent
+        self.children = []
+        self.row = 0
+        self.folder = folder
+        self.entry = entry
+        self.path = path
+        if parent is not None:
+            self.row = len(parent.children)
+            parent.children.append(self)
+
+
+class SymbolTreeModel(QAbstractItemModel):
+    """Baum der Symbolbibliothek (Kategorien -> Ordner -> Symbole) aus dem Symbolkatalog.
+
+    Die Knoten werden einmal aus dem Katalog aufgebaut; Icons entstehen erst
+    in ``data()`` und damit nur für Zeilen, die die View tatsächlich zeichnet.
+    Noch nicht gerasterte Symbole zeigen einen Platzhalter und werden neu
+    gezeichnet, sobald der Hintergrund-Loader das Bild liefert.
+    """
+
+    def __init__(self, catalog, categories, thumbnails, icon_size=48, parent=None):
+        super().__init__(parent)
+        self.catalog = catalog
+        self.thumbnails = thumbnails
+        self.icon_size = icon_size
+        self.device_pixel_ratio = 1.0
+        self.folder_icon = QIcon.fromTheme("folder")
+        self._placeholder_icon = None
+        self._folder_nodes = {}  # Ordner -> Knoten
+        self._hash_nodes = {}  # Inhalts-Hash -> Symbolknoten
+        self.root = _SymbolNode("")
+        self._build(self.root, categories)
+        thumbnails.signals.icon_ready.connect(self._on_icon_ready)
+
+    def _build(self, parent, categories):
+        for name, value in sorted(categories.items()):
+            if isinstance(value, dict):
+                node = _SymbolNode(name, parent)
+                self._build(node, value)
+                if not node.children:
+                    parent.children.pop()
+            elif self.catalog.has_folder(value):
+                self._add_folder(name, value, parent)
+
+    def _add_folder(self, name, folder, parent):
+        node = _SymbolNode(name, parent, folder=folder)
+        self._folder_nodes[folder] = node
+        for subfolder in self.catalog.subfolders_of(folder):
+            self._add_folder(subfolder.rsplit("/", 1)[-1], subfolder, node)
+        for entry in self.catalog.entries_in(folder):
+            symbol = _SymbolNode(entry["name"], node, entry=entry, path=self.catalog.full_path(entry))
+            self._hash_nodes.setdefault(entry.get("hash"), []).append(symbol)
+        return node
+
+    def node(self, index):
+        return index.internalPointer() if index.isValid() else self.root
+
+    def index(self, row, column, parent=QModelIndex()):
+        parent_node = self.node(parent)
+        if column != 0 or row < 0 or row >= len(parent_node.children):
+            return QModelIndex()
+        return self.createIndex(row, column, parent_node.children[row])
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        parent_node = index.internalPointer().parent
+        if parent_node is None or parent_node is self.root:
+            return QModelIndex()
+        return self.createIndex(parent_node.row, 0, parent_node)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        return len(self.node(parent).children)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        if index.internalPointer().entry is not None:
+            flags |= Qt.ItemIsDragEnabled
+        return flags
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return "Taktische Zeichen"
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        node = index.internalPointer()
+        if role == Qt.DisplayRole:
+            return node.name
+        if role == Qt.DecorationRole:
+            if node.entry is None:
+                return self.folder_icon
+            icon = self.thumbnails.icon_for(node.entry, self.device_pixel_ratio)
+            return icon if icon is not None else self._placeholder()
+        if role == Qt.ToolTipRole and node.entry is not None:
+            return node.entry["title"] or None
+        if role == Qt.UserRole:
+            return node.path
+        return None
+
+    def _placeholder(self):
+        """Transparentes Icon in Symbolgröße, bis das Vorschaubild fertig ist."""
+        if self._placeholder_icon is None:
+            pixmap = QPixmap(self.icon_size, self.icon_size)
+            pixmap.fill(Qt.transparent)
+            self._placeholder_icon = QIcon(pixmap)
+        return self._placeholder_icon
+
+    def _on_icon_ready(self, content_hash, dpr):
+        """Lässt die View ein Symbol mit dem fertig gerasterten Vorschaubild neu zeichnen."""
+        if dpr != self.device_pixel_ratio:
+            return
+        for node in self._hash_nodes.get(content_hash, ()):
+            index = self.createIndex(node.row, 0, node)
+            self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+
+class SymbolFilterProxyModel(QSortFilterProxyModel):
+    """Filtert den Symbolbaum auf Suchtreffer und sortiert sie nach Relevanz.
+
+    Ohne Suche bleibt die Reihenfolge des Quellmodells erhalten. Ordner
+    bleiben sichtbar, solange sie mindestens einen Treffer enthalten.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # Rekursive Filterung gibt es erst ab Qt 5.10; ältere Versionen
+        # erkennen Ordner mit Treffern über deren Rang (siehe filterAcceptsRow)
+        if hasattr(self, "setRecursiveFilteringEnabled"):
+            self.setRecursiveFilteringEnabled(True)
+        self._ranks = None  # Pfad des Symbols bzw. id(Ordnerknoten) -> Rang
+
+    def set_results(self, entries):
+        """Setzt die Trefferliste (nach Relevanz sortiert) oder None für den ganzen Baum."""
+        if entries is None:
+            self._ranks = None
+        else:
+            source = self.sourceModel()
+            ranks = {}
+            for rank, entry in enumerate(entries):
+                ranks[entry["path"]] = rank
+                node = source._folder_nodes.get(entry["dir"])
+                while node is not None and id(node) not in ranks:
+                    ranks[id(node)] = rank
+                    node = node.parent
+            self._ranks = ranks
+        self.invalidate()
+        self.sort(0)
+
+    def is_filtered(self):
+        return self._ranks is not None
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        if self._ranks is None:
+            return True
+        node = self.sourceModel().node(source_parent).children[source_row]
+        # Ordner haben einen Rang, wenn ein Symbol darin passt (set_results)
+        key = node.entry["path"] if node.entry is not None else id(node)
+        return key in self._ranks
+
+    def _rank(self, node):
+        key = node.entry["path"] if node.entry is not None else id(node)
+        return self._ranks.get(key, len(self._ranks))
+
+    def lessThan(self, left, right):
+        if self._ranks is None:
+            return left.row() < right.row()
+        left_node = left.internalPointer()
+        right_node = right.internalPointer()
+        left_rank, right_rank = self._rank(left_node), self._rank(right_node)
+        if left_rank != right_rank:
+            return left_rank < right_rank
+        return left.row() < right.row()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+THW Toolbox Plugin - Gepackte Symbolbibliothek
+==============================================
+
+Fasst alle SVG-Dateien unter ``svgs/`` samt Katalog-Index in einer
+einzigen, unkomprimierten ZIP-Datei (``svgs.pack``) zusammen. Liegt die
+Datei im Plugin-Ordner, lesen Symbol-Dock, Platzieren und Export nur noch
+aus ihr: ein Dateizugriff beim Öffnen statt einem pro Symbol, Zugriffe per
+Memory-Mapping über einen Index (Name -> Offset, Länge).
+
+Verwendung:
+    python symbol_pack.py [--svg-dir Ordner] [--output Datei]
+
+Beispiele:
+    python symbol_pack.py
+    python symbol_pack.py --output /media/usb/thw_toolbox/svgs.pack
+"""
+
+import argparse
+import importlib
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+import zipfile
+
+PLUGIN_DIR = os.path.dirname(os.path.abspath(__file__))
+PACK_NAME = "svgs.pack"
+MANIFEST_MEMBER = "symbol_catalog.json"
+# Feste Zeitstempel, damit gleiche Bibliotheken byte-gleiche Pakete ergeben
+_ZIP_DATE = (1980, 1, 1, 0, 0, 0)
+
+
+class SymbolPack:
+    """Lesezugriff auf eine gepackte Symbolbibliothek über Memory-Mapping.
+
+    Beim Öffnen wird nur das zentrale Verzeichnis der ZIP-Datei gelesen;
+    ``read`` liefert danach den Inhalt eines Symbols ohne weiteren
+    Dateizugriff direkt aus der gemappten Datei.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._index = self._read_index()
+            manifest = json.loads(self.read(MANIFEST_MEMBER).decode("utf-8"))
+        except Exception:
+            self.close()
+            raise
+        if manifest.get("version") != self.VERSION:
+            self.close()
+            raise ValueError(f"Nicht unterstützte Version des Symbolpakets: {manifest.get('version')}")
+        self.entries = manifest["entries"]
+
+    def _read_index(self):
+        """Name -> (Offset, Länge) der unkomprimierten Einträge."""
+        index = {}
+        # ZipFile schließt ein übergebenes Dateiobjekt nicht
+        with zipfile.ZipFile(self._file) as archive:
+            for info in archive.infolist():
+                if info.compress_type != zipfile.ZIP_STORED:
+                    raise ValueError(f"Eintrag {info.filename} ist komprimiert")
+                # Die Daten beginnen nach dem lokalen Header (30 Bytes + Name + Extra-Feld)
+                name_length, extra_length = struct.unpack(
+                    "<HH", self._map[info.header_offset + 26:info.header_offset + 30]
+                )
+                start = info.header_offset + 30 + name_length + extra_length
+                index[info.filename] = (start, info.file_size)
+        return index
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    def read(self, name):
+        """Inhalt eines Eintrags (relativer Pfad wie im Katalog) als Bytes oder None."""
+        location = self._index.get(name)
+        if location is None:
+            return None
+        start, size = location
+        return self._map[start:start + size]
+
+    def close(self):
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def open_symbol_pack(plugin_dir):
+    """Öffnet ``svgs.pack`` im Plugin-Ordner, falls vorhanden (sonst None)."""
+    path = os.path.join(plugin_dir, PACK_NAME)
+    if not os.path.exists(path):
+        return None
+    try:
+        pack = SymbolPack(path)
+    except (OSError, ValueError, KeyError, AttributeError, zipfile.BadZipFile) as e:
+        print(f"DEBUG: Symbolpaket {path} nicht lesbar, verwende svgs/: {e}")
+        return None
+    print(f"DEBUG: Symbolpaket geöffnet: {path} ({len(pack.entries)} Symbole)")
+    return pack
+
+
+def build_symbol_pack(svg_dir, pack_path):
+    """Schreibt alle SVGs unter ``svg_dir`` mit Katalog-Index in ``pack_path``.
+
+    Returns:
+        int: Anzahl gepackter Symbole
+    """
+    from .symbol_catalog import SymbolCatalog
+
+    catalog = SymbolCatalog(svg_dir)
+    entries = catalog.scan()
+    manifest = {
+        "version": SymbolPack.VERSION,
+        "built": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        # Kategorien hängen vom Dock ab und werden beim Laden zugeordnet
+        "entries": [{key: value for key, value in entry.items() if key != "category"} for entry in entries],
+    }
+
+    temp_path = pack_path + ".tmp"
+    with zipfile.ZipFile(temp_path, "w", zipfile.ZIP_STORED) as archive:
+        archive.writestr(zipfile.ZipInfo(MANIFEST_MEMBER, _ZIP_DATE),
+                         json.dumps(manifest, ensure_ascii=False))
+        for entry in entries:
+            with open(catalog.full_path(entry), "rb") as f:
+                archive.writestr(zipfile.ZipInfo(entry["path"], _ZIP_DATE), f.read())
+    os.replace(temp_path, pack_path)
+    return len(entries)
+
+
+def load_plugin_module():
+    """Importiert dieses Modul als Teil des Plugin-Pakets (die Module nutzen relative Imports)."""
+    sys.path.insert(0, os.path.dirname(PLUGIN_DIR))
+    package = os.path.basename(PLUGIN_DIR)
+    return importlib.import_module(f"{package}.symbol_pack")
+
+
+def main():
+    """Hauptfunktion."""
+    parser = argparse.ArgumentParser(
+        description="Packt die SVG-Bibliothek des THW Toolbox Plugins in eine einzelne Datei",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Beispiele:
+  python symbol_pack.py
+  python symbol_pack.py --output /media/usb/thw_toolbox/svgs.pack
+        """
+    )
+    parser.add_argument("--svg-dir", default=os.path.join(PLUGIN_DIR, "svgs"), help="SVG-Ordner (Standard: svgs/)")
+    parser.add_argument("--output", default=os.path.join(PLUGIN_DIR, PACK_NAME), help=f"Zieldatei (Standard: {PACK_NAME})")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.svg_dir):
+        print(f"FEHLER: SVG-Ordner nicht gefunden: {args.svg_dir}")
+        sys.exit(1)
+    count = load_plugin_module().build_symbol_pack(args.svg_dir, args.output)
+    print(f"{count} Symbole gepackt: {args.output} ({os.path.getsize(args.output) / (1024 * 1024):.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
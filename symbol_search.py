@@ -0,0 +1,155 @@
+# symbol_search.py
+
+import re
+import unicodedata
+
+_UMLAUTS = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+_CAMEL_RE = re.compile(r"[A-ZÄÖÜ]+(?![a-zäöüß])|[A-ZÄÖÜ]?[a-zäöüß]+|[0-9]+")
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text):
+    """Kleinschreibung, Umlaute ausgeschrieben (ä -> ae), übrige Akzente entfernt."""
+    text = (text or "").lower().translate(_UMLAUTS)
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def tokenize(text):
+    """Zerlegt einen Namen in normalisierte Tokens.
+
+    Neben den Wörtern selbst werden zusammengesetzte Kürzel zusätzlich an
+    Groß-/Kleinschreibung getrennt (z.B. ``FüKomKW`` -> fuekomkw, fue, kom, kw).
+    """
+    tokens = []
+    for word in re.split(r"[\s_\-./()]+", text or ""):
+        if not word:
+            continue
+        tokens.extend(_TOKEN_RE.findall(normalize(word)))
+        parts = _CAMEL_RE.findall(word)
+        if len(parts) > 1:
+            for part in parts:
+                tokens.extend(_TOKEN_RE.findall(normalize(part)))
+    return tokens
+
+
+def trigrams(token):
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SymbolSearchIndex:
+    """Invertierter Index über Dateinamen, Ordner und ``<title>`` der Symbole.
+
+    Jeder Token verweist auf die Einträge, in denen er vorkommt (mit dem
+    Gewicht des Feldes); über die Trigramme der Tokens werden Tippfehler
+    toleriert. Eine Suche arbeitet nur auf dem Index im Speicher.
+    """
+
+    # Gewichtung nach Herkunft des Tokens
+    WEIGHT_NAME = 3.0
+    WEIGHT_TITLE = 2.0
+    WEIGHT_FOLDER = 1.0
+
+    # Abschläge je nach Art des Treffers
+    SCORE_EXACT = 1.0
+    SCORE_PREFIX = 0.8
+    SCORE_SUBSTRING = 0.6
+    SCORE_FUZZY = 0.5
+
+    MIN_FUZZY_SIMILARITY = 0.45
+
+    def __init__(self, entries):
+        self.entries = list(entries)
+        self._postings = {}  # Token -> {Eintrag-Index: Gewicht}
+        self._trigram_postings = {}  # Trigramm -> {Token}
+        self._normalized_names = []
+        for idx, entry in enumerate(self.entries):
+            self._add_entry(idx, entry)
+
+    def _add_tokens(self, idx, text, weight):
+        for token in tokenize(text):
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                for gram in trigrams(token):
+                    self._trigram_postings.setdefault(gram, set()).add(token)
+            if postings.get(idx, 0.0) < weight:
+                postings[idx] = weight
+
+    def _add_entry(self, idx, entry):
+        self._add_tokens(idx, entry.get("name", ""), self.WEIGHT_NAME)
+        self._add_tokens(idx, entry.get("title", ""), self.WEIGHT_TITLE)
+        self._add_tokens(idx, " ".join(entry.get("category", [])), self.WEIGHT_FOLDER)
+        self._add_tokens(idx, entry.get("folder", ""), self.WEIGHT_FOLDER)
+        self._normalized_names.append(normalize(entry.get("name", "").replace("_", " ")))
+
+    def _candidate_tokens(self, query_token):
+        """Liefert passende Index-Tokens mit Treffergüte (exakt, Präfix, Teilwort, ähnlich)."""
+        matches = {}
+        if query_token in self._postings:
+            matches[query_token] = self.SCORE_EXACT
+
+        # Präfix- und Teilwort-Treffer über das Vokabular
+        if len(query_token) >= 2:
+            for token in self._postings:
+                if token == query_token:
+                    continue
+                if token.startswith(query_token):
+                    matches[token] = max(matches.get(token, 0.0), self.SCORE_PREFIX)
+                elif len(query_token) >= 3 and query_token in token:
+                    matches[token] = max(matches.get(token, 0.0), self.SCORE_SUBSTRING)
+
+        # Tippfehler: Ähnlichkeit der Trigramm-Mengen (Jaccard)
+        if len(query_token) >= 4:
+            query_grams = trigrams(query_token)
+            shared = {}
+            for gram in query_grams:
+                for token in self._trigram_postings.get(gram, ()):
+                    shared[token] = shared.get(token, 0) + 1
+            for token, count in shared.items():
+                if token in matches:
+                    continue
+                similarity = count / (len(query_grams) + len(trigrams(token)) - count)
+                if similarity >= self.MIN_FUZZY_SIMILARITY:
+                    matches[token] = self.SCORE_FUZZY * similarity
+        return matches
+
+    def search(self, text, limit=None):
+        """Sucht Einträge und liefert sie absteigend nach Relevanz sortiert.
+
+        Jedes Suchwort muss in einem Eintrag vorkommen (exakt, als Präfix,
+        als Wortteil oder ähnlich geschrieben).
+        """
+        query_tokens = list(dict.fromkeys(_TOKEN_RE.findall(normalize(text))))
+        if not query_tokens:
+            return []
+
+        scores = None
+        for query_token in query_tokens:
+            token_scores = {}
+            for token, quality in self._candidate_tokens(query_token).items():
+                for idx, weight in self._postings[token].items():
+                    score = weight * quality
+                    if score > token_scores.get(idx, 0.0):
+                        token_scores[idx] = score
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {idx: scores[idx] + score for idx, score in token_scores.items() if idx in scores}
+            if not scores:
+                return []
+
+        # Bonus, wenn der Name genau der Suche entspricht bzw. mit ihr beginnt
+        query = " ".join(query_tokens)
+        for idx in scores:
+            name = self._normalized_names[idx]
+            if name == query:
+                scores[idx] += 5.0
+            elif name.startswith(query):
+                scores[idx] += 1.0
+
+        ranked = sorted(scores, key=lambda idx: (-scores[idx], self._normalized_names[idx]))
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [self.entries[idx] for idx in ranked]
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Tests für die Schema-Migration der Marker-GeoPackage (schema_migrator.py)
+"""
+
+import importlib
+import os
+import sqlite3
+import sys
+import tempfile
+
+PLUGIN_DIR = os.path.dirname(os.path.abspath(__file__))
+# Die Plugin-Module nutzen relative Imports und werden als Paket geladen
+sys.path.insert(0, os.path.dirname(PLUGIN_DIR))
+schema_migrator = importlib.import_module(f"{os.path.basename(PLUGIN_DIR)}.schema_migrator")
+SchemaMigrator = schema_migrator.SchemaMigrator
+
+TABLE = "taktische_zeichen"
+SVG = '<svg xmlns="http://www.w3.org/2000/svg" width="10" height="10"/>'
+
+
+def _create_gpkg(version):
+    """Legt eine Marker-Tabelle im Stand der Schema-Version 0, 1 oder 2 an (ohne Geometrie-Registrierung)."""
+    path = os.path.join(tempfile.mkdtemp(), f"marker_v{version}.gpkg")
+    conn = sqlite3.connect(path)
+    conn.isolation_level = None
+    columns = ["fid INTEGER PRIMARY KEY AUTOINCREMENT", "geom BLOB", "name TEXT", "svg_path TEXT", "svg_content TEXT"]
+    if version >= 1:
+        columns += ["size REAL", "scale_with_map BOOLEAN DEFAULT 0"]
+    if version >= 2:
+        columns += ["unique_id TEXT", "label TEXT", "show_label BOOLEAN DEFAULT 0"]
+    conn.execute(f'CREATE TABLE "{TABLE}" ({", ".join(columns)})')
+    rows = [("GKW.svg", "svgs/THW_Fahrzeuge/GKW.svg", SVG),
+            ("Zug_Trupp.svg", "svgs/THW_Einheiten/Zug_Trupp.svg", SVG)]
+    for name, svg_path, svg_content in rows:
+        conn.execute(f'INSERT INTO "{TABLE}" (name, svg_path, svg_content) VALUES (?, ?, ?)',
+                     (name, svg_path, svg_content))
+    if version >= 2:
+        # Version 2 hat IDs und Labels bereits vergeben
+        conn.execute(f'UPDATE "{TABLE}" SET unique_id = \'uid-gkw\', label = \'Mein GKW\' WHERE name = \'GKW.svg\'')
+        conn.execute(f'UPDATE "{TABLE}" SET unique_id = \'uid-zug\', label = \'Zug Trupp\' WHERE name = \'Zug_Trupp.svg\'')
+    if version >= 1:
+        conn.execute("BEGIN")
+        SchemaMigrator(path, TABLE)._write_version(conn, version)
+        conn.execute("COMMIT")
+    conn.close()
+    return path
+
+
+def _rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        conn.row_factory = sqlite3.Row
+        return [dict(row) for row in conn.execute(f'SELECT * FROM "{TABLE}" ORDER BY fid')]
+    finally:
+        conn.close()
+
+
+def _dump(path):
+    conn = sqlite3.connect(path)
+    try:
+        return list(conn.iterdump())
+    finally:
+        conn.close()
+
+
+def _version(path):
+    migrator = SchemaMigrator(path, TABLE)
+    conn = migrator._connect()
+    try:
+        return migrator._read_version(conn)
+    finally:
+        conn.close()
+
+
+def test_migrates_to_current_version():
+    """Version 0, 1 und 2 erreichen VERSION; SVG-Inhalte landen in svg_blobs"""
+    print("=== Test: Migration auf die aktuelle Version ===")
+    for version in (0, 1, 2):
+        path = _create_gpkg(version)
+        assert SchemaMigrator(path, TABLE).migrate() == version
+        assert _version(path) == SchemaMigrator.VERSION
+        rows = _rows(path)
+        for row in rows:
+            assert row["unique_id"]
+            assert row["svg_hash"]
+            assert row["svg_content"] is None
+        assert len({row["unique_id"] for row in rows}) == len(rows)
+        assert rows[1]["label"] == "Zug Trupp"
+        conn = sqlite3.connect(path)
+        try:
+            assert conn.execute("SELECT count(*) FROM svg_blobs").fetchone()[0] == 1
+        finally:
+            conn.close()
+        print(f"✓ Version {version} -> {SchemaMigrator.VERSION}")
+
+
+def test_keeps_unique_id_and_label():
+    """Vorhandene unique_id und Labels bleiben erhalten"""
+    print("\n=== Test: Vorhandene IDs und Labels ===")
+    path = _create_gpkg(2)
+    SchemaMigrator(path, TABLE).migrate()
+    gkw = _rows(path)[0]
+    assert gkw["unique_id"] == "uid-gkw"
+    assert gkw["label"] == "Mein GKW"
+    print("✓ unique_id und Label unverändert")
+
+
+def test_second_run_is_noop():
+    """Ein zweiter Lauf ändert nichts mehr"""
+    print("\n=== Test: Zweiter Lauf ===")
+    for version in (0, 1, 2):
+        path = _create_gpkg(version)
+        SchemaMigrator(path, TABLE).migrate()
+        before = _dump(path)
+        assert SchemaMigrator(path, TABLE).migrate() == SchemaMigrator.VERSION
+        assert _dump(path) == before
+    print("✓ Keine Änderungen beim zweiten Lauf")
+
+
+def test_failing_step_rolls_back():
+    """Schlägt ein Schritt fehl, wird die ganze Transaktion zurückgerollt"""
+    print("\n=== Test: Rollback ===")
+    path = _create_gpkg(0)
+    before = _dump(path)
+
+    def failing_step(conn):
+        raise sqlite3.OperationalError("Schritt fehlgeschlagen")
+
+    migrator = SchemaMigrator(path, TABLE)
+    migrator.steps = migrator.steps[:2] + ((3, "Fehlschlag", failing_step),)
+    try:
+        migrator.migrate()
+    except sqlite3.OperationalError:
+        pass
+    else:
+        raise AssertionError("Migration hätte fehlschlagen müssen")
+    assert _dump(path) == before
+    assert _version(path) == 0
+    # Danach läuft die Migration normal durch
+    assert SchemaMigrator(path, TABLE).migrate() == 0
+    assert _version(path) == SchemaMigrator.VERSION
+    print("✓ Transaktion zurückgerollt")
+
+
+if __name__ == "__main__":
+    print("THW Toolbox Plugin - Schema-Migration")
+    print("=" * 60)
+
+    test_migrates_to_current_version()
+    test_keeps_unique_id_and_label()
+    test_second_run_is_noop()
+    test_failing_step_rolls_back()
+
+    print("\n" + "=" * 60)
+    print("Alle Tests abgeschlossen!")
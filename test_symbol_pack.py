@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Tests für die gepackte Symbolbibliothek (symbol_pack.py)
+"""
+
+import hashlib
+import importlib
+import os
+import sys
+import tempfile
+
+PLUGIN_DIR = os.path.dirname(os.path.abspath(__file__))
+# Die Plugin-Module nutzen relative Imports und werden als Paket geladen
+sys.path.insert(0, os.path.dirname(PLUGIN_DIR))
+symbol_pack = importlib.import_module(f"{os.path.basename(PLUGIN_DIR)}.symbol_pack")
+
+SOURCES = {
+    "THW_Fahrzeuge/GKW.svg": '<svg xmlns="http://www.w3.org/2000/svg" width="20" height="10"><title>Gerätekraftwagen</title></svg>',
+    "THW_Fahrzeuge/MTW.svg": '<svg xmlns="http://www.w3.org/2000/svg" width="20" height="10"><title>MTW</title></svg>',
+    "THW_Einheiten/Zugtrupp.svg": '<svg xmlns="http://www.w3.org/2000/svg" width="10" height="10"/>',
+}
+
+
+def _build_pack():
+    """Legt eine kleine Bibliothek an und packt sie; liefert das Plugin-Verzeichnis."""
+    plugin_dir = tempfile.mkdtemp()
+    svg_dir = os.path.join(plugin_dir, "svgs")
+    for rel_path, content in SOURCES.items():
+        path = os.path.join(svg_dir, *rel_path.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+    count = symbol_pack.build_symbol_pack(svg_dir, os.path.join(plugin_dir, symbol_pack.PACK_NAME))
+    assert count == len(SOURCES)
+    return plugin_dir
+
+
+def test_round_trip():
+    """Einträge und Hashes im Paket entsprechen den Quelldateien"""
+    print("=== Test: Packen und Lesen ===")
+    pack = symbol_pack.open_symbol_pack(_build_pack())
+    assert pack is not None
+    try:
+        assert len(pack.entries) == len(SOURCES)
+        for entry in pack.entries:
+            source = SOURCES[entry["path"]].encode("utf-8")
+            data = pack.read(entry["path"])
+            assert data == source
+            assert entry["hash"] == hashlib.sha256(source).hexdigest()
+            assert entry["size"] == len(source)
+        gkw = next(entry for entry in pack.entries if entry["name"] == "GKW")
+        assert gkw["title"] == "Gerätekraftwagen"
+        assert gkw["folder"] == "THW_Fahrzeuge"
+        assert "category" not in gkw
+        assert pack.read("THW_Fahrzeuge/Fehlt.svg") is None
+    finally:
+        pack.close()
+    print(f"✓ {len(SOURCES)} Symbole gelesen")
+
+
+def test_identical_sources_give_identical_packs():
+    """Gleiche Bibliothek ergibt bis auf den Zeitstempel im Manifest dieselben Einträge"""
+    print("\n=== Test: Reproduzierbarkeit ===")
+    first = symbol_pack.open_symbol_pack(_build_pack())
+    second = symbol_pack.open_symbol_pack(_build_pack())
+    try:
+        assert first.entries == second.entries
+    finally:
+        first.close()
+        second.close()
+    print("✓ Einträge identisch")
+
+
+def test_corrupt_pack_is_ignored():
+    """Abgeschnittene oder beschädigte Pakete liefern None statt einer Ausnahme"""
+    print("\n=== Test: Beschädigtes Paket ===")
+    plugin_dir = _build_pack()
+    path = os.path.join(plugin_dir, symbol_pack.PACK_NAME)
+    with open(path, "rb") as f:
+        data = f.read()
+
+    # Abgeschnitten: zentrales Verzeichnis fehlt
+    with open(path, "wb") as f:
+        f.write(data[:len(data) // 2])
+    assert symbol_pack.open_symbol_pack(plugin_dir) is None
+
+    # Kein ZIP
+    with open(path, "wb") as f:
+        f.write(b"kein Symbolpaket")
+    assert symbol_pack.open_symbol_pack(plugin_dir) is None
+
+    # Leere Datei
+    open(path, "wb").close()
+    assert symbol_pack.open_symbol_pack(plugin_dir) is None
+
+    # Kein Paket vorhanden
+    os.remove(path)
+    assert symbol_pack.open_symbol_pack(plugin_dir) is None
+    print("✓ Beschädigte Pakete werden ignoriert")
+
+
+if __name__ == "__main__":
+    print("THW Toolbox Plugin - Symbolpaket")
+    print("=" * 60)
+
+    test_round_trip()
+    test_identical_sources_give_identical_packs()
+    test_corrupt_pack_is_ignored()
+
+    print("\n" + "=" * 60)
+    print("Alle Tests abgeschlossen!")
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Tests für die Symbolsuche (symbol_search.py)
+"""
+
+import importlib
+import os
+import sys
+
+PLUGIN_DIR = os.path.dirname(os.path.abspath(__file__))
+# Die Plugin-Module nutzen relative Imports und werden als Paket geladen
+sys.path.insert(0, os.path.dirname(PLUGIN_DIR))
+symbol_search = importlib.import_module(f"{os.path.basename(PLUGIN_DIR)}.symbol_search")
+
+ENTRIES = [
+    {"name": "GKW", "title": "Gerätekraftwagen", "folder": "THW_Fahrzeuge", "category": ["THW", "Fahrzeuge"]},
+    {"name": "GKW_I", "title": "Gerätekraftwagen I", "folder": "THW_Fahrzeuge", "category": ["THW", "Fahrzeuge"]},
+    {"name": "MTW", "title": "Mannschaftstransportwagen", "folder": "THW_Fahrzeuge", "category": ["THW", "Fahrzeuge"]},
+    {"name": "Zugtrupp", "title": "Zugtrupp", "folder": "THW_Einheiten", "category": ["THW", "Einheiten"]},
+    {"name": "Kraftwagen", "title": "Kraftwagen", "folder": "Feuerwehr_Fahrzeuge", "category": ["Feuerwehr"]},
+]
+
+
+def _names(text):
+    index = symbol_search.SymbolSearchIndex(ENTRIES)
+    return [entry["name"] for entry in index.search(text)]
+
+
+def test_exact_token():
+    """Ein exaktes Kürzel findet genau die Symbole mit diesem Token, exakter Name zuerst"""
+    print("=== Test: Exaktes Kürzel ===")
+    assert _names("gkw") == ["GKW", "GKW_I"]
+    assert _names("GKW") == _names("gkw")
+    print("✓ 'gkw' gefunden")
+
+
+def test_umlaut_and_ascii_spelling():
+    """Umlaut und ausgeschriebene Umlaute liefern dasselbe Ergebnis"""
+    print("\n=== Test: Umlaute ===")
+    with_umlaut = _names("Gerätekraftwagen")
+    assert with_umlaut[:2] == ["GKW", "GKW_I"]
+    assert _names("Geraetekraftwagen") == with_umlaut
+    print("✓ 'Gerätekraftwagen' == 'Geraetekraftwagen'")
+
+
+def test_single_typo():
+    """Ein Tippfehler wird über die Trigramme toleriert"""
+    print("\n=== Test: Tippfehler ===")
+    result = _names("Gerätekraftwagn")
+    assert "GKW" in result and "GKW_I" in result
+    assert "MTW" not in result and "Zugtrupp" not in result
+    print("✓ 'Gerätekraftwagn' gefunden")
+
+
+def test_ranking_order():
+    """Exakter Name vor Präfix, Name vor Titel, unpassende Einträge fehlen"""
+    print("\n=== Test: Reihenfolge ===")
+    # Exakter Name (Bonus) vor Treffern im Titel
+    assert _names("kraftwagen") == ["Kraftwagen", "GKW", "GKW_I"]
+    # Präfix: bei gleicher Güte alphabetisch nach Name
+    assert _names("gk") == ["GKW", "GKW_I"]
+    # Alle Suchwörter müssen vorkommen
+    assert _names("gkw zugtrupp") == []
+    assert _names("") == []
+    index = symbol_search.SymbolSearchIndex(ENTRIES)
+    assert [entry["name"] for entry in index.search("kraftwagen", limit=1)] == ["Kraftwagen"]
+    print("✓ Reihenfolge stimmt")
+
+
+if __name__ == "__main__":
+    print("THW Toolbox Plugin - Symbolsuche")
+    print("=" * 60)
+
+    test_exact_token()
+    test_umlaut_and_ascii_spelling()
+    test_single_typo()
+    test_ranking_order()
+
+    print("\n" + "=" * 60)
+    print("Alle Tests abgeschlossen!")
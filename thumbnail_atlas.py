@@ -0,0 +1,217 @@
+# thumbnail_atlas.py
+
+import json
+import os
+
+from PyQt5.QtCore import QObject, QRect, QRunnable, Qt, pyqtSignal
+from PyQt5.QtGui import QIcon, QImage, QPainter, QPixmap
+
+from .icon_loader import IconLoader
+from .image_cache import ImageCache
+
+
+class _AtlasSignals(QObject):
+    icon_ready = pyqtSignal(str, float)  # Inhalts-Hash, Pixelverhältnis
+
+
+class _AtlasSaveTask(QRunnable):
+    """Schreibt einen fertigen Atlas samt Index im Hintergrund auf den Datenträger."""
+
+    def __init__(self, base_path, image, index):
+        super().__init__()
+        self.base_path = base_path
+        self.image = image
+        self.index = index
+
+    def run(self):
+        try:
+            os.makedirs(os.path.dirname(self.base_path), exist_ok=True)
+            # Erst das Bild, dann den Index schreiben - ein Index ohne Bild ist ungültig
+            self.image.save(self.base_path + ".tmp.png", "PNG")
+            os.replace(self.base_path + ".tmp.png", self.base_path + ".png")
+            with open(self.base_path + ".json.tmp", "w", encoding="utf-8") as f:
+                json.dump(self.index, f)
+            os.replace(self.base_path + ".json.tmp", self.base_path + ".json")
+        except OSError as e:
+            # Atlas bleibt für diese Sitzung im Speicher
+            print(f"DEBUG: Vorschau-Atlas konnte nicht gespeichert werden: {e}")
+
+
+class ThumbnailAtlasCache:
+    """Datei-Cache vorgerenderter Vorschaubilder, ein PNG-Sprite-Atlas pro Ordner.
+
+    Zu jedem Atlas gehört ein JSON-Index mit der Position jedes Symbols,
+    adressiert über den Inhalts-Hash der SVG-Datei. Der Atlas gilt pro
+    Pixelverhältnis (devicePixelRatio). Fehlt er, werden die Symbole des
+    Ordners im ``IconLoader`` gerastert - sichtbare zuerst - und der Atlas
+    zusammengesetzt, sobald alle fertig sind.
+    """
+
+    VERSION = 1
+    COLUMNS = 16
+
+    def __init__(self, cache_dir, catalog, icon_size=48, image_cache=None):
+        self.cache_dir = cache_dir
+        self.catalog = catalog
+        self.icon_size = icon_size
+        # Dekodierte Pixmaps (gemeinsam mit Marker-Vorschau und Drag-Pixmaps)
+        self.image_cache = image_cache if image_cache is not None else ImageCache()
+        self.signals = _AtlasSignals()
+        self.loader = IconLoader()
+        self.loader.image_ready.connect(self._on_image_ready)
+        self._atlases = {}  # (Ordner, dpr) -> (QImage, {Hash: [x, y]})
+        self._images = {}  # (Hash, dpr) -> QImage, bis der Atlas des Ordners fertig ist
+        self._building = {}  # (Ordner, dpr) -> noch fehlende Hashes
+
+    def _base_path(self, folder, dpr):
+        safe_name = folder.replace("/", "__")
+        return os.path.join(self.cache_dir, f"{safe_name}@{dpr:g}x")
+
+    def _pixel_size(self, dpr):
+        return int(round(self.icon_size * dpr))
+
+    def _load_atlas(self, folder, dpr):
+        """Lädt Atlas und Index vom Datenträger, wenn sie alle Symbole des Ordners enthalten."""
+        base = self._base_path(folder, dpr)
+        try:
+            with open(base + ".json", "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if index.get("version") != self.VERSION or index.get("size") != self.icon_size:
+            return None
+        cells = index.get("cells", {})
+        if any(entry.get("hash") not in cells for entry in self.catalog.entries_in(folder)):
+            return None
+        image = QImage(base + ".png")
+        if image.isNull():
+            return None
+        return image, cells
+
+    def _atlas(self, folder, dpr):
+        key = (folder, dpr)
+        if key not in self._atlases:
+            atlas = self._load_atlas(folder, dpr)
+            if atlas is None:
+                return None
+            self._atlases[key] = atlas
+        return self._atlases[key]
+
+    def image_for(self, entry, dpr):
+        """Liefert das gerasterte Vorschaubild (QImage) eines Katalogeintrags oder None.
+
+        Fehlt es, wird der Ordner im Hintergrund gerastert; der Eintrag selbst
+        wird als sichtbar priorisiert.
+        """
+        folder = entry["dir"]
+        content_hash = entry.get("hash")
+        atlas = self._atlas(folder, dpr)
+        if atlas is not None and content_hash in atlas[1]:
+            image, cells = atlas
+            x, y = cells[content_hash]
+            pixel_size = self._pixel_size(dpr)
+            return image.copy(QRect(x, y, pixel_size, pixel_size))
+        image = self._images.get((content_hash, dpr))
+        if image is not None:
+            return image
+        self.request(folder, dpr)
+        self.loader.request(
+            (content_hash, dpr),
+            self.catalog.source(entry),
+            self._pixel_size(dpr),
+            IconLoader.PRIORITY_VISIBLE
+        )
+        return None
+
+    def icon_for(self, entry, dpr):
+        """Wie ``image_for``, aber als QIcon für Views (Pixmap aus dem gemeinsamen Bild-Cache)."""
+        key = ImageCache.key(entry.get("hash"), self.icon_size, dpr)
+        pixmap = self.image_cache.get(key)
+        if pixmap is None:
+            image = self.image_for(entry, dpr)
+            if image is None:
+                return None
+            pixmap = QPixmap.fromImage(image)
+            pixmap.setDevicePixelRatio(dpr)
+            self.image_cache.put(key, pixmap)
+        return QIcon(pixmap)
+
+    def request(self, folder, dpr):
+        """Plant das Rastern aller noch fehlenden Symbole eines Ordners im Hintergrund ein."""
+        key = (folder, dpr)
+        if key in self._building or self._atlas(folder, dpr) is not None:
+            return
+        missing = set()
+        for entry in self.catalog.entries_in(folder):
+            image_key = (entry["hash"], dpr)
+            if image_key in self._images:
+                continue
+            missing.add(entry["hash"])
+            self.loader.request(
+                image_key,
+                self.catalog.source(entry),
+                self._pixel_size(dpr),
+                IconLoader.PRIORITY_BACKGROUND
+            )
+        self._building[key] = missing
+        if not missing:
+            self._assemble(folder, dpr)
+
+    def set_visible(self, entries, dpr):
+        """Stuft sichtbar angeforderte, aber nicht mehr sichtbare Symbole zurück."""
+        visible = {(entry.get("hash"), dpr) for entry in entries}
+        for key in self.loader.visible_keys():
+            if key not in visible:
+                self.loader.set_priority(key, IconLoader.PRIORITY_BACKGROUND)
+
+    def cancel(self):
+        """Bricht alle wartenden Aufträge ab (z.B. wenn das Dock geschlossen wird)."""
+        self.loader.cancel()
+        self._building.clear()
+
+    def _on_image_ready(self, key, image):
+        content_hash, dpr = key
+        self._images[key] = image
+        self.signals.icon_ready.emit(content_hash, dpr)
+        for (folder, folder_dpr), missing in list(self._building.items()):
+            if folder_dpr != dpr or content_hash not in missing:
+                continue
+            missing.discard(content_hash)
+            if not missing:
+                self._assemble(folder, dpr)
+
+    def _assemble(self, folder, dpr):
+        """Setzt die Einzelbilder eines Ordners zum Atlas zusammen und speichert ihn."""
+        self._building.pop((folder, dpr), None)
+        entries = self.catalog.entries_in(folder)
+        unique = list(dict.fromkeys(entry["hash"] for entry in entries))
+        pixel_size = self._pixel_size(dpr)
+        rows = max(1, (len(unique) + self.COLUMNS - 1) // self.COLUMNS)
+        columns = min(self.COLUMNS, max(1, len(unique)))
+
+        atlas = QImage(columns * pixel_size, rows * pixel_size, QImage.Format_ARGB32_Premultiplied)
+        atlas.fill(Qt.transparent)
+        painter = QPainter(atlas)
+        cells = {}
+        for i, content_hash in enumerate(unique):
+            image = self._images.get((content_hash, dpr))
+            if image is None:
+                continue
+            x = (i % self.COLUMNS) * pixel_size
+            y = (i // self.COLUMNS) * pixel_size
+            painter.drawImage(x, y, image)
+            cells[content_hash] = [x, y]
+        painter.end()
+
+        self._atlases[(folder, dpr)] = (atlas, cells)
+        # Einzelbilder werden ab jetzt aus dem Atlas bedient (außer andere Ordner brauchen sie noch)
+        still_needed = {
+            entry["hash"]
+            for (other_folder, other_dpr) in self._building if other_dpr == dpr
+            for entry in self.catalog.entries_in(other_folder)
+        }
+        for content_hash in cells:
+            if content_hash not in still_needed:
+                self._images.pop((content_hash, dpr), None)
+        index = {"version": self.VERSION, "size": self.icon_size, "dpr": dpr, "cells": cells}
+        self.loader.pool.start(_AtlasSaveTask(self._base_path(folder, dpr), atlas.copy(), index))
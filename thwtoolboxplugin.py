@@ -1,6 +1,6 @@
 import os
 import uuid
-from PyQt5.QtCore import Qt, QSize, QEvent, QObject, QVariant
+from PyQt5.QtCore import Qt, QSize, QEvent, QObject, QVariant, QSettings
 from PyQt5.QtGui import QIcon, QDrag, QPixmap
 from PyQt5.QtWidgets import (
     QAction, QDockWidget, QWidget, QVBoxLayout,
@@ -13,15 +13,28 @@ from qgis.core import (
     QgsFeature, QgsGeometry, QgsPointXY,
     QgsMarkerSymbol, QgsSvgMarkerSymbolLayer,
     QgsVectorFileWriter, QgsProperty, QgsSingleSymbolRenderer,
-    QgsSymbolLayer, QgsFeatureRequest, QgsRendererCategory, QgsCategorizedSymbolRenderer, QgsUnitTypes, QgsMapLayer,
-    QgsPalLayerSettings, QgsTextFormat, QgsTextBufferSettings, QgsVectorLayerSimpleLabeling
+    QgsSymbolLayer, QgsRendererCategory, QgsCategorizedSymbolRenderer, QgsUnitTypes, QgsMapLayer,
+    QgsPalLayerSettings, QgsTextFormat, QgsTextBufferSettings, QgsVectorLayerSimpleLabeling,
+    QgsExpressionContextUtils, QgsApplication, QgsTask, QgsDataProvider
 )
 import time
 from qgis.PyQt.QtCore import QVariant
 from qgis.utils import iface
 from qgis.gui import QgsMapTool, QgsMapToolIdentify
-from .identifytool import FeatureDock
-from .thwtoolboxplugin_dock import SvgDock
+from .svg_store import SvgBlobStore
+from .svg_cache import SvgFileCache
+from .marker_index import MarkerIndex
+from .marker_queries import MarkerQueries
+from .marker_stats import MarkerStatistics
+from .marker_store import MarkerStore
+from .edit_session import EditSession
+from .image_cache import ImageCache
+from .startup_report import StartupReport
+from .instrumentation import instrumentation
+from .gpkg_relocation import backup_gpkg, move_companions, relocate_gpkg, remove_gpkg
+from .schema_migrator import SchemaMigrator, MARKER_FIELDS
+from .icon_loader import register_shared_fonts
+from .symbol_pack import PACK_NAME, open_symbol_pack
 
 
 class CanvasDropFilter(QObject):
@@ -52,15 +65,11 @@ class IdentifyTool(QgsMapToolIdentify):
         self.layer = layer_manager.layer
         self.setCursor(Qt.ArrowCursor)
         
-        # Dock-Widget erstellen
+        # Dock-Widget erstellen (Modul erst beim ersten Gebrauch laden)
+        from .identifytool import FeatureDock
         self.feature_dock = FeatureDock(layer_manager.iface.mainWindow())
         layer_manager.iface.addDockWidget(Qt.RightDockWidgetArea, self.feature_dock)
     
-    def _calculate_tolerance(self, feature):
-        """Berechnet die Toleranz für Feature-Erkennung basierend auf der Symbolgröße."""
-        symbol_size = feature["size"] if "size" in [field.name() for field in self.layer.fields()] else 30.0
-        return max(symbol_size * 0.5, 10.0)  # Mindestens 10 Map Units, sonst halbe Symbolgröße
-
     def canvasReleaseEvent(self, ev):
         if ev.button() != Qt.LeftButton:
             return
@@ -68,21 +77,10 @@ class IdentifyTool(QgsMapToolIdentify):
             # Konvertiere Mausposition zu Kartenkoordinaten
             point = self.canvas.getCoordinateTransform().toMapCoordinates(ev.pos().x(), ev.pos().y())
             
-            # Erstelle einen Feature-Request
-            request = QgsFeatureRequest()
-            request.setFilterRect(self.canvas.mapSettings().mapToLayerCoordinates(self.layer, self.canvas.extent()))
-            
-            # Suche nach Features in der Nähe des Klickpunkts
-            closest_feature = None
-            min_distance = float('inf')
-            
-            for feature in self.layer.getFeatures(request):
-                if feature.geometry():
-                    distance = feature.geometry().distance(QgsGeometry.fromPointXY(point))
-                    tolerance = self._calculate_tolerance(feature)
-                    if distance < min_distance and distance < tolerance:
-                        min_distance = distance
-                        closest_feature = feature
+            # Nächstgelegenes Feature über den räumlichen Index suchen
+            fid = self.layer_manager.marker_index.hit_test(point)
+            # Feature aus dem Speicher-Spiegel (ohne Zugriff auf die GeoPackage)
+            closest_feature = self.layer_manager.marker_store.feature(fid) if fid is not None else None
             
             if closest_feature:
                 self.feature_dock.show_feature(closest_feature, self.layer_manager)
@@ -115,18 +113,10 @@ class MoveTool(QgsMapTool):
         self.is_panning = False
         self.last_center = None
         self.last_pos = None
-        self.update_timer = None
         self.last_update_time = 0
-        self.update_interval = 100 # ms
         self.update_threshold = 0.1 # Map Units
-        self.is_editing = False
-        self.last_canvas_update = 0
-        self.last_dock_update = 0
-    
-    def _calculate_tolerance(self, feature):
-        """Berechnet die Toleranz für Feature-Erkennung basierend auf der Symbolgröße."""
-        symbol_size = feature["size"] if "size" in [field.name() for field in self.layer.fields()] else 30.0
-        return max(symbol_size * 0.5, 10.0)  # Mindestens 10 Map Units, sonst halbe Symbolgröße
+        # Vorschau des Markers während des Verschiebens
+        self.ghost_item = None
 
     def set_move_mode(self, enabled):
         self.is_move_mode = enabled
@@ -134,29 +124,25 @@ class MoveTool(QgsMapTool):
             self.setCursor(Qt.PointingHandCursor)
         else:
             self.setCursor(Qt.ArrowCursor)
+        self._remove_ghost()
         self.moving_feature = None
 
+    def deactivate(self):
+        """Bricht ein laufendes Verschieben ab und entfernt die Vorschau."""
+        self._remove_ghost()
+        self.moving_feature = None
+        self.last_pos = None
+        super().deactivate()
+
     def canvasMoveEvent(self, event):
         # Prüfe, ob der Cursor über einem Feature ist (nur alle 100ms wenn nicht im Move-Modus)
         if not self.moving_feature:
             current_time = time.time() * 1000  # Konvertiere zu Millisekunden
             if current_time - self.last_update_time > 100:  # Nur alle 100ms Feature-Suche
                 point = self.canvas.getCoordinateTransform().toMapCoordinates(event.pos().x(), event.pos().y())
-                request = QgsFeatureRequest()
-                request.setFilterRect(self.canvas.mapSettings().mapToLayerCoordinates(self.layer, self.canvas.extent()))
-                
-                closest_feature = None
-                min_distance = float('inf')
                 
-                for feature in self.layer.getFeatures(request):
-                    if feature.geometry():
-                        distance = feature.geometry().distance(QgsGeometry.fromPointXY(point))
-                        tolerance = self._calculate_tolerance(feature)
-                        if distance < min_distance and distance < tolerance:
-                            min_distance = distance
-                            closest_feature = feature
-                
-                if closest_feature:
+                # Für den Cursor genügt die ID aus dem räumlichen Index
+                if self.layer_manager.marker_index.hit_test(point) is not None:
                     self.setCursor(Qt.PointingHandCursor)
                 else:
                     self.setCursor(Qt.ArrowCursor)
@@ -167,41 +153,13 @@ class MoveTool(QgsMapTool):
             self.setCursor(Qt.ClosedHandCursor)
 
         if self.moving_feature:
-            # Aktualisiere die Position des Features mit verbessertem Throttling
+            # Nur die Vorschau verschieben - der Layer bleibt bis zum Loslassen unverändert
             point = self.canvas.getCoordinateTransform().toMapCoordinates(event.pos().x(), event.pos().y())
-            current_time = time.time() * 1000  # Konvertiere zu Millisekunden
-            
-            # Nur aktualisieren, wenn sich die Position signifikant geändert hat und genug Zeit vergangen ist
-            should_update = False
-            if self.last_pos is None:
-                should_update = True
-            elif point.distance(self.last_pos) > self.update_threshold:
-                if current_time - self.last_update_time > self.update_interval:
-                    should_update = True
-            
-            if should_update:
-                # Layer nur einmal in den Edit-Modus versetzen
-                if not self.is_editing:
-                    self.layer.startEditing()
-                    self.is_editing = True
-                
-                # Feature-Position aktualisieren
-                self.layer.changeGeometry(self.moving_feature.id(), QgsGeometry.fromPointXY(point))
-                self.last_pos = point
-                self.last_update_time = current_time
-                
-                # Koordinaten im Dock nur alle 300ms aktualisieren
-                if current_time - self.last_dock_update > 300:
-                    if hasattr(self.layer_manager, 'ident_tool') and hasattr(self.layer_manager.ident_tool, 'feature_dock'):
-                        feature = self.layer.getFeature(self.moving_feature.id())
-                        if feature.isValid():
-                            self.layer_manager.ident_tool.feature_dock.show_feature(feature, self.layer_manager)
-                        self.last_dock_update = current_time
-                
-                # Canvas nur alle 150ms aktualisieren
-                if current_time - self.last_canvas_update > 150:
-                    self.canvas.refresh()
-                    self.last_canvas_update = current_time
+            if self.ghost_item is None:
+                self._create_ghost()
+            if self.ghost_item is not None:
+                self.ghost_item.set_center(point)
+            self.last_pos = point
         elif not self.is_panning and self.pan_start and self.last_center:
             # Normales Pan-Verhalten
             dx = event.pos().x() - self.pan_start.x()
@@ -223,20 +181,9 @@ class MoveTool(QgsMapTool):
         point = self.canvas.getCoordinateTransform().toMapCoordinates(event.pos().x(), event.pos().y())
         self.last_pos = point
         
-        # Suche nach dem nächsten Feature
-        request = QgsFeatureRequest()
-        request.setFilterRect(self.canvas.mapSettings().mapToLayerCoordinates(self.layer, self.canvas.extent()))
-        
-        closest_feature = None
-        min_distance = float('inf')
-        
-        for feature in self.layer.getFeatures(request):
-            if feature.geometry():
-                distance = feature.geometry().distance(QgsGeometry.fromPointXY(point))
-                tolerance = self._calculate_tolerance(feature)
-                if distance < min_distance and distance < tolerance:
-                    min_distance = distance
-                    closest_feature = feature
+        # Suche nach dem nächsten Feature über den räumlichen Index
+        fid = self.layer_manager.marker_index.hit_test(point)
+        closest_feature = self.layer_manager.marker_store.feature(fid) if fid is not None else None
         
         if closest_feature:
             self.moving_feature = closest_feature
@@ -250,13 +197,62 @@ class MoveTool(QgsMapTool):
             self.is_panning = True
             self.last_center = self.canvas.center()
 
+    def _create_ghost(self):
+        """Erzeugt die Vorschau für das gerade verschobene Feature."""
+        feat = self.moving_feature
+        fields = feat.fields().names()
+        size = feat.attribute("size") if "size" in fields and feat.attribute("size") else 30.0
+        scale_with_map = feat.attribute("scale_with_map") if "scale_with_map" in fields else False
+        try:
+            svg_file = self.layer_manager.resolve_svg_file(feat)
+        except Exception as e:
+            print(f"DEBUG: SVG für Vorschau nicht verfügbar: {e}")
+            svg_file = None
+        from .marker_ghost import MarkerGhostItem
+        self.ghost_item = MarkerGhostItem(self.canvas, svg_file, float(size), bool(scale_with_map))
+
+    def _remove_ghost(self):
+        if self.ghost_item is not None:
+            self.ghost_item.remove()
+            self.ghost_item = None
+
+    def _moving_fid(self):
+        """Aktuelle Feature-ID des verschobenen Markers.
+        
+        Wird ein neuer Marker während des Ziehens im Hintergrund gespeichert,
+        erhält er eine neue Feature-ID; sie wird über die unique_id aufgelöst.
+        """
+        feat = self.moving_feature
+        store = self.layer_manager.marker_store
+        if feat.id() in store:
+            return feat.id()
+        unique_id = feat.attribute("unique_id") if "unique_id" in feat.fields().names() else None
+        fid = store.fid_for(unique_id) if unique_id else None
+        return fid if fid is not None else feat.id()
+
     def canvasReleaseEvent(self, event):
         if event.button() == Qt.LeftButton:
             if self.moving_feature:
-                # Layer-Änderungen committen wenn im Edit-Modus
-                if self.is_editing:
-                    self.layer.commitChanges()
-                    self.is_editing = False
+                fid = self._moving_fid()
+                start_point = self.moving_feature.geometry().asPoint()
+                moved = self.ghost_item is not None and self.last_pos is not None
+                self._remove_ghost()
+                
+                # Geometrie einmalig schreiben und nur den Marker-Layer neu zeichnen
+                if moved and self.last_pos.distance(start_point) > self.update_threshold:
+                    if self.layer_manager._write_behind_active():
+                        self.layer_manager.write_behind.change_geometry(fid, self.last_pos)
+                    else:
+                        self.layer.startEditing()
+                        self.layer.changeGeometry(fid, QgsGeometry.fromPointXY(self.last_pos))
+                        self.layer.commitChanges()
+                    self.layer.triggerRepaint()
+                    
+                    # Koordinaten im Dock aktualisieren
+                    if hasattr(self.layer_manager, 'ident_tool') and hasattr(self.layer_manager.ident_tool, 'feature_dock'):
+                        feature = self.layer_manager.marker_store.feature(fid)
+                        if feature.isValid():
+                            self.layer_manager.ident_tool.feature_dock.show_feature(feature, self.layer_manager)
                 
                 self.moving_feature = None
                 self.last_pos = None
@@ -269,10 +265,41 @@ class MoveTool(QgsMapTool):
 
 
 class THWToolboxPlugin:
+    # Renderer-Modi: ein datengesteuertes Symbol für alle Features oder eine Kategorie pro Feature
+    RENDERER_MODE_DATA_DEFINED = "data_defined"
+    RENDERER_MODE_CATEGORIZED = "categorized"
+    # Versionskennung des datengesteuerten Renderers (für die Migration beim Laden)
+    DATA_DEFINED_RENDERER_VERSION = "data_defined_v4"
+    # Schritte, die nicht mehr in initGui laufen (für den Startbericht)
+    STARTUP_DEFERRED_STEPS = (
+        "Marker-Layer und Renderer",
+        "Symbol-Dock",
+        "Marker-Dock",
+        "Aufräumen temporärer Dateien",
+    )
+    # SVG-Pfad: Cache-Datei zum Inhalts-Hash (von _materialize_svg_cache geschrieben),
+    # ohne Hash die Bibliotheksdatei (relative Pfade gegen das Plugin-Verzeichnis).
+    # Bewusst ohne file_exists(), das erst neuere QGIS-Versionen kennen.
+    SVG_PATH_EXPRESSION = (
+        "coalesce(@thw_svg_cache_dir || '/' || \"svg_hash\" || '.svg', "
+        "CASE WHEN left(\"svg_path\", 1) = '/' OR substr(\"svg_path\", 2, 1) = ':' "
+        "THEN \"svg_path\" "
+        "ELSE @thw_plugin_dir || '/' || \"svg_path\" END)"
+    )
+
     def __init__(self, iface):
         self.iface = iface
         self.canvas = iface.mapCanvas()
         self.plugin_dir = os.path.dirname(__file__)
+        # Startzeit und verschobene Schritte (Docks, Layer, Aufräumen)
+        self.startup_report = StartupReport()
+        self._cleanup_task = None
+        self.diagnostics_action = None
+        self.diagnostics_dock = None
+        # Zeitmessungen nur auf Wunsch (Einstellung bzw. Diagnose-Dock)
+        instrumentation.enabled = self._diagnostics_enabled()
+        # DEBUG-Ausgaben der gemessenen Pfade nur auf Wunsch (verfälschen sonst p50/p95)
+        instrumentation.debug_output = self._debug_output_enabled()
         self.layer = None
         self.current_svg = None
         self.drop_filter = None
@@ -280,6 +307,36 @@ class THWToolboxPlugin:
         self.move_tool = None
         self.action = None
         self.dock = None
+        self._signal_layer = None
+        self._renderer_fids = {}
+        self._svg_store = None
+        # Gepackte Symbolbibliothek (svgs.pack), wird beim ersten Zugriff geöffnet
+        self._symbol_pack = None
+        self._symbol_pack_checked = False
+        # Spiegel aller Marker im Speicher für die Lesezugriffe der Werkzeuge;
+        # einziger Abnehmer der Layer-Signale für Index und Kennzahlen
+        self.marker_store = MarkerStore()
+        self.marker_index = MarkerIndex(self.marker_store)
+        # Projizierte Abfragen auf den Marker-Layer (nur benötigte Spalten)
+        self.marker_queries = MarkerQueries()
+        # Inkrementell gepflegte Kennzahlen (z.B. kleinste Größe beim Platzieren)
+        self.marker_stats = MarkerStatistics(self.marker_store)
+        # Gebündelte Attributänderungen aus dem Marker-Dock; im Write-Behind-Modus
+        # übernimmt die Write-Behind-Sitzung alle Marker-Änderungen
+        self.write_behind = None
+        if self._write_behind_enabled():
+            from .write_behind import WriteBehindSession
+            self.write_behind = WriteBehindSession(self.marker_store)
+            self.write_behind.fids_remapped.connect(self._on_write_behind_fids_remapped)
+            self.edit_session = self.write_behind
+        else:
+            self.edit_session = EditSession()
+        self.svg_cache = SvgFileCache(
+            os.path.join(self.plugin_dir, "cache", "svg"),
+            self._svg_cache_budget()
+        )
+        # Gemeinsamer Cache dekodierter Symbolbilder für alle Docks
+        self.image_cache = ImageCache(self._image_cache_budget())
 
     def _show_error_alert(self, title, message, details=None):
         """Zeigt einen Fehler-Alert mit optionalen Details."""
@@ -301,19 +358,36 @@ class THWToolboxPlugin:
         )
 
     def initGui(self):
-        icon = QIcon(os.path.join(self.plugin_dir, "icons", "icon.svg"))
-        self.action = QAction(icon, "THW Toolbox", self.iface.mainWindow())
-        self.action.triggered.connect(self.activate)
-        self.iface.addToolBarIcon(self.action)
-        self.iface.addPluginToMenu("THW Toolbox", self.action)
-        
-        # Export-Aktion hinzufügen
-        self.export_action = QAction("Portables Paket exportieren", self.iface.mainWindow())
-        self.export_action.triggered.connect(self._export_portable_package)
-        self.iface.addPluginToMenu("THW Toolbox", self.export_action)
-        
-        # Verbinde Projekt-Events für automatisches Speichern
-        QgsProject.instance().writeProject.connect(self._on_project_save)
+        # Beim Start nur Aktionen registrieren - Docks, Layer und Aufräumen
+        # folgen beim ersten Gebrauch bzw. im Hintergrund
+        with self.startup_report.measure("initGui"):
+            # Gemeinsame Schrift der SVG-Symbole (nicht mehr in jede Datei eingebettet)
+            register_shared_fonts(os.path.join(self.plugin_dir, "fonts"))
+            
+            icon = QIcon(os.path.join(self.plugin_dir, "icons", "icon.svg"))
+            self.action = QAction(icon, "THW Toolbox", self.iface.mainWindow())
+            self.action.triggered.connect(self.activate)
+            self.iface.addToolBarIcon(self.action)
+            self.iface.addPluginToMenu("THW Toolbox", self.action)
+            
+            # Export-Aktion hinzufügen
+            self.export_action = QAction("Portables Paket exportieren", self.iface.mainWindow())
+            self.export_action.triggered.connect(self._export_portable_package)
+            self.iface.addPluginToMenu("THW Toolbox", self.export_action)
+            
+            # Diagnose-Dock (wird erst beim Öffnen geladen)
+            self.diagnostics_action = QAction("Diagnose", self.iface.mainWindow())
+            self.diagnostics_action.triggered.connect(self._show_diagnostics)
+            self.iface.addPluginToMenu("THW Toolbox", self.diagnostics_action)
+            
+            # Verbinde Projekt-Events für automatisches Speichern
+            QgsProject.instance().writeProject.connect(self._on_project_save)
+            # Renderer bestehender Projekte beim Laden migrieren
+            QgsProject.instance().readProject.connect(self._on_project_read)
+        
+        for step in self.STARTUP_DEFERRED_STEPS:
+            self.startup_report.defer(step)
+        self.startup_report.print_report()
 
     def unload(self):
         if self.dock:
@@ -329,33 +403,46 @@ class THWToolboxPlugin:
             self.iface.removePluginMenu("THW Toolbox", self.action)
         if self.export_action:
             self.iface.removePluginMenu("THW Toolbox", self.export_action)
+        if self.diagnostics_action:
+            self.iface.removePluginMenu("THW Toolbox", self.diagnostics_action)
+        if self.diagnostics_dock:
+            self.iface.removeDockWidget(self.diagnostics_dock)
         
         # Trenne Projekt-Events
         QgsProject.instance().writeProject.disconnect(self._on_project_save)
+        QgsProject.instance().readProject.disconnect(self._on_project_read)
+        self._disconnect_layer_signals()
+        
+        # Memory-Mapping der Symbolbibliothek freigeben (sonst bleibt die Datei unter Windows gesperrt)
+        if self._symbol_pack is not None:
+            self._symbol_pack.close()
+            self._symbol_pack = None
+            self._symbol_pack_checked = False
         
         # Räume temporäre Dateien auf
         self._cleanup_temp_files()
 
     def activate(self):
-        print("DEBUG: Plugin wird aktiviert")
-        
-        # Bereinige alte temporäre Dateien beim Start
-        self._cleanup_temp_files()
-        
-        self._init_layer()
-        print(f"DEBUG: Layer initialisiert: {self.layer}")
-        self._init_dock()
+        instrumentation.debug("DEBUG: Plugin wird aktiviert")
+        first_activation = self.ident_tool is None
+        
+        with self.startup_report.run_deferred("Marker-Layer und Renderer"):
+            self._init_layer()
+        instrumentation.debug(f"DEBUG: Layer initialisiert: {self.layer}")
+        with self.startup_report.run_deferred("Symbol-Dock"):
+            self._init_dock()
         # Drag & Drop
         if not self.drop_filter:
-            print("DEBUG: Erstelle CanvasDropFilter")
+            instrumentation.debug("DEBUG: Erstelle CanvasDropFilter")
             df = CanvasDropFilter(self.canvas, self._place_feature)
             self.drop_filter = df
             self.canvas.viewport().installEventFilter(df)
             self.canvas.setAcceptDrops(True)
-            print("DEBUG: CanvasDropFilter installiert")
+            instrumentation.debug("DEBUG: CanvasDropFilter installiert")
         # IdentifyTool
         if not self.ident_tool:
-            self.ident_tool = IdentifyTool(self.canvas, self)
+            with self.startup_report.run_deferred("Marker-Dock"):
+                self.ident_tool = IdentifyTool(self.canvas, self)
         else:
             # IdentifyTool existiert bereits, zeige das Feature-Dock an
             if hasattr(self.ident_tool, 'feature_dock'):
@@ -365,19 +452,79 @@ class THWToolboxPlugin:
         if not self.move_tool:
             self.move_tool = MoveTool(self.canvas, self)
         self.canvas.setMapTool(self.move_tool)
+        
+        # Alte temporäre Dateien im Hintergrund bereinigen
+        if first_activation:
+            self._start_background_cleanup()
+            self.startup_report.print_report()
+
+    def _start_background_cleanup(self):
+        """Startet das Aufräumen temporärer Dateien als QgsTask (reine Dateioperationen)."""
+        # Die GeoPackage des aktiven Layers darf nicht gelöscht werden
+        keep_paths = set()
+        for lyr in QgsProject.instance().mapLayersByName("THW Toolbox Marker"):
+            keep_paths.add(os.path.normcase(os.path.abspath(lyr.source().split("|")[0])))
+        
+        def run(task):
+            # Nur Dateioperationen im Worker-Thread; Meldungen und Startbericht gibt on_finished aus
+            messages = []
+            start = time.perf_counter()
+            self._cleanup_temp_files(keep_paths, messages.append)
+            return time.perf_counter() - start, messages
+        
+        def on_finished(exception, result=None):
+            # Läuft im GUI-Thread
+            if exception is not None or result is None:
+                print(f"DEBUG: Aufräumen temporärer Dateien fehlgeschlagen: {exception}")
+                return
+            seconds, messages = result
+            for message in messages:
+                print(message)
+            self.startup_report.record_deferred("Aufräumen temporärer Dateien", seconds)
+            self.startup_report.print_report()
+        
+        # Referenz halten, sonst wird die Task vom Garbage Collector entfernt
+        self._cleanup_task = QgsTask.fromFunction("THW Toolbox: temporäre Dateien aufräumen", run,
+                                                  on_finished=on_finished)
+        QgsApplication.taskManager().addTask(self._cleanup_task)
 
     def _init_layer(self):
-        print("DEBUG: _init_layer wird aufgerufen")
+        instrumentation.debug("DEBUG: _init_layer wird aufgerufen")
         proj = QgsProject.instance()
         pfile = proj.fileName()
-        print(f"DEBUG: Projektdatei: {pfile}")
+        instrumentation.debug(f"DEBUG: Projektdatei: {pfile}")
         
         # Prüfe, ob der Layer bereits im Projekt existiert
         existing_layers = QgsProject.instance().mapLayersByName("THW Toolbox Marker")
-        print(f"DEBUG: Bestehende Layer gefunden: {len(existing_layers)}")
+        instrumentation.debug(f"DEBUG: Bestehende Layer gefunden: {len(existing_layers)}")
         if existing_layers:
             self.layer = existing_layers[0]
-            print(f"DEBUG: Verwende bestehenden Layer: {self.layer}")
+            instrumentation.debug(f"DEBUG: Verwende bestehenden Layer: {self.layer}")
+            # Ältere Marker-Tabellen direkt in der GeoPackage auf das aktuelle Schema bringen
+            if self.layer.providerType() == "ogr":
+                try:
+                    table = self.layer.dataProvider().uri().param("layername") or "taktische_zeichen"
+                    gpkg = self.layer.source().split("|")[0]
+                    if SchemaMigrator(gpkg, table).migrate() < SchemaMigrator.VERSION:
+                        self.layer.dataProvider().reloadData()
+                        self.layer.updateFields()
+                except Exception as e:
+                    instrumentation.debug(f"DEBUG: Schema-Migration fehlgeschlagen: {e}")
+            # Renderer nur neu aufbauen, wenn er nicht zum eingestellten Modus passt
+            if self._renderer_mode() == self.RENDERER_MODE_DATA_DEFINED:
+                if not self._is_data_defined_renderer(self.layer):
+                    self._init_renderer(self.layer)
+                else:
+                    # Gespeicherter Renderer: Cache und Pfade für diese Sitzung bereitstellen
+                    self._prepare_data_defined_layer(self.layer)
+            elif self._categorized_renderer() is None:
+                self._init_renderer(self.layer)
+            else:
+                self._renderer_fids = {
+                    feat.id(): feat.attribute("unique_id")
+                    for feat in self._queries_for(self.layer).features("ids")
+                }
+            self._connect_layer_signals(self.layer)
             return
         
         crs = self.canvas.mapSettings().destinationCrs().authid()
@@ -401,21 +548,19 @@ class THWToolboxPlugin:
             safe_name = f"{safe_name}_{timestamp}"
             
             gpkg = os.path.join(self.plugin_dir, f"{safe_name}_taktischezeichen.gpkg")
-            print(f"DEBUG: Erstelle eindeutige Datei für ungespeichertes Projekt: {gpkg}")
+            instrumentation.debug(f"DEBUG: Erstelle eindeutige Datei für ungespeichertes Projekt: {gpkg}")
         
         lname = "taktische_zeichen"
 
         # Erstelle oder lade die GeoPackage
         if os.path.exists(gpkg):
+            # Schema vor dem Öffnen aktualisieren, damit der Layer alle Felder sieht
+            try:
+                SchemaMigrator(gpkg, lname).migrate()
+            except Exception as e:
+                instrumentation.debug(f"DEBUG: Schema-Migration fehlgeschlagen: {e}")
             uri = f"{gpkg}|layername={lname}"
             lyr = QgsVectorLayer(uri, "THW Toolbox Marker", "ogr")
-            
-            # Prüfen ob die Felder existieren
-            existing_fields = [field.name() for field in lyr.fields()]
-            if "scale_with_map" not in existing_fields or "svg_content" not in existing_fields:
-                # Layer mit neuen Feldern aktualisieren
-                self._update_layer_fields(lyr, gpkg, lname)
-                lyr = QgsVectorLayer(uri, "THW Toolbox Marker", "ogr")
         else:
             # Erstelle neue GeoPackage mit allen Feldern
             lyr = self._create_new_layer(gpkg, lname, crs)
@@ -425,11 +570,12 @@ class THWToolboxPlugin:
         
         # Layer zuerst setzen, dann Renderer initialisieren
         self.layer = lyr
-        print(f"DEBUG: Neuer Layer gesetzt: {self.layer}")
+        instrumentation.debug(f"DEBUG: Neuer Layer gesetzt: {self.layer}")
         QgsProject.instance().addMapLayer(lyr)
-        print("DEBUG: Layer zum Projekt hinzugefügt")
+        instrumentation.debug("DEBUG: Layer zum Projekt hinzugefügt")
         self._init_renderer(lyr)
-        print("DEBUG: Renderer initialisiert")
+        instrumentation.debug("DEBUG: Renderer initialisiert")
+        self._connect_layer_signals(lyr)
 
     def _init_dock(self):
         if self.dock:
@@ -439,13 +585,70 @@ class THWToolboxPlugin:
             return
         self.dock = QDockWidget("Taktische Zeichen", self.iface.mainWindow())
         self.dock.setAllowedAreas(Qt.RightDockWidgetArea)
-        self.svg_dock_widget = SvgDock(self.plugin_dir, self._on_svg_drag_start)
+        from .thwtoolboxplugin_dock import SvgDock
+        self.svg_dock_widget = SvgDock(self.plugin_dir, self._on_svg_drag_start, self.image_cache, self._get_symbol_pack())
         self.dock.setWidget(self.svg_dock_widget)
         self.iface.addDockWidget(Qt.RightDockWidgetArea, self.dock)
 
     def _on_svg_drag_start(self, svg_path):
         self.current_svg = svg_path
 
+    def _get_symbol_pack(self):
+        """Liefert die gepackte Symbolbibliothek (svgs.pack) oder None, wenn sie fehlt."""
+        if not self._symbol_pack_checked:
+            self._symbol_pack_checked = True
+            self._symbol_pack = open_symbol_pack(self.plugin_dir)
+        return self._symbol_pack
+
+    def _read_library_svg(self, svg_path):
+        """Liest ein Bibliothekssymbol aus svgs.pack bzw. aus der Datei (None, wenn es fehlt)."""
+        pack = self._get_symbol_pack()
+        if pack is not None:
+            try:
+                name = os.path.relpath(svg_path, os.path.join(self.plugin_dir, "svgs")).replace(os.sep, "/")
+            except ValueError:
+                # Anderes Laufwerk (Windows) - kein Bibliothekssymbol
+                name = None
+            data = pack.read(name) if name else None
+            if data is not None:
+                return data.decode("utf-8")
+        if not os.path.exists(svg_path):
+            return None
+        with open(svg_path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def _library_base_dir(self):
+        """Verzeichnis, gegen das relative svg_path-Werte im datengesteuerten Renderer aufgelöst werden.
+        
+        Ist nur svgs.pack installiert (kein 'svgs'-Ordner), werden die im Layer
+        verwendeten Symbole nach cache/library entpackt (_extract_library_svg).
+        """
+        if os.path.isdir(os.path.join(self.plugin_dir, "svgs")) or self._get_symbol_pack() is None:
+            return self.plugin_dir
+        return os.path.join(self.plugin_dir, "cache", "library")
+
+    def _extract_library_svg(self, svg_path):
+        """Entpackt ein verwendetes Bibliothekssymbol aus svgs.pack (nur ohne 'svgs'-Ordner)."""
+        base_dir = self._library_base_dir()
+        if not svg_path or base_dir == self.plugin_dir:
+            return
+        svg_path = str(svg_path).replace("\\", "/")
+        if svg_path.startswith("/") or svg_path[1:2] == ":":
+            # Absolute Pfade verweisen nicht auf die Bibliothek
+            return
+        target = os.path.join(base_dir, *svg_path.split("/"))
+        if os.path.exists(target):
+            return
+        svg_content = self._read_library_svg(os.path.join(self.plugin_dir, svg_path))
+        if svg_content is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'w', encoding='utf-8') as f:
+                f.write(svg_content)
+        except OSError as e:
+            print(f"DEBUG: Konnte Bibliothekssymbol {svg_path} nicht entpacken: {e}")
+
     def _create_new_layer(self, gpkg, lname, crs):
         """Erstellt einen neuen Layer mit allen erforderlichen Feldern."""
         try:
@@ -455,16 +658,7 @@ class THWToolboxPlugin:
             # Erstelle temporären Memory-Layer
             mem = QgsVectorLayer(f"Point?crs={crs}", "temp", "memory")
             dp = mem.dataProvider()
-            dp.addAttributes([
-                QgsField("name", QVariant.String),
-                QgsField("svg_path", QVariant.String),
-                QgsField("svg_content", QVariant.String),
-                QgsField("size", QVariant.Double),
-                QgsField("scale_with_map", QVariant.Bool),
-                QgsField("unique_id", QVariant.String),
-                QgsField("label", QVariant.String),
-                QgsField("show_label", QVariant.Bool),
-            ])
+            dp.addAttributes(self._marker_fields())
             mem.updateFields()
             
             # Speichere als GeoPackage
@@ -481,6 +675,10 @@ class THWToolboxPlugin:
                 )
                 return None
             
+            # Blob-Tabelle für die SVG-Inhalte anlegen und Schema-Version vermerken
+            SvgBlobStore(gpkg).ensure_table()
+            SchemaMigrator(gpkg, lname).migrate()
+            
             # Lade den gespeicherten Layer
             uri = f"{gpkg}|layername={lname}"
             return QgsVectorLayer(uri, "THW Toolbox Marker", "ogr")
@@ -496,84 +694,11 @@ class THWToolboxPlugin:
             return None
 
     def _update_layer_fields(self, old_layer, gpkg, lname):
-        """Aktualisiert einen bestehenden Layer mit neuen Feldern."""
+        """Aktualisiert einen bestehenden Layer direkt in der GeoPackage auf das aktuelle Schema."""
         try:
-            crs = self.canvas.mapSettings().destinationCrs().authid()
-            mem = QgsVectorLayer(f"Point?crs={crs}", "temp", "memory")
-            dp = mem.dataProvider()
-            dp.addAttributes([
-                QgsField("name", QVariant.String),
-                QgsField("svg_path", QVariant.String),
-                QgsField("svg_content", QVariant.String),
-                QgsField("size", QVariant.Double),
-                QgsField("scale_with_map", QVariant.Bool),
-                QgsField("unique_id", QVariant.String),
-                QgsField("label", QVariant.String),
-                QgsField("show_label", QVariant.Bool),
-            ])
-            mem.updateFields()
-            
-            # Features kopieren
-            existing_fields = [field.name() for field in old_layer.fields()]
-            for feat in old_layer.getFeatures():
-                new_feat = QgsFeature(mem.fields())
-                new_feat.setGeometry(feat.geometry())
-                new_feat.setAttribute("name", feat.attribute("name"))
-                new_feat.setAttribute("svg_path", feat.attribute("svg_path"))
-                svg_content = feat.attribute("svg_content") if "svg_content" in existing_fields else ""
-                new_feat.setAttribute("svg_content", svg_content)
-                new_feat.setAttribute("size", feat.attribute("size"))
-                new_feat.setAttribute("scale_with_map", feat.attribute("scale_with_map") if "scale_with_map" in existing_fields else False)
-                new_feat.setAttribute("unique_id", feat.attribute("unique_id") if "unique_id" in existing_fields else str(uuid.uuid4()))
-                
-                # Label: Verwende vorhandenes oder erstelle Standard-Label
-                if "label" in existing_fields and feat.attribute("label"):
-                    new_feat.setAttribute("label", feat.attribute("label"))
-                else:
-                    # Erstelle Standard-Label aus SVG-Namen
-                    svg_name = feat.attribute("name") or os.path.basename(feat.attribute("svg_path"))
-                    default_label = os.path.splitext(svg_name)[0].replace("_", " ")
-                    new_feat.setAttribute("label", default_label)
-                
-                new_feat.setAttribute("show_label", feat.attribute("show_label") if "show_label" in existing_fields else False)
-                mem.dataProvider().addFeature(new_feat)
-            
-            # Temporäre Datei verwenden, um Konflikte zu vermeiden
-            temp_gpkg = gpkg + ".temp"
-            
-            # Speichere zuerst in temporäre Datei
-            opts = QgsVectorFileWriter.SaveVectorOptions()
-            opts.driverName = "GPKG"
-            opts.layerName = lname
-            opts.actionOnExistingFile = QgsVectorFileWriter.CreateOrOverwriteLayer
-            
-            result = QgsVectorFileWriter.writeAsVectorFormatV2(mem, temp_gpkg, QgsProject.instance().transformContext(), opts)
-            
-            if result[0] != QgsVectorFileWriter.NoError:
-                self._show_error_alert(
-                    "Layer-Aktualisierungsfehler",
-                    f"Konnte Layer-Felder nicht aktualisieren: {result[1]}",
-                    f"Pfad: {gpkg}\nFehler: {result[1]}"
-                )
-                return
-            
-            # Alten Layer entfernen
-            old_layer_id = old_layer.id()
-            QgsProject.instance().removeMapLayer(old_layer_id)
-            
-            # Temporäre Datei über die ursprüngliche Datei kopieren
-            import shutil
-            try:
-                shutil.move(temp_gpkg, gpkg)
-            except Exception as e:
-                # Falls das Verschieben fehlschlägt, versuche zu kopieren und dann zu löschen
-                shutil.copy2(temp_gpkg, gpkg)
-                try:
-                    os.remove(temp_gpkg)
-                except:
-                    pass
-                print(f"Warnung: Temporäre Datei konnte nicht verschoben werden: {e}")
-            
+            if SchemaMigrator(gpkg, lname).migrate() < SchemaMigrator.VERSION and old_layer is not None:
+                old_layer.dataProvider().reloadData()
+                old_layer.updateFields()
         except Exception as e:
             error_msg = f"Fehler beim Aktualisieren der Layer-Felder: {str(e)}"
             print(error_msg)
@@ -583,70 +708,355 @@ class THWToolboxPlugin:
                 f"Pfad: {gpkg}\nFehler: {str(e)}"
             )
 
+    def _marker_fields(self):
+        """Felder der Marker-Tabelle als QgsField-Liste (Definition in schema_migrator)."""
+        types = {"TEXT": QVariant.String, "REAL": QVariant.Double, "BOOLEAN": QVariant.Bool}
+        return [QgsField(name, types[sql_type]) for name, sql_type in MARKER_FIELDS]
+
+    def _svg_cache_budget(self):
+        """Größenbudget des SVG-Caches in Bytes (Einstellung thw_toolbox/svg_cache_max_mb)."""
+        try:
+            max_mb = float(QSettings().value("thw_toolbox/svg_cache_max_mb", 64))
+        except (TypeError, ValueError):
+            max_mb = 64
+        return int(max(max_mb, 1) * 1024 * 1024)
+
+    def _diagnostics_enabled(self):
+        """Ob Zeitmessungen und Zähler erfasst werden (Einstellung thw_toolbox/diagnostics_enabled)."""
+        value = QSettings().value("thw_toolbox/diagnostics_enabled", False)
+        if isinstance(value, str):
+            return value.lower() in ("true", "1")
+        return bool(value)
+
+    def _debug_output_enabled(self):
+        """Ob die gemessenen Pfade DEBUG-Ausgaben schreiben (Einstellung thw_toolbox/debug_output)."""
+        value = QSettings().value("thw_toolbox/debug_output", False)
+        if isinstance(value, str):
+            return value.lower() in ("true", "1")
+        return bool(value)
+
+    def _write_behind_enabled(self):
+        """Ob Marker-Änderungen verzögert im Hintergrund gespeichert werden (Einstellung thw_toolbox/write_behind)."""
+        value = QSettings().value("thw_toolbox/write_behind", False)
+        if isinstance(value, str):
+            return value.lower() in ("true", "1")
+        return bool(value)
+
+    def _write_behind_active(self):
+        """Ob der aktuelle Layer über die Write-Behind-Sitzung bearbeitet wird."""
+        return self.write_behind is not None and self.layer is not None and self.write_behind.layer is self.layer
+
+    def _on_write_behind_fids_remapped(self, remap):
+        """Nach dem Hintergrund-Speichern: neue Marker haben ihre endgültige Feature-ID (alt -> neu)."""
+        # Index und Kennzahlen folgen über die Meldungen des Speichers
+        self.marker_store.remap_fids(remap)
+        for old_fid, new_fid in remap.items():
+            unique_id = self._renderer_fids.pop(old_fid, None)
+            if unique_id is not None:
+                self._renderer_fids[new_fid] = unique_id
+        dock = getattr(self.ident_tool, 'feature_dock', None) if self.ident_tool else None
+        feat = getattr(dock, 'feat', None) if dock else None
+        if feat is not None and feat.id() in remap:
+            feat.setId(remap[feat.id()])
+
+    def _show_diagnostics(self):
+        """Öffnet das Diagnose-Dock mit Latenzen und Zählern."""
+        if self.diagnostics_dock is None:
+            from .diagnostics_dock import DiagnosticsDock
+            self.diagnostics_dock = DiagnosticsDock(
+                instrumentation,
+                lambda: {"image_cache": self.image_cache.stats(),
+                         "markers": dict(self.marker_stats.summary(), indexed=len(self.marker_index))},
+                self.iface.mainWindow()
+            )
+            self.iface.addDockWidget(Qt.RightDockWidgetArea, self.diagnostics_dock)
+        self.diagnostics_dock.show()
+        self.diagnostics_dock.raise_()
+
+    def _image_cache_budget(self):
+        """Speicherbudget des Bild-Caches in Bytes (Einstellung thw_toolbox/image_cache_max_mb)."""
+        try:
+            max_mb = float(QSettings().value("thw_toolbox/image_cache_max_mb", 32))
+        except (TypeError, ValueError):
+            max_mb = 32
+        return int(max(max_mb, 1) * 1024 * 1024)
+
+    def _renderer_mode(self):
+        """Liefert den eingestellten Renderer-Modus (Standard: datengesteuert)."""
+        mode = QSettings().value("thw_toolbox/renderer_mode", self.RENDERER_MODE_DATA_DEFINED)
+        if mode not in (self.RENDERER_MODE_DATA_DEFINED, self.RENDERER_MODE_CATEGORIZED):
+            return self.RENDERER_MODE_DATA_DEFINED
+        return mode
+
+    def _is_data_defined_renderer(self, layer):
+        """Prüft, ob der Layer bereits den aktuellen datengesteuerten Renderer verwendet."""
+        return bool(layer) and layer.customProperty("thw_toolbox/renderer") == self.DATA_DEFINED_RENDERER_VERSION
+
+    def _on_project_read(self, *args):
+        """Migriert Marker-Layer geladener Projekte auf den datengesteuerten Renderer."""
+        if self._renderer_mode() != self.RENDERER_MODE_DATA_DEFINED:
+            return
+        for lyr in QgsProject.instance().mapLayersByName("THW Toolbox Marker"):
+            if not self._is_data_defined_renderer(lyr):
+                print(f"DEBUG: Migriere Renderer von {lyr.name()} auf datengesteuertes Symbol")
+                self._init_renderer(lyr)
+            else:
+                self._prepare_data_defined_layer(lyr)
+
+    @instrumentation.timed("renderer_rebuild")
     def _init_renderer(self, layer):
-        """Initialisiert den Renderer für den Layer."""
-        print(f"DEBUG: _init_renderer aufgerufen mit layer: {layer}")
+        """Initialisiert den Renderer für den Layer (vollständiger Neuaufbau)."""
+        instrumentation.debug(f"DEBUG: _init_renderer aufgerufen mit layer: {layer}")
         if not layer:
-            print("DEBUG: Layer ist None, beende _init_renderer")
+            instrumentation.debug("DEBUG: Layer ist None, beende _init_renderer")
+            return
+        
+        # Cache-Dateien für alle verwendeten SVG-Inhalte bereitstellen
+        self._materialize_svg_cache(layer)
+        
+        if self._renderer_mode() == self.RENDERER_MODE_DATA_DEFINED:
+            self._init_data_defined_renderer(layer)
             return
             
-        # Erstelle einen einfachen Renderer für den Layer
+        # Eine Kategorie pro Feature, Schlüssel ist die unique_id
         categories = []
+        self._renderer_fids = {}
         
         # Prüfe, ob der Layer Features hat
         if layer.featureCount() > 0:
-            for feat in layer.getFeatures():
-                svg_path_feat = feat.attribute("svg_path")
-                svg_content_feat = feat.attribute("svg_content") if "svg_content" in [field.name() for field in layer.fields()] else ""
-                size = feat.attribute("size")
-                scale_with_map = feat.attribute("scale_with_map")
-                sym = QgsMarkerSymbol.createSimple({})
-                
-                # Verwende SVG-Inhalt direkt aus dem Speicher
-                if svg_content_feat and svg_content_feat.strip():
-                    # Erstelle temporäre SVG-Datei aus Inhalt
-                    temp_svg = self._create_temp_svg_from_content(svg_content_feat, feat.id())
-                    if temp_svg:
-                        ly = QgsSvgMarkerSymbolLayer(temp_svg, size, 0)
-                    else:
-                        # Fallback: Verwende den gespeicherten Pfad
-                        ly = QgsSvgMarkerSymbolLayer(svg_path_feat, size, 0)
-                else:
-                    # Versuche den Pfad zu verwenden - konvertiere relativen Pfad zu absolutem Pfad
-                    if not os.path.isabs(svg_path_feat):
-                        absolute_path = os.path.join(self.plugin_dir, svg_path_feat)
-                        if os.path.exists(absolute_path):
-                            ly = QgsSvgMarkerSymbolLayer(absolute_path, size, 0)
-                        else:
-                            # Fallback: Verwende den ursprünglichen Pfad
-                            ly = QgsSvgMarkerSymbolLayer(svg_path_feat, size, 0)
-                    else:
-                        ly = QgsSvgMarkerSymbolLayer(svg_path_feat, size, 0)
-                
-                if not scale_with_map:
-                    ly.setSizeUnit(QgsUnitTypes.RenderMapUnits)
-                sym.changeSymbolLayer(0, ly)
-                # Verwende den Namen des Features (Dateiname ohne Pfad und ohne .svg) für die Kategorie
-                feature_name = feat.attribute("name") if feat.attribute("name") else os.path.basename(svg_path_feat)
-                # Entferne .svg Endung falls vorhanden
-                display_name = os.path.splitext(feature_name)[0]
-                cat = QgsRendererCategory(feature_name, sym, display_name)
-                categories.append(cat)
+            for feat in self._queries_for(layer).features("styling"):
+                cat = self._create_feature_category(layer, feat)
+                if cat is not None:
+                    categories.append(cat)
+                    self._renderer_fids[feat.id()] = cat.value()
         
         if categories:
-            renderer = QgsCategorizedSymbolRenderer("name", categories)
+            renderer = QgsCategorizedSymbolRenderer("unique_id", categories)
             layer.setRenderer(renderer)
         else:
             # Fallback: Einfacher Marker-Symbol
             sym = QgsMarkerSymbol.createSimple({})
             renderer = QgsSingleSymbolRenderer(sym)
             layer.setRenderer(renderer)
+        layer.removeCustomProperty("thw_toolbox/renderer")
+        
+        # Labeling konfigurieren
+        self._setup_labeling(layer)
+        
+        layer.triggerRepaint()
+        instrumentation.debug("DEBUG: Renderer erfolgreich initialisiert und Layer neu gezeichnet")
+
+    def _set_svg_path_variables(self, layer):
+        """Setzt Plugin- und Cache-Verzeichnis als Layer-Variablen für SVG_PATH_EXPRESSION.
+        
+        Die Pfade sind rechnerabhängig und werden deshalb bei jedem Verbinden
+        mit dem Layer neu gesetzt, nicht nur beim Aufbau des Renderers.
+        """
+        QgsExpressionContextUtils.setLayerVariable(layer, "thw_plugin_dir", self._library_base_dir().replace("\\", "/"))
+        QgsExpressionContextUtils.setLayerVariable(layer, "thw_svg_cache_dir", self.svg_cache.cache_dir.replace("\\", "/"))
+
+    def _prepare_data_defined_layer(self, layer):
+        """Bereitet einen Layer mit gespeichertem datengesteuertem Renderer vor (z.B. nach dem Öffnen eines Projekts)."""
+        self._materialize_svg_cache(layer)
+        self._set_svg_path_variables(layer)
+        layer.triggerRepaint()
+
+    def _init_data_defined_renderer(self, layer):
+        """Setzt ein einziges Symbol, dessen SVG-Pfad, Größe und Einheit aus den Attributen kommen.
+        
+        Die Symbolanzahl ist damit unabhängig von der Anzahl der Marker, und
+        der SVG-Cache von QGIS wird von allen Features mit gleicher Datei geteilt.
+        Da die Größeneinheit nicht datengesteuert sein kann, enthält das Symbol
+        zwei SVG-Ebenen (Karteneinheiten / Millimeter), von denen je nach
+        scale_with_map genau eine aktiv ist.
+        """
+        self._set_svg_path_variables(layer)
+        
+        sym = QgsMarkerSymbol.createSimple({})
+        symbol_layers = [
+            (QgsUnitTypes.RenderMapUnits, 'NOT coalesce("scale_with_map", false)'),
+            (QgsUnitTypes.RenderMillimeters, 'coalesce("scale_with_map", false)'),
+        ]
+        for i, (unit, enabled_expression) in enumerate(symbol_layers):
+            ly = QgsSvgMarkerSymbolLayer("", 30.0, 0)
+            ly.setSizeUnit(unit)
+            ly.setDataDefinedProperty(QgsSymbolLayer.PropertyName, QgsProperty.fromExpression(self.SVG_PATH_EXPRESSION))
+            ly.setDataDefinedProperty(QgsSymbolLayer.PropertySize, QgsProperty.fromField("size"))
+            ly.setDataDefinedProperty(QgsSymbolLayer.PropertyLayerEnabled, QgsProperty.fromExpression(enabled_expression))
+            if i == 0:
+                sym.changeSymbolLayer(0, ly)
+            else:
+                sym.appendSymbolLayer(ly)
+        
+        layer.setRenderer(QgsSingleSymbolRenderer(sym))
+        layer.setCustomProperty("thw_toolbox/renderer", self.DATA_DEFINED_RENDERER_VERSION)
+        self._renderer_fids = {}
         
         # Labeling konfigurieren
         self._setup_labeling(layer)
         
         layer.triggerRepaint()
-        print("DEBUG: Renderer erfolgreich initialisiert und Layer neu gezeichnet")
+        instrumentation.debug("DEBUG: Datengesteuerter Renderer initialisiert")
+
+    def resolve_svg_file(self, feat):
+        """Liefert die SVG-Datei, mit der ein Feature gezeichnet wird.
+        
+        Bevorzugt die Cache-Datei zum gespeicherten Inhalt, sonst den
+        (gegen das Plugin-Verzeichnis aufgelösten) Bibliothekspfad.
+        """
+        # Verwende den gespeicherten SVG-Inhalt über den Hash-Cache
+        cached_svg = self._cached_svg_path(feat)
+        if cached_svg:
+            return cached_svg
+        svg_path_feat = feat.attribute("svg_path") or ""
+        # Versuche den Pfad zu verwenden - konvertiere relativen Pfad zu absolutem Pfad
+        if not os.path.isabs(svg_path_feat):
+            absolute_path = os.path.join(self.plugin_dir, svg_path_feat)
+            if os.path.exists(absolute_path):
+                return absolute_path
+        # Fallback: Verwende den ursprünglichen Pfad
+        return svg_path_feat
+
+    def _create_feature_symbol(self, layer, feat):
+        """Erstellt das Marker-Symbol für ein einzelnes Feature."""
+        size = feat.attribute("size")
+        scale_with_map = feat.attribute("scale_with_map")
+        sym = QgsMarkerSymbol.createSimple({})
+        ly = QgsSvgMarkerSymbolLayer(self.resolve_svg_file(feat), size, 0)
+        
+        if not scale_with_map:
+            ly.setSizeUnit(QgsUnitTypes.RenderMapUnits)
+        sym.changeSymbolLayer(0, ly)
+        return sym
+
+    def _create_feature_category(self, layer, feat):
+        """Erstellt die Renderer-Kategorie für ein Feature (Schlüssel: unique_id)."""
+        unique_id = feat.attribute("unique_id")
+        if not unique_id:
+            return None
+        # Anzeigename: Dateiname ohne Pfad und ohne .svg
+        feature_name = feat.attribute("name") if feat.attribute("name") else os.path.basename(feat.attribute("svg_path") or "")
+        display_name = os.path.splitext(feature_name)[0]
+        return QgsRendererCategory(unique_id, self._create_feature_symbol(layer, feat), display_name)
+
+    def _connect_layer_signals(self, layer):
+        """Verbindet die Edit-Signale des Layers mit den inkrementellen Renderer-Updates."""
+        if not layer or self._signal_layer is layer:
+            return
+        self._disconnect_layer_signals()
+        layer.featureAdded.connect(self._on_feature_added)
+        layer.featureDeleted.connect(self._on_feature_deleted)
+        layer.attributeValueChanged.connect(self._on_attribute_value_changed)
+        layer.committedFeaturesAdded.connect(self._on_committed_features_added)
+        layer.afterRollBack.connect(self._on_after_rollback)
+        self._signal_layer = layer
+        self.marker_queries.set_layer(layer)
+        # Zuerst die Edit-Session: ein übrig gebliebenes Write-Behind-Journal
+        # wird dabei angewendet, bevor Speicher, Index und Kennzahlen die Marker lesen
+        self.edit_session.set_layer(layer)
+        self.marker_store.set_layer(layer)
+
+    def _disconnect_layer_signals(self):
+        """Trennt die Edit-Signale des zuletzt verbundenen Layers."""
+        # Offene Änderungen aus dem Dock vorher speichern
+        self.edit_session.set_layer(None)
+        layer = self._signal_layer
+        self._signal_layer = None
+        if layer is None:
+            return
+        self.marker_store.set_layer(None)
+        self.marker_queries.set_layer(None)
+        try:
+            layer.featureAdded.disconnect(self._on_feature_added)
+            layer.featureDeleted.disconnect(self._on_feature_deleted)
+            layer.attributeValueChanged.disconnect(self._on_attribute_value_changed)
+            layer.committedFeaturesAdded.disconnect(self._on_committed_features_added)
+            layer.afterRollBack.disconnect(self._on_after_rollback)
+        except (TypeError, RuntimeError):
+            # Layer wurde bereits gelöscht oder Signale waren nicht verbunden
+            pass
+
+    def _categorized_renderer(self):
+        """Liefert den inkrementell pflegbaren Renderer oder None, wenn ein Neuaufbau nötig ist."""
+        renderer = self.layer.renderer() if self.layer else None
+        if isinstance(renderer, QgsCategorizedSymbolRenderer) and renderer.classAttribute() == "unique_id":
+            return renderer
+        return None
+
+    def _on_feature_added(self, fid):
+        """Fügt nur die Kategorie des neuen Features hinzu."""
+        if self._is_data_defined_renderer(self.layer):
+            # Datengesteuertes Symbol: nur die Cache-Datei für neue Inhalte anlegen
+            feat = self.marker_queries.feature("styling", fid)
+            if feat.isValid():
+                self._cached_svg_path(feat)
+                self._extract_library_svg(feat.attribute("svg_path"))
+            self.layer.triggerRepaint()
+            return
+        renderer = self._categorized_renderer()
+        if renderer is None:
+            self._init_renderer(self.layer)
+            return
+        feat = self.marker_queries.feature("styling", fid)
+        cat = self._create_feature_category(self.layer, feat) if feat.isValid() else None
+        if cat is None:
+            return
+        idx = renderer.categoryIndexForValue(cat.value())
+        if idx >= 0:
+            renderer.updateCategorySymbol(idx, cat.symbol().clone())
+        else:
+            renderer.addCategory(cat)
+        self._renderer_fids[fid] = cat.value()
+        self.layer.triggerRepaint()
+
+    def _on_committed_features_added(self, layer_id, features):
+        """Ersetzt die temporären Feature-IDs nach dem Commit durch die endgültigen."""
+        committed = {f.attribute("unique_id"): f.id() for f in features}
+        for fid, unique_id in list(self._renderer_fids.items()):
+            if fid < 0 and unique_id in committed:
+                del self._renderer_fids[fid]
+                self._renderer_fids[committed[unique_id]] = unique_id
+
+    def _on_after_rollback(self):
+        """Nach dem Verwerfen des Edit-Buffers: Kategorien passen ggf. nicht mehr zu den Features."""
+        if self.layer and not self._is_data_defined_renderer(self.layer):
+            self._init_renderer(self.layer)
+
+    def _on_feature_deleted(self, fid):
+        """Entfernt nur die Kategorie des gelöschten Features."""
+        unique_id = self._renderer_fids.pop(fid, None)
+        renderer = self._categorized_renderer()
+        if renderer is None or unique_id is None:
+            return
+        idx = renderer.categoryIndexForValue(unique_id)
+        if idx >= 0:
+            renderer.deleteCategory(idx)
+        self.layer.triggerRepaint()
+
+    def _on_attribute_value_changed(self, fid, idx, value):
+        """Aktualisiert nur das Symbol des geänderten Features."""
+        field_name = self.layer.fields().at(idx).name()
+        if field_name == "svg_hash" and self._is_data_defined_renderer(self.layer):
+            feat = self.marker_queries.feature("styling", fid)
+            if feat.isValid():
+                self._cached_svg_path(feat)
+        if field_name == "svg_path" and self._is_data_defined_renderer(self.layer):
+            self._extract_library_svg(value)
+        if self._is_data_defined_renderer(self.layer) or field_name not in ("name", "svg_path", "svg_content", "svg_hash", "size", "scale_with_map"):
+            # Datengesteuerte Eigenschaften und Labels brauchen kein Symbol-Update
+            self.layer.triggerRepaint()
+            return
+        renderer = self._categorized_renderer()
+        if renderer is None:
+            self._init_renderer(self.layer)
+            return
+        feat = self.marker_queries.feature("styling", fid)
+        unique_id = self._renderer_fids.get(fid) or (feat.attribute("unique_id") if feat.isValid() else None)
+        cat_idx = renderer.categoryIndexForValue(unique_id) if unique_id else -1
+        if cat_idx < 0 or not feat.isValid():
+            return
+        renderer.updateCategorySymbol(cat_idx, self._create_feature_symbol(self.layer, feat))
+        self.layer.triggerRepaint()
 
     def _setup_labeling(self, layer):
         """Konfiguriert das Labeling für den Layer."""
@@ -654,7 +1064,7 @@ class THWToolboxPlugin:
             # Prüfe, ob die erforderlichen Felder existieren
             field_names = [field.name() for field in layer.fields()]
             if "label" not in field_names or "show_label" not in field_names:
-                print("DEBUG: Label-Felder nicht verfügbar, überspringe Labeling")
+                instrumentation.debug("DEBUG: Label-Felder nicht verfügbar, überspringe Labeling")
                 return
             
             # Erstelle Label-Einstellungen
@@ -695,20 +1105,25 @@ class THWToolboxPlugin:
             layer.setLabelsEnabled(True)
             layer.setLabeling(QgsVectorLayerSimpleLabeling(label_settings))
             
-            print("DEBUG: Labeling erfolgreich konfiguriert")
+            instrumentation.debug("DEBUG: Labeling erfolgreich konfiguriert")
             
         except Exception as e:
-            print(f"DEBUG: Fehler beim Konfigurieren des Labelings: {e}")
+            instrumentation.debug(f"DEBUG: Fehler beim Konfigurieren des Labelings: {e}")
 
     def _update_renderer(self):
-        """Aktualisiert den Renderer mit allen Features."""
-        print("DEBUG: _update_renderer aufgerufen")
+        """Baut den Renderer vollständig neu auf.
+        
+        Einzelne Änderungen werden inkrementell über die Layer-Signale
+        (featureAdded/featureDeleted/attributeValueChanged) übernommen; der
+        vollständige Neuaufbau ist nur noch für Layer-Wechsel gedacht.
+        """
+        instrumentation.debug("DEBUG: _update_renderer aufgerufen")
         if not self.layer:
-            print("DEBUG: self.layer ist None, beende _update_renderer")
+            instrumentation.debug("DEBUG: self.layer ist None, beende _update_renderer")
             return
             
         # Verwende die _init_renderer Methode, die den aktuellen Layer aktualisiert
-        print("DEBUG: Rufe _init_renderer auf")
+        instrumentation.debug("DEBUG: Rufe _init_renderer auf")
         self._init_renderer(self.layer)
         
         # Labeling auch aktualisieren
@@ -716,35 +1131,46 @@ class THWToolboxPlugin:
 
     def _save_layer(self):
         """Speichert den aktuellen Layer - ist jetzt nicht mehr nötig, da Layer immer persistent ist."""
-        print("DEBUG: _save_layer aufgerufen - Layer ist bereits persistent")
+        instrumentation.debug("DEBUG: _save_layer aufgerufen - Layer ist bereits persistent")
         # Der Layer ist bereits persistent, nichts zu tun
         return
 
+    def _persist_marker_edits(self):
+        """Schreibt gepufferte Marker-Änderungen (Write-Behind bzw. Dock-Edits) synchron in die GeoPackage."""
+        if self.write_behind is not None:
+            self.write_behind.persist()
+        else:
+            self.edit_session.flush()
+
+    @instrumentation.timed("project_save")
     def _on_project_save(self):
         """Wird aufgerufen, wenn das Projekt gespeichert wird - verschiebt die Datei zum Projektpfad."""
-        print("DEBUG: Projekt wird gespeichert, verschiebe Layer-Datei zum Projektpfad")
+        instrumentation.debug("DEBUG: Projekt wird gespeichert, verschiebe Layer-Datei zum Projektpfad")
         if not self.layer:
             return
+        
+        # Gepufferte Änderungen vor dem Kopieren in die Datei schreiben
+        self._persist_marker_edits()
             
         # Prüfe, ob der Layer eine GeoPackage ist
         if self.layer.providerType() != "ogr":
-            print("DEBUG: Layer ist keine GeoPackage, nichts zu tun")
+            instrumentation.debug("DEBUG: Layer ist keine GeoPackage, nichts zu tun")
             return
         
         proj = QgsProject.instance()
         pfile = proj.fileName()
         
         if not pfile:
-            print("DEBUG: Kein Projektpfad verfügbar")
+            instrumentation.debug("DEBUG: Kein Projektpfad verfügbar")
             return
             
         # Aktuelle Datei-Pfad ermitteln
         current_source = self.layer.source().split("|")[0]
-        print(f"DEBUG: Aktuelle Layer-Datei: {current_source}")
+        instrumentation.debug(f"DEBUG: Aktuelle Layer-Datei: {current_source}")
         
         # Prüfe, ob die aktuelle Datei existiert
         if not os.path.exists(current_source):
-            print(f"DEBUG: Aktuelle Layer-Datei existiert nicht: {current_source}")
+            instrumentation.debug(f"DEBUG: Aktuelle Layer-Datei existiert nicht: {current_source}")
             return
         
         # Neuer Pfad neben der Projektdatei
@@ -753,7 +1179,7 @@ class THWToolboxPlugin:
         
         # Prüfe, ob die Datei bereits am richtigen Ort ist
         if os.path.abspath(current_source) == os.path.abspath(new_gpkg):
-            print("DEBUG: Datei ist bereits am richtigen Ort")
+            instrumentation.debug("DEBUG: Datei ist bereits am richtigen Ort")
             return
             
         try:
@@ -761,7 +1187,7 @@ class THWToolboxPlugin:
             target_dir = os.path.dirname(new_gpkg)
             if not os.path.exists(target_dir):
                 os.makedirs(target_dir, exist_ok=True)
-                print(f"DEBUG: Zielverzeichnis erstellt: {target_dir}")
+                instrumentation.debug(f"DEBUG: Zielverzeichnis erstellt: {target_dir}")
             
             # Prüfe Schreibrechte im Zielverzeichnis
             if not os.access(target_dir, os.W_OK):
@@ -770,74 +1196,48 @@ class THWToolboxPlugin:
             # Vor dem Export sicherstellen, dass keine Edits offen sind
             try:
                 if self.layer.isEditable():
-                    print("DEBUG: Layer ist im Bearbeitungsmodus - committe Änderungen vor Export")
+                    instrumentation.debug("DEBUG: Layer ist im Bearbeitungsmodus - committe Änderungen vor Export")
                     self.layer.commitChanges()
             except Exception as e:
                 print(f"DEBUG: Hinweis beim Committen vor Export: {e}")
             
-            # Wenn Ziel-Datei existiert, lösche sie zuerst
-            if os.path.exists(new_gpkg):
-                print(f"DEBUG: Ziel-Datei existiert bereits, lösche sie: {new_gpkg}")
-                try:
-                    os.remove(new_gpkg)
-                except Exception as e:
-                    print(f"DEBUG: Warnung - Konnte Ziel-Datei nicht löschen: {e}")
-            
-            # Verwende QGIS VectorFileWriter für sichere Kopie
-            from qgis.core import QgsVectorFileWriter, QgsVectorLayer
-            
-            print(f"DEBUG: Kopiere Layer-Daten von {current_source} nach {new_gpkg}")
-            
-            # Erstelle Kopie mit QGIS VectorFileWriter
-            save_options = QgsVectorFileWriter.SaveVectorOptions()
-            save_options.driverName = "GPKG"
-            save_options.layerName = "taktische_zeichen"
-            # Wichtiger: ganze Datei überschreiben statt nur Layer
-            save_options.actionOnExistingFile = QgsVectorFileWriter.CreateOrOverwriteFile
-            
-            result = QgsVectorFileWriter.writeAsVectorFormatV2(
-                self.layer, 
-                new_gpkg, 
-                QgsProject.instance().transformContext(), 
-                save_options
-            )
-            
-            if result[0] != QgsVectorFileWriter.NoError:
-                print(f"DEBUG: Writer-Export fehlgeschlagen: {result[1]} - versuche Datei-Kopie als Fallback")
-                # Fallback: Physische Datei kopieren (kann fehlschlagen, wenn gesperrt)
-                import shutil
-                shutil.copy2(current_source, new_gpkg)
-            
-            print(f"DEBUG: Layer-Daten erfolgreich exportiert/kopiert")
+            # Datei verschieben (atomar umbenennen) oder seitenweise kopieren - ohne Features neu zu schreiben
+            instrumentation.debug(f"DEBUG: Verschiebe Layer-Datei von {current_source} nach {new_gpkg}")
+            method = relocate_gpkg(current_source, new_gpkg)
+            instrumentation.debug(f"DEBUG: Layer-Datei verschoben ({method})")
+            
+            # Datenquelle des bestehenden Layers umstellen (Renderer, Labels und Signale bleiben erhalten)
+            layer_options = self.layer.source().split("|", 1)
+            uri = new_gpkg + ("|" + layer_options[1] if len(layer_options) > 1 else "")
+            options = QgsDataProvider.ProviderOptions()
+            options.transformContext = QgsProject.instance().transformContext()
+            old_uri = self.layer.source()
+            self.layer.setDataSource(uri, self.layer.name(), "ogr", options)
+            
+            if not self.layer.isValid():
+                error = self.layer.error().message()
+                # Alten Zustand wiederherstellen, damit die Daten am ursprünglichen Ort bleiben
+                if method == "rename":
+                    os.replace(new_gpkg, current_source)
+                move_companions(new_gpkg, current_source)
+                self.layer.setDataSource(old_uri, self.layer.name(), "ogr", options)
+                raise Exception(f"Layer am neuen Ort ist nicht gültig: {error}")
             
-            # Entferne alten Layer aus Projekt
-            old_layer_id = self.layer.id()
-            QgsProject.instance().removeMapLayer(old_layer_id)
-            
-            # Lade den Layer vom neuen Ort
-            uri = f"{new_gpkg}|layername=taktische_zeichen"
-            new_layer = QgsVectorLayer(uri, "THW Toolbox Marker", "ogr")
-            
-            if not new_layer.isValid():
-                raise Exception(f"Neuer Layer ist nicht gültig: {new_layer.error().message()}")
-            
-            QgsProject.instance().addMapLayer(new_layer)
-            self.layer = new_layer
-            
-            # Aktualisiere Referenzen in Tools
             self._update_tool_references()
+            if self._write_behind_active():
+                # Journal gehört ab jetzt zur neuen Datei
+                self.write_behind.set_layer(None)
+                self.write_behind.set_layer(self.layer)
             
-            # Versuche die alte Datei zu löschen (optional, da sie nicht mehr verwendet wird)
-            try:
-                # Warte kurz, damit QGIS die Datei freigibt
-                import time
-                time.sleep(0.5)
-                os.remove(current_source)
-                print(f"DEBUG: Alte Datei gelöscht: {current_source}")
-            except Exception as e:
-                print(f"DEBUG: Warnung - Konnte alte Datei nicht löschen (wird beim nächsten Start bereinigt): {e}")
+            # Nach einer Kopie die alte Datei samt WAL/SHM löschen (der Layer hat sie bereits freigegeben)
+            if method == "backup":
+                try:
+                    remove_gpkg(current_source)
+                    instrumentation.debug(f"DEBUG: Alte Datei gelöscht: {current_source}")
+                except Exception as e:
+                    print(f"DEBUG: Warnung - Konnte alte Datei nicht löschen (wird beim nächsten Start bereinigt): {e}")
             
-            print("DEBUG: Layer erfolgreich zum Projektpfad verschoben")
+            instrumentation.debug("DEBUG: Layer erfolgreich zum Projektpfad verschoben")
             
         except Exception as e:
             error_msg = f"Fehler beim Verschieben der Layer-Datei: {str(e)}"
@@ -848,8 +1248,13 @@ class THWToolboxPlugin:
                 f"Von: {current_source}\nNach: {new_gpkg}\nFehler: {str(e)}\n\nHinweis: Die Layer-Daten bleiben im ursprünglichen Verzeichnis erhalten."
             )
 
-    def _cleanup_temp_files(self):
-        """Räumt temporäre Dateien im Plugin-Ordner auf."""
+    def _cleanup_temp_files(self, keep_paths=(), log=print):
+        """Räumt temporäre Dateien im Plugin-Ordner auf (Dateien in keep_paths bleiben erhalten).
+        
+        Args:
+            log: Ausgabe der Meldungen (im Worker-Thread z.B. ``list.append``,
+                da die Python-Konsole von QGIS nur im GUI-Thread beschrieben werden darf)
+        """
         try:
             import glob
             import time
@@ -863,6 +1268,8 @@ class THWToolboxPlugin:
             cleanup_threshold = 24 * 60 * 60  # 24 Stunden
             
             for temp_file in temp_files:
+                if os.path.normcase(os.path.abspath(temp_file)) in keep_paths:
+                    continue
                 try:
                     # Prüfe das Alter der Datei
                     file_age = current_time - os.path.getmtime(temp_file)
@@ -871,19 +1278,24 @@ class THWToolboxPlugin:
                     if file_age > cleanup_threshold:
                         # Versuche die Datei zu löschen
                         try:
-                            os.remove(temp_file)
-                            print(f"DEBUG: Temporäre GeoPackage-Datei gelöscht: {temp_file}")
+                            remove_gpkg(temp_file)
+                            log(f"DEBUG: Temporäre GeoPackage-Datei gelöscht: {temp_file}")
                         except PermissionError:
                             # Datei ist noch gesperrt, versuche später
-                            print(f"DEBUG: Temporäre GeoPackage-Datei noch gesperrt, überspringe: {temp_file}")
+                            log(f"DEBUG: Temporäre GeoPackage-Datei noch gesperrt, überspringe: {temp_file}")
                         
                 except Exception as e:
-                    print(f"DEBUG: Konnte temporäre GeoPackage-Datei nicht verarbeiten {temp_file}: {e}")
+                    log(f"DEBUG: Konnte temporäre GeoPackage-Datei nicht verarbeiten {temp_file}: {e}")
+            
+            # 2. Vorschauen werden im Speicher gerastert - alten Preview-Cache ganz entfernen
+            preview_cache_dir = os.path.join(self.plugin_dir, "temp_files", "preview_cache")
+            if os.path.isdir(preview_cache_dir):
+                shutil.rmtree(preview_cache_dir, ignore_errors=True)
+                log(f"DEBUG: Alter Preview-Cache entfernt: {preview_cache_dir}")
             
-            # 2. Bereinige temporäre SVG-Cache-Dateien
+            # 3. Bereinige temporäre SVG-Cache-Dateien
             temp_dirs = [
-                os.path.join(self.plugin_dir, "temp_files", "svg_cache"),
-                os.path.join(self.plugin_dir, "temp_files", "preview_cache"),
+                os.path.join(self.plugin_dir, "temp_files", "svg_cache"),  # Alt, ersetzt durch cache/svg
                 os.path.join(self.plugin_dir, "temp_svg")  # Altes Verzeichnis für Rückwärtskompatibilität
             ]
             
@@ -901,14 +1313,14 @@ class THWToolboxPlugin:
                                 if file_age > cache_threshold:
                                     try:
                                         os.remove(file_path)
-                                        print(f"DEBUG: Temporäre Cache-Datei gelöscht: {file_path}")
+                                        log(f"DEBUG: Temporäre Cache-Datei gelöscht: {file_path}")
                                     except PermissionError:
-                                        print(f"DEBUG: Cache-Datei noch gesperrt, überspringe: {file_path}")
+                                        log(f"DEBUG: Cache-Datei noch gesperrt, überspringe: {file_path}")
                                     
                     except Exception as e:
-                        print(f"DEBUG: Fehler beim Bereinigen des Cache-Verzeichnisses {temp_dir}: {e}")
+                        log(f"DEBUG: Fehler beim Bereinigen des Cache-Verzeichnisses {temp_dir}: {e}")
             
-            # 3. Entferne leere temp_files Verzeichnisse
+            # 4. Entferne leere temp_files Verzeichnisse
             temp_files_dir = os.path.join(self.plugin_dir, "temp_files")
             if os.path.exists(temp_files_dir):
                 try:
@@ -922,13 +1334,13 @@ class THWToolboxPlugin:
                     # Wenn alle Unterverzeichnisse leer sind, entferne das Hauptverzeichnis
                     if all_empty:
                         shutil.rmtree(temp_files_dir)
-                        print(f"DEBUG: Leeres temp_files Verzeichnis entfernt: {temp_files_dir}")
+                        log(f"DEBUG: Leeres temp_files Verzeichnis entfernt: {temp_files_dir}")
                         
                 except Exception as e:
-                    print(f"DEBUG: Fehler beim Entfernen des temp_files Verzeichnisses: {e}")
+                    log(f"DEBUG: Fehler beim Entfernen des temp_files Verzeichnisses: {e}")
                     
         except Exception as e:
-            print(f"DEBUG: Fehler beim Aufräumen temporärer Dateien: {e}")
+            log(f"DEBUG: Fehler beim Aufräumen temporärer Dateien: {e}")
 
     def _update_tool_references(self):
         """Aktualisiert alle Tool-Referenzen auf den aktuellen Layer."""
@@ -937,71 +1349,113 @@ class THWToolboxPlugin:
         if hasattr(self, 'move_tool') and self.move_tool:
             self.move_tool.layer = self.layer
 
-    def _create_temp_svg_from_content(self, svg_content, feature_id):
-        """Erstellt eine temporäre SVG-Datei aus dem gespeicherten SVG-Inhalt."""
-        import tempfile
-        
-        # Erstelle temporäres Verzeichnis falls es nicht existiert
-        temp_dir = os.path.join(self.plugin_dir, "temp_files", "svg_cache")
-        os.makedirs(temp_dir, exist_ok=True)
-        
-        # Erstelle eindeutigen Dateinamen
-        temp_filename = f"feature_{feature_id}.svg"
-        temp_path = os.path.join(temp_dir, temp_filename)
+    def _queries_for(self, layer):
+        """Projizierte Abfragen für einen Layer (beim Marker-Layer mit gemeinsamem Feldindex-Cache)."""
+        if layer is self.marker_queries.layer:
+            return self.marker_queries
+        return MarkerQueries(layer)
+
+    def _get_svg_store(self, layer=None):
+        """Liefert die Blob-Ablage der Layer-GeoPackage (oder None bei Memory-Layern)."""
+        layer = layer or self.layer
+        if not layer or layer.providerType() != "ogr":
+            return None
+        gpkg = layer.source().split("|")[0]
+        if self._svg_store is None or self._svg_store.gpkg_path != gpkg:
+            self._svg_store = SvgBlobStore(gpkg)
+        return self._svg_store
+
+    def get_svg_content(self, feat):
+        """Liefert den SVG-Inhalt eines Features (aus svg_blobs oder dem alten Feld svg_content)."""
+        fields = feat.fields().names()
+        if "svg_hash" in fields and feat.attribute("svg_hash"):
+            store = self._get_svg_store()
+            content = store.get(feat.attribute("svg_hash")) if store else None
+            if content:
+                return content
+        if "svg_content" in fields:
+            # Projizierte Features enthalten den Inhalt nicht - gezielt nachladen
+            return feat.attribute("svg_content") or self._queries_for(self.layer).svg_content(feat.id())
+        return None
+
+    def _cached_svg_path(self, feat, layer=None):
+        """Liefert die Cache-Datei zum SVG-Inhalt eines Features (oder None).
         
+        Die Datei wird nur geschrieben, wenn sie für diesen Inhalts-Hash noch
+        nicht existiert.
+        """
+        fields = feat.fields().names()
+        content_hash = feat.attribute("svg_hash") if "svg_hash" in fields else None
         try:
-            # Schreibe SVG-Inhalt in temporäre Datei
-            with open(temp_path, 'w', encoding='utf-8') as f:
-                f.write(svg_content)
-            
-            # Bereinige alte temporäre Dateien (behalte nur die letzten 50)
-            temp_files = [f for f in os.listdir(temp_dir) if f.startswith("feature_")]
-            if len(temp_files) > 50:
-                temp_files.sort(key=lambda x: os.path.getctime(os.path.join(temp_dir, x)))
-                for old_file in temp_files[:-50]:
-                    try:
-                        os.remove(os.path.join(temp_dir, old_file))
-                    except:
-                        pass
-            
-            return temp_path
+            if content_hash:
+                store = self._get_svg_store(layer)
+                self.svg_cache.pin([content_hash])
+                path = self.svg_cache.path_for(
+                    content_hash,
+                    loader=lambda: store.get(content_hash) if store else None
+                )
+            else:
+                # Alte Features/Memory-Layer mit eingebettetem Inhalt
+                svg_content = feat.attribute("svg_content") if "svg_content" in fields else None
+                if not svg_content and "svg_content" in fields:
+                    # Projizierte Features enthalten den Inhalt nicht - gezielt nachladen
+                    svg_content = self._queries_for(layer or self.layer).svg_content(feat.id())
+                if not svg_content or not svg_content.strip():
+                    return None
+                content_hash = SvgBlobStore.content_hash(svg_content)
+                self.svg_cache.pin([content_hash])
+                path = self.svg_cache.path_for(content_hash, svg_content)
+            return path
         except Exception as e:
-            error_msg = f"Fehler beim Erstellen der temporären SVG-Datei: {str(e)}"
+            error_msg = f"Fehler beim Erstellen der SVG-Cache-Datei: {str(e)}"
             print(error_msg)
             self._show_error_alert(
                 "SVG-Verarbeitungsfehler",
-                "Konnte temporäre SVG-Datei nicht erstellen",
-                f"Feature ID: {feature_id}\nFehler: {str(e)}"
+                "Konnte SVG-Cache-Datei nicht erstellen",
+                f"Feature ID: {feat.id()}\nFehler: {str(e)}"
             )
             return None
 
+    def _materialize_svg_cache(self, layer):
+        """Stellt für jeden im Layer verwendeten SVG-Hash genau eine Cache-Datei bereit.
+        
+        Ohne 'svgs'-Ordner werden zusätzlich die verwendeten Bibliothekssymbole
+        aus svgs.pack entpackt (Rückfall der Features ohne Hash).
+        """
+        self.svg_cache.unpin_all()
+        path_idx = layer.fields().indexFromName("svg_path")
+        if path_idx >= 0 and self._library_base_dir() != self.plugin_dir:
+            for svg_path in layer.uniqueValues(path_idx):
+                self._extract_library_svg(svg_path)
+        idx = layer.fields().indexFromName("svg_hash")
+        if idx < 0:
+            return
+        store = self._get_svg_store(layer)
+        for content_hash in layer.uniqueValues(idx):
+            if not content_hash:
+                continue
+            self.svg_cache.pin([content_hash])
+            try:
+                self.svg_cache.path_for(
+                    content_hash,
+                    loader=lambda h=content_hash: store.get(h) if store else None
+                )
+            except Exception as e:
+                print(f"DEBUG: Konnte SVG-Cache-Datei für {content_hash} nicht anlegen: {e}")
+
+    @instrumentation.timed("place_feature")
     def _place_feature(self, svg_path, point):
-        print(f"DEBUG: _place_feature aufgerufen mit svg_path={svg_path}, point={point}")
+        instrumentation.debug(f"DEBUG: _place_feature aufgerufen mit svg_path={svg_path}, point={point}")
         if not self.layer:
-            print("DEBUG: self.layer ist None, beende _place_feature")
+            instrumentation.debug("DEBUG: self.layer ist None, beende _place_feature")
             return
             
-        print("DEBUG: Prüfe Layer-Felder")
+        instrumentation.debug("DEBUG: Prüfe Layer-Felder")
         # Felder überprüfen und ggf. hinzufügen
-        required_fields = {
-            "name": QVariant.String,
-            "svg_path": QVariant.String,
-            "svg_content": QVariant.String,  # Neues Feld für SVG-Inhalt
-            "size": QVariant.Double,
-            "scale_with_map": QVariant.Bool,
-            "unique_id": QVariant.String,  # Eindeutige ID für jedes Zeichen
-            "label": QVariant.String,  # Label-Text für das Zeichen
-            "show_label": QVariant.Bool  # Ob das Label angezeigt werden soll
-        }
-        
-        existing_fields = {field.name(): field.type() for field in self.layer.fields()}
-        print(f"DEBUG: Bestehende Felder: {[field.name() for field in self.layer.fields()]}")
-        
-        # Fehlende Felder hinzufügen
-        fields_to_add = []
-        for field_name, field_type in required_fields.items():
-            if field_name not in existing_fields:
-                fields_to_add.append(QgsField(field_name, field_type))
+        # GeoPackage-Layer sind durch die Schema-Migration vollständig, nur
+        # Memory-Layer können hier noch Felder nachrüsten müssen
+        existing_fields = set(self.layer.fields().names())
+        fields_to_add = [field for field in self._marker_fields() if field.name() not in existing_fields]
         
         if fields_to_add:
             self.layer.startEditing()
@@ -1009,13 +1463,10 @@ class THWToolboxPlugin:
                 self.layer.addAttribute(field)
             self.layer.commitChanges()
         
-        # SVG-Inhalt lesen
-        svg_content = ""
+        # SVG-Inhalt lesen (aus der gepackten Bibliothek oder der Datei)
         try:
-            if os.path.exists(svg_path):
-                with open(svg_path, 'r', encoding='utf-8') as f:
-                    svg_content = f.read()
-            else:
+            svg_content = self._read_library_svg(svg_path)
+            if svg_content is None:
                 self._show_error_alert(
                     "SVG-Datei nicht gefunden",
                     f"Die SVG-Datei konnte nicht gefunden werden: {svg_path}",
@@ -1048,21 +1499,23 @@ class THWToolboxPlugin:
         zoom_factor = 1.0 / max(map_units_per_pixel, 0.001)  # Vermeide Division durch Null
         adaptive_size = base_size * zoom_factor
         
-        # Prüfe, ob bereits Symbole vorhanden sind und verwende mindestens die Größe des kleinsten Symbols
-        if self.layer.featureCount() > 0:
-            min_existing_size = float('inf')
-            for feature in self.layer.getFeatures():
-                feature_size = feature.attribute("size")
-                if feature_size and feature_size > 0:
-                    min_existing_size = min(min_existing_size, feature_size)
-            
-            # Wenn ein kleinstes Symbol gefunden wurde, verwende mindestens dessen Größe
-            if min_existing_size != float('inf'):
-                adaptive_size = max(adaptive_size, min_existing_size)
+        # Mindestens die Größe des kleinsten vorhandenen Symbols verwenden (inkrementell gepflegt)
+        min_existing_size = self.marker_stats.min_size()
+        if min_existing_size is not None:
+            adaptive_size = max(adaptive_size, min_existing_size)
         
         # Begrenze die Größe auf einen vernünftigen Bereich
         adaptive_size = max(10.0, min(200.0, adaptive_size))
         
+        # SVG-Inhalt nur einmal pro Hash in der Blob-Tabelle ablegen
+        svg_hash = None
+        store = self._get_svg_store()
+        if store:
+            try:
+                svg_hash = store.put(svg_content)
+            except Exception as e:
+                print(f"DEBUG: Konnte SVG-Inhalt nicht in svg_blobs speichern: {e}")
+        
         # Standard-Label aus SVG-Namen erstellen
         svg_name = os.path.basename(svg_path)
         # Entferne .svg Endung und ersetze Unterstriche durch Leerzeichen
@@ -1073,29 +1526,36 @@ class THWToolboxPlugin:
         f.setGeometry(QgsGeometry.fromPointXY(point))
         f.setAttribute("name", os.path.basename(svg_path))
         f.setAttribute("svg_path", relative_path)  # Relativer Pfad
-        f.setAttribute("svg_content", svg_content)  # SVG-Inhalt speichern
+        if svg_hash:
+            f.setAttribute("svg_hash", svg_hash)  # Nur Verweis auf den gespeicherten Inhalt
+        else:
+            f.setAttribute("svg_content", svg_content)  # Fallback: Inhalt direkt speichern
         f.setAttribute("size", adaptive_size)  # Adaptive Größe basierend auf Zoom-Faktor
         f.setAttribute("scale_with_map", False)  # Standardmäßig nicht mit Karte skalieren
         f.setAttribute("unique_id", str(uuid.uuid4()))  # Eindeutige ID generieren
         f.setAttribute("label", default_label)  # Standard-Label aus SVG-Namen
         f.setAttribute("show_label", False)  # Label standardmäßig nicht anzeigen
         
-        # Feature zum Layer hinzufügen
-        print("DEBUG: Füge Feature zum Layer hinzu")
-        self.layer.startEditing()
-        result = self.layer.dataProvider().addFeature(f)
-        print(f"DEBUG: Feature hinzugefügt: {result}")
-        self.layer.commitChanges()
-        print("DEBUG: Änderungen committet")
+        # Feature zum Layer hinzufügen (über den Edit-Buffer, damit featureAdded ausgelöst wird)
+        instrumentation.debug("DEBUG: Füge Feature zum Layer hinzu")
+        if self._write_behind_active():
+            # Sofort sichtbar, gespeichert wird verzögert im Hintergrund
+            result = self.write_behind.add_feature(f)
+            instrumentation.debug(f"DEBUG: Feature hinzugefügt (Write-Behind): {result}")
+        else:
+            self.layer.startEditing()
+            result = self.layer.addFeature(f)
+            instrumentation.debug(f"DEBUG: Feature hinzugefügt: {result}")
+            self.layer.commitChanges()
+            instrumentation.debug("DEBUG: Änderungen committet")
         self.layer.updateExtents()
-        print("DEBUG: Extents aktualisiert")
+        instrumentation.debug("DEBUG: Extents aktualisiert")
         
         # Layer ist bereits persistent, kein zusätzliches Speichern nötig
-        print("DEBUG: Layer ist bereits persistent")
+        instrumentation.debug("DEBUG: Layer ist bereits persistent")
         
-        # Renderer aktualisieren
-        print("DEBUG: Aktualisiere Renderer")
-        self._update_renderer()
+        # Renderer wird inkrementell über featureAdded aktualisiert
+        self.layer.triggerRepaint()
 
     # Identify callbacks
     def delete_feature(self, fid):
@@ -1104,23 +1564,20 @@ class THWToolboxPlugin:
             return
             
         # Prüfe, ob der Layer eine GeoPackage ist
-        if self.layer.providerType() == "ogr":
+        if self._write_behind_active():
+            self.write_behind.delete_feature(fid)
+        elif self.layer.providerType() == "ogr":
             # Direkt aus der GeoPackage löschen
             self.layer.startEditing()
             self.layer.deleteFeature(fid)
             self.layer.commitChanges()
             
-            # Renderer aktualisieren
-            self._update_renderer()
+            # Renderer wird inkrementell über featureDeleted aktualisiert
+            self.layer.triggerRepaint()
         else:
             # Fallback für Memory-Layer
             self._delete_feature_fallback(fid)
         
-        # Nach dem Löschen die Baumstruktur im Dock aktualisieren
-        if hasattr(self, 'svg_dock_widget'):
-            self.svg_dock_widget.treeWidget.clear()
-            self.svg_dock_widget.populate_root_folders()
-        
         # Layer-Panel (Layer Tree) aktualisieren
         if hasattr(self.iface, 'layerTreeView'):
             self.iface.layerTreeView().refreshLayerSymbology(self.layer.id())
@@ -1141,16 +1598,7 @@ class THWToolboxPlugin:
         dp = temp_layer.dataProvider()
         
         # Felder hinzufügen
-        dp.addAttributes([
-            QgsField("name", QVariant.String),
-            QgsField("svg_path", QVariant.String),
-            QgsField("svg_content", QVariant.String),
-            QgsField("size", QVariant.Double),
-            QgsField("scale_with_map", QVariant.Bool),
-            QgsField("unique_id", QVariant.String),
-            QgsField("label", QVariant.String),
-            QgsField("show_label", QVariant.Bool),
-        ])
+        dp.addAttributes(self._marker_fields())
         temp_layer.updateFields()
         
         # Alle Features außer dem zu löschenden kopieren
@@ -1160,7 +1608,8 @@ class THWToolboxPlugin:
                 new_feat.setGeometry(feat.geometry())
                 new_feat.setAttribute("name", feat.attribute("name"))
                 new_feat.setAttribute("svg_path", feat.attribute("svg_path"))
-                new_feat.setAttribute("svg_content", feat.attribute("svg_content") if "svg_content" in [field.name() for field in self.layer.fields()] else "")
+                # Memory-Layer haben keine Blob-Tabelle, daher Inhalt direkt übernehmen
+                new_feat.setAttribute("svg_content", self.get_svg_content(feat) or "")
                 new_feat.setAttribute("size", feat.attribute("size"))
                 new_feat.setAttribute("scale_with_map", feat.attribute("scale_with_map"))
                 new_feat.setAttribute("unique_id", feat.attribute("unique_id") if "unique_id" in [field.name() for field in self.layer.fields()] else str(uuid.uuid4()))
@@ -1186,22 +1635,28 @@ class THWToolboxPlugin:
         
         # Renderer neu erstellen
         self._update_renderer()
+        self._connect_layer_signals(self.layer)
         
         # Layer-Referenzen in anderen Klassen aktualisieren
         self._update_tool_references()
 
+    def _change_marker_attribute(self, fid, field_name, value):
+        """Ändert ein Attribut eines Markers (Write-Behind oder direkter Commit)."""
+        if self._write_behind_active():
+            return self.write_behind.change_attribute(fid, field_name, value)
+        idx = self.layer.fields().indexFromName(field_name)
+        self.layer.startEditing()
+        self.layer.changeAttributeValue(fid, idx, value)
+        return self.layer.commitChanges()
+
     def resize_feature(self, fid, size):
         if not self.layer:
             return
             
-        idx = self.layer.fields().indexFromName("size")
-        self.layer.startEditing()
-        self.layer.changeAttributeValue(fid, idx, size)
-        self.layer.commitChanges()
-        self.layer.triggerRepaint()
+        self._change_marker_attribute(fid, "size", size)
         
-        # Renderer aktualisieren
-        self._update_renderer()
+        # Symbol wird inkrementell über attributeValueChanged aktualisiert
+        self.layer.triggerRepaint()
         
         # Layer ist bereits persistent, kein zusätzliches Speichern nötig
 
@@ -1209,13 +1664,10 @@ class THWToolboxPlugin:
         if not self.layer:
             return
             
-        idx = self.layer.fields().indexFromName("scale_with_map")
-        self.layer.startEditing()
-        self.layer.changeAttributeValue(fid, idx, scale_with_map)
-        self.layer.commitChanges()
+        self._change_marker_attribute(fid, "scale_with_map", scale_with_map)
         
-        # Renderer aktualisieren
-        self._update_renderer()
+        # Symbol wird inkrementell über attributeValueChanged aktualisiert
+        self.layer.triggerRepaint()
         
         # Layer ist bereits persistent, kein zusätzliches Speichern nötig
         
@@ -1224,26 +1676,20 @@ class THWToolboxPlugin:
         if not self.layer:
             return
             
-        idx = self.layer.fields().indexFromName("label")
-        self.layer.startEditing()
-        self.layer.changeAttributeValue(fid, idx, label_text)
-        self.layer.commitChanges()
+        self._change_marker_attribute(fid, "label", label_text)
         
-        # Renderer aktualisieren für Label-Anzeige
-        self._update_renderer()
+        # Labels werden datengesteuert gezeichnet, ein Neuzeichnen genügt
+        self.layer.triggerRepaint()
         
     def toggle_label_visibility(self, fid, show_label):
         """Schaltet die Label-Anzeige für ein Feature ein/aus"""
         if not self.layer:
             return
             
-        idx = self.layer.fields().indexFromName("show_label")
-        self.layer.startEditing()
-        self.layer.changeAttributeValue(fid, idx, show_label)
-        self.layer.commitChanges()
+        self._change_marker_attribute(fid, "show_label", show_label)
         
-        # Renderer aktualisieren für Label-Anzeige
-        self._update_renderer()
+        # Labels werden datengesteuert gezeichnet, ein Neuzeichnen genügt
+        self.layer.triggerRepaint()
 
     def export_portable_package(self, export_path):
         """Exportiert das Plugin als portables Paket.
@@ -1258,11 +1704,18 @@ class THWToolboxPlugin:
             # Erstelle Export-Verzeichnis
             os.makedirs(export_path, exist_ok=True)
             
-            # Kopiere alle SVG-Dateien
+            # Symbolbibliothek: gepackt als eine Datei, sonst alle SVG-Dateien einzeln
+            pack_source = os.path.join(self.plugin_dir, PACK_NAME)
             svg_source = os.path.join(self.plugin_dir, "svgs")
             svg_dest = os.path.join(export_path, "svgs")
-            if os.path.exists(svg_source):
+            if os.path.exists(pack_source):
+                shutil.copy2(pack_source, export_path)
+                svg_note = f"Alle SVG-Symbole sind in der Datei '{PACK_NAME}' gepackt enthalten"
+            elif os.path.exists(svg_source):
                 shutil.copytree(svg_source, svg_dest, dirs_exist_ok=True)
+                svg_note = "Alle SVG-Symbole sind im 'svgs' Ordner enthalten"
+            else:
+                svg_note = "Die Symbolbibliothek ist nicht enthalten; gesetzte Symbole stehen in der GeoPackage-Datei"
             
             # Kopiere Icons
             icon_source = os.path.join(self.plugin_dir, "icons")
@@ -1270,10 +1723,25 @@ class THWToolboxPlugin:
             if os.path.exists(icon_source):
                 shutil.copytree(icon_source, icon_dest, dirs_exist_ok=True)
             
+            # Gemeinsame Schriften der SVG-Symbole
+            font_source = os.path.join(self.plugin_dir, "fonts")
+            if os.path.exists(font_source):
+                shutil.copytree(font_source, os.path.join(export_path, "fonts"), dirs_exist_ok=True)
+            
             # Kopiere Python-Dateien
             python_files = ["thwtoolboxplugin.py", "thwtoolboxplugin_dock.py", 
                            "identifytool.py", "dock_manager.py", "dragmaptool.py",
-                           "layer_manager.py", "mapcanvas_dropevent_filter.py"]
+                           "layer_manager.py", "mapcanvas_dropevent_filter.py",
+                           "svg_store.py", "svg_cache.py", "marker_index.py", "marker_ghost.py",
+                           "edit_session.py", "symbol_catalog.py",
+                           "symbol_search.py", "thumbnail_atlas.py",
+                           "symbol_model.py", "icon_loader.py",
+                           "image_cache.py", "startup_report.py",
+                           "instrumentation.py", "diagnostics_dock.py",
+                           "gpkg_relocation.py", "schema_migrator.py",
+                           "write_behind.py", "symbol_pack.py",
+                           "marker_queries.py", "marker_stats.py",
+                           "marker_store.py"]
             
             for py_file in python_files:
                 source = os.path.join(self.plugin_dir, py_file)
@@ -1294,11 +1762,13 @@ class THWToolboxPlugin:
             if self.layer and self.layer.providerType() == "ogr":
                 source_gpkg = self.layer.source().split("|")[0]
                 if os.path.exists(source_gpkg):
+                    # Gepufferte Änderungen zuerst schreiben, dann konsistent (inkl. WAL) kopieren
+                    self._persist_marker_edits()
                     dest_gpkg = os.path.join(export_path, "taktische_zeichen.gpkg")
-                    shutil.copy2(source_gpkg, dest_gpkg)
+                    backup_gpkg(source_gpkg, dest_gpkg)
             
             # Erstelle README-Datei
-            readme_content = """THW Toolbox Plugin - Portables Paket
+            readme_content = f"""THW Toolbox Plugin - Portables Paket
 
 Installation:
 1. Entpacken Sie alle Dateien in einen Ordner
@@ -1314,7 +1784,7 @@ Verwendung:
 - Die Symbole sind vollständig portabel und funktionieren auch ohne das Plugin
 
 Hinweis:
-- Alle SVG-Symbole sind im 'svgs' Ordner enthalten
+- {svg_note}
 - Die GeoPackage-Datei enthält alle gesetzten Symbole mit Koordinaten
 """
             
@@ -1,25 +1,43 @@
 import os
 import logging
-from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QListWidget, QListWidgetItem, 
-                           QLabel, QTreeWidget, QTreeWidgetItem, QLineEdit)
-from PyQt5.QtGui import QIcon, QDrag, QPixmap
-from PyQt5.QtCore import Qt, QSize, QMimeData
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QLineEdit, QTreeView, QAbstractItemView
+from PyQt5.QtGui import QDrag
+from PyQt5.QtCore import Qt, QSize, QMimeData, QTimer, QPoint
+from .symbol_catalog import SymbolCatalog
+from .symbol_search import SymbolSearchIndex
+from .symbol_model import SymbolTreeModel, SymbolFilterProxyModel
+from .thumbnail_atlas import ThumbnailAtlasCache
+from .instrumentation import instrumentation
 
-# Logging-Konfiguration
-logging.basicConfig(
-    filename=os.path.join(os.path.dirname(__file__), 'svg_dock.log'),
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+logger = logging.getLogger(__name__)
 
 class SvgDock(QWidget):
-    def __init__(self, plugin_dir, select_callback):
+    SEARCH_DEBOUNCE_MS = 200
+    ICON_SIZE = 48
+    # Diese Kategorien sind beim Öffnen des Docks aufgeklappt
+    EXPANDED_CATEGORIES = ("Allgemein", "THW")
+
+    def __init__(self, plugin_dir, select_callback, image_cache=None, symbol_pack=None):
         super().__init__()
         self.plugin_dir = plugin_dir
         self.select_callback = select_callback
-        self.icon_cache = {}  # Cache für Icons
-
-        logging.info(f"Initialisiere SvgDock mit Plugin-Verzeichnis: {plugin_dir}")
+        # Index aller Symbole - Baum und Suche lesen nicht mehr direkt vom Dateisystem
+        # (mit svgs.pack auch die Vorschaubilder nicht)
+        self.catalog = SymbolCatalog(
+            os.path.join(plugin_dir, "svgs"),
+            self.get_category_folders(),
+            pack=symbol_pack
+        )
+        self.search_index = None  # wird bei der ersten Suche aufgebaut
+        # Vorgerenderte Vorschaubilder (ein Sprite-Atlas pro Ordner)
+        self.thumbnails = ThumbnailAtlasCache(
+            os.path.join(plugin_dir, "cache", "thumbnails"),
+            self.catalog,
+            self.ICON_SIZE,
+            image_cache
+        )
+
+        logger.info(f"Initialisiere SvgDock mit Plugin-Verzeichnis: {plugin_dir}")
 
         layout = QVBoxLayout()
         self.setLayout(layout)
@@ -30,26 +48,51 @@ class SvgDock(QWidget):
         self.search_box.textChanged.connect(self.on_search)
         layout.addWidget(self.search_box)
 
-        self.treeWidget = QTreeWidget()
-        self.treeWidget.setHeaderLabel("Taktische Zeichen")
-        self.treeWidget.setDragEnabled(True)
-        self.treeWidget.setIconSize(QSize(48, 48))
-        self.treeWidget.setIndentation(20)
-        self.treeWidget.setColumnCount(1)
-        self.treeWidget.setSortingEnabled(True)
-        self.treeWidget.sortItems(0, Qt.AscendingOrder)  # Sortiere aufsteigend
-
-        layout.addWidget(self.treeWidget)
-
-        # Nur die Hauptordner beim Start laden
-        self.populate_root_folders()
-        self.treeWidget.itemPressed.connect(self.on_item_pressed)
-        self.treeWidget.itemExpanded.connect(self.on_item_expanded)
-
-    def get_cached_icon(self, path):
-        if path not in self.icon_cache:
-            self.icon_cache[path] = QIcon(path)
-        return self.icon_cache[path]
+        # Suche erst nach einer kurzen Tipp-Pause ausführen
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(self.SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.run_search)
+
+        self.no_results_label = QLabel("Keine Treffer gefunden")
+        self.no_results_label.hide()
+        layout.addWidget(self.no_results_label)
+
+        # Modell über dem Katalog; die Suche filtert nur über das Proxy-Modell
+        self.model = SymbolTreeModel(
+            self.catalog,
+            self.get_category_folders(),
+            self.thumbnails,
+            self.ICON_SIZE,
+            self
+        )
+        self.model.device_pixel_ratio = self.devicePixelRatioF()
+        self.proxy_model = SymbolFilterProxyModel(self)
+        self.proxy_model.setSourceModel(self.model)
+        self.proxy_model.sort(0)
+
+        self.treeView = QTreeView()
+        self.treeView.setModel(self.proxy_model)
+        self.treeView.setHeaderHidden(False)
+        self.treeView.setDragEnabled(True)
+        self.treeView.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.treeView.setIconSize(QSize(self.ICON_SIZE, self.ICON_SIZE))
+        self.treeView.setIndentation(20)
+        # Alle Zeilen gleich hoch - die View muss dann nur die sichtbaren Zeilen vermessen
+        self.treeView.setUniformRowHeights(True)
+
+        layout.addWidget(self.treeView)
+
+        # Nach dem Scrollen nur noch die sichtbaren Symbole bevorzugt rastern
+        self.visible_timer = QTimer(self)
+        self.visible_timer.setSingleShot(True)
+        self.visible_timer.setInterval(100)
+        self.visible_timer.timeout.connect(self.update_visible_icons)
+        self.treeView.verticalScrollBar().valueChanged.connect(lambda value: self.visible_timer.start())
+        self.treeView.collapsed.connect(lambda index: self.visible_timer.start())
+
+        self.expand_default_categories()
+        self.treeView.pressed.connect(self.on_item_pressed)
 
     def get_category_folders(self):
         # Definiere die Hauptkategorien und ihre zugehörigen Ordner
@@ -115,187 +158,70 @@ class SvgDock(QWidget):
         }
         return categories
 
-    def populate_root_folders(self):
-        # Lösche zuerst alle vorhandenen Einträge
-        self.treeWidget.clear()
-        self.treeWidget.setSortingEnabled(False)  # Deaktiviere Sortierung während des Aufbaus
-        
-        svg_path = os.path.join(self.plugin_dir, "svgs")
-        logging.info(f"Plugin-Verzeichnis: {self.plugin_dir}")
-        logging.info(f"SVG-Pfad: {svg_path}")
-        
-        if not os.path.exists(svg_path):
-            logging.error(f"SVG-Pfad existiert nicht: {svg_path}")
-            return
-
-        categories = self.get_category_folders()
-        
-        # Erstelle die Hauptkategorien
-        for category, subcategories in categories.items():
-            category_item = QTreeWidgetItem(self.treeWidget)
-            category_item.setText(0, category)
-            category_item.setIcon(0, QIcon.fromTheme("folder"))
-            
-            # Füge Unterkategorien hinzu
-            if isinstance(subcategories, dict):
-                for subcategory, folder_name in subcategories.items():
-                    subcategory_item = QTreeWidgetItem(category_item)
-                    subcategory_item.setText(0, subcategory)
-                    subcategory_item.setIcon(0, QIcon.fromTheme("folder"))
-                    
-                    if isinstance(folder_name, dict):  # Für verschachtelte Kategorien
-                        for subsubcategory, actual_folder in folder_name.items():
-                            subsubcategory_item = QTreeWidgetItem(subcategory_item)
-                            subsubcategory_item.setText(0, subsubcategory)
-                            subsubcategory_item.setIcon(0, QIcon.fromTheme("folder"))
-                            subsubcategory_item.setData(0, Qt.UserRole, actual_folder)
-                            placeholder = QTreeWidgetItem(subsubcategory_item)
-                            placeholder.setText(0, "Laden...")
-                    else:  # Für direkte Kategorien
-                        subcategory_item.setData(0, Qt.UserRole, folder_name)
-                        placeholder = QTreeWidgetItem(subcategory_item)
-                        placeholder.setText(0, "Laden...")
-            
-            # Öffne die Ordner "Allgemein" und "THW" automatisch
-            if category in ["Allgemein", "THW"]:
-                self.treeWidget.expandItem(category_item)
-                # Lade auch die Unterordner
-                for i in range(category_item.childCount()):
-                    child = category_item.child(i)
-                    self.populate_svg_files(child)
-        
-        self.treeWidget.setSortingEnabled(True)  # Aktiviere Sortierung wieder
-
-    def on_item_expanded(self, item):
-        # Entferne den Platzhalter
-        if item.childCount() == 1 and item.child(0).text(0) == "Laden...":
-            item.removeChild(item.child(0))
-            
-        # Prüfe, ob es sich um eine Hauptkategorie oder einen Unterordner handelt
-        if item.parent() is None:  # Hauptkategorie
-            if item.text(0) == "Weitere Einheiten":
-                self.populate_other_units(item)
-            else:
-                self.populate_category(item)
-        else:  # Unterordner
-            self.populate_svg_files(item)
-
-    def populate_other_units(self, category_item):
-        # Entferne alle vorhandenen Kinder
-        while category_item.childCount() > 0:
-            category_item.removeChild(category_item.child(0))
-            
-        categories = self.get_category_folders()["Weitere Einheiten"]
-        
-        for subcategory, subfolders in categories.items():
-            subcategory_item = QTreeWidgetItem(category_item)
-            subcategory_item.setText(0, subcategory)
-            subcategory_item.setIcon(0, QIcon.fromTheme("folder"))
-            placeholder = QTreeWidgetItem(subcategory_item)
-            placeholder.setText(0, "Laden...")
-
-    def populate_category(self, category_item):
-        # Entferne alle vorhandenen Kinder
-        while category_item.childCount() > 0:
-            category_item.removeChild(category_item.child(0))
-            
-        category_name = category_item.text(0)
-        categories = self.get_category_folders()
-        
-        if category_name in categories:
-            svg_path = os.path.join(self.plugin_dir, "svgs")
-            subfolders = categories[category_name]
-            
-            # Sortiere die Unterordner-Namen
-            if isinstance(subfolders, dict):
-                sorted_subfolders = sorted(subfolders.keys())
-            else:
-                sorted_subfolders = sorted(subfolders)
-            
-            for subfolder in sorted_subfolders:
-                folder_name = subfolders[subfolder] if isinstance(subfolders, dict) else subfolder
-                folder_path = os.path.join(svg_path, folder_name)
-                if os.path.exists(folder_path):
-                    # Erstelle einen Unterordner-Eintrag
-                    subfolder_item = QTreeWidgetItem(category_item)
-                    # Entferne den Präfix (z.B. "Bundeswehr_") aus dem Namen
-                    display_name = folder_name.split('_', 1)[1] if '_' in folder_name else folder_name
-                    subfolder_item.setText(0, display_name)
-                    subfolder_item.setIcon(0, QIcon.fromTheme("folder"))
-                    subfolder_item.setData(0, Qt.UserRole, folder_name)
-                    # Setze einen Platzhalter für die SVG-Dateien
-                    placeholder = QTreeWidgetItem(subfolder_item)
-                    placeholder.setText(0, "Laden...")
-
-    def populate_svg_files(self, subfolder_item):
-        # Entferne alle vorhandenen Kinder
-        while subfolder_item.childCount() > 0:
-            subfolder_item.removeChild(subfolder_item.child(0))
-            
-        folder_name = subfolder_item.data(0, Qt.UserRole)
-        if not folder_name:
-            return
-            
-        folder_path = os.path.join(self.plugin_dir, "svgs", folder_name)
-        logging.info(f"Suche Symbole in: {folder_path}")
-        
-        try:
-            if os.path.exists(folder_path):
-                logging.info(f"Ordner existiert: {folder_path}")
-                files = [f for f in os.listdir(folder_path) if f.endswith(".svg")]
-                logging.info(f"Gefundene SVG-Dateien: {files}")
-                files.sort()
-                
-                for file in files:
-                    full_path = os.path.join(folder_path, file)
-                    symbol_item = QTreeWidgetItem(subfolder_item)
-                    symbol_item.setText(0, os.path.splitext(file)[0])
-                    symbol_item.setIcon(0, self.get_cached_icon(full_path))
-                    symbol_item.setData(0, Qt.UserRole, full_path)
-            else:
-                logging.warning(f"Ordner existiert NICHT: {folder_path}")
-        except Exception as e:
-            logging.error(f"Fehler beim Lesen des Ordners {folder_path}: {str(e)}")
-
-    def on_item_pressed(self, item):
-        svg_path = item.data(0, Qt.UserRole)
+    def expand_default_categories(self):
+        """Klappt den Baum auf den Ausgangszustand zurück ("Allgemein" und "THW" offen)."""
+        self.treeView.collapseAll()
+        for row in range(self.proxy_model.rowCount()):
+            index = self.proxy_model.index(row, 0)
+            if index.data(Qt.DisplayRole) in self.EXPANDED_CATEGORIES:
+                self.treeView.expand(index)
+
+    def showEvent(self, event):
+        # Pixelverhältnis erst bekannt, wenn das Dock auf einem Bildschirm liegt
+        self.model.device_pixel_ratio = self.devicePixelRatioF()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        # Ausstehende Rasterungen abbrechen - beim nächsten Anzeigen werden sie neu angefordert
+        self.thumbnails.cancel()
+        super().hideEvent(event)
+
+    def update_visible_icons(self):
+        """Meldet die aktuell sichtbaren Symbole an den Icon-Loader (Priorisierung)."""
+        entries = []
+        index = self.treeView.indexAt(QPoint(0, 0))
+        height = self.treeView.viewport().height()
+        while index.isValid() and self.treeView.visualRect(index).top() < height:
+            node = self.model.node(self.proxy_model.mapToSource(index))
+            if node.entry is not None:
+                entries.append(node.entry)
+            index = self.treeView.indexBelow(index)
+        self.thumbnails.set_visible(entries, self.model.device_pixel_ratio)
+
+    def on_item_pressed(self, index):
+        svg_path = index.data(Qt.UserRole)
         if svg_path:
             self.select_callback(svg_path)
             drag = QDrag(self)
             mime = QMimeData()
             mime.setText(svg_path)
             drag.setMimeData(mime)
-            drag.setPixmap(QPixmap(svg_path).scaled(48, 48))
+            # Vorschaubild aus dem Modell statt das SVG erneut zu rastern
+            drag.setPixmap(index.data(Qt.DecorationRole).pixmap(self.ICON_SIZE, self.ICON_SIZE))
             drag.exec_(Qt.CopyAction)
 
     def on_search(self, text):
-        print("on_search wurde aufgerufen mit:", text)
+        # Jede Eingabe startet den Timer neu - gesucht wird erst nach der Tipp-Pause
+        self.search_timer.start()
+
+    @instrumentation.timed("search")
+    def run_search(self):
+        text = self.search_box.text().strip()
+        instrumentation.debug(f"DEBUG: run_search wurde aufgerufen mit: {text}")
         if not text:
-            self.populate_root_folders()
+            self.no_results_label.hide()
+            if self.proxy_model.is_filtered():
+                self.proxy_model.set_results(None)
+                self.expand_default_categories()
             return
 
-        self.treeWidget.clear()
-        self.treeWidget.setSortingEnabled(False)
-
-        svg_path = os.path.join(self.plugin_dir, "svgs")
-        treffer = 0
-
-        for root, dirs, files in os.walk(svg_path):
-            for file in files:
-                if file.endswith(".svg"):
-                    display_name = os.path.splitext(file)[0].replace("_", " ")
-                    if text.lower() in file.lower() or text.lower() in display_name.lower():
-                        full_path = os.path.join(root, file)
-                        symbol_item = QTreeWidgetItem(self.treeWidget)
-                        symbol_item.setText(0, display_name)
-                        symbol_item.setIcon(0, self.get_cached_icon(full_path))
-                        symbol_item.setData(0, Qt.UserRole, full_path)
-                        treffer += 1
-
-        if treffer == 0:
-            kein_treffer = QTreeWidgetItem(self.treeWidget)
-            kein_treffer.setText(0, "Keine Treffer gefunden")
-            kein_treffer.setIcon(0, QIcon.fromTheme("dialog-error"))
+        if self.search_index is None:
+            self.search_index = SymbolSearchIndex(self.catalog.entries())
+        results = self.search_index.search(text)
 
-        self.treeWidget.repaint()
-        self.treeWidget.setSortingEnabled(True)
+        # Nur der Filter ändert sich - die Knoten des Modells bleiben bestehen
+        self.proxy_model.set_results(results)
+        self.treeView.expandAll()
+        self.treeView.scrollToTop()
+        self.visible_timer.start()
+        self.no_results_label.setVisible(not results)
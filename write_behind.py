@@ -0,0 +1,496 @@
+# write_behind.py
+
+import json
+import os
+import time
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from qgis.core import (QgsFeature, QgsFeatureRequest, QgsGeometry, QgsPointXY, QgsTask,
+                       QgsApplication, QgsVectorLayer, QgsExpression, NULL)
+
+from .gpkg_relocation import JOURNAL_SUFFIX
+from .instrumentation import instrumentation
+from .marker_queries import MarkerQueries
+
+
+def _json_value(value):
+    """Attributwert für das Journal (QVariant-NULL wird zu None)."""
+    if value is None or value == NULL:
+        return None
+    return value
+
+
+class ChangeJournal:
+    """Journal aller noch nicht gespeicherten Änderungen (JSON-Zeilen neben der GeoPackage).
+
+    Änderungen werden gebündelt angehängt und mit einem ``fsync`` je Stapel
+    auf den Datenträger gebracht; nach einem Absturz werden die Einträge beim
+    nächsten Öffnen des Layers erneut angewendet. Eine halb geschriebene
+    letzte Zeile wird ignoriert.
+    """
+
+    SUFFIX = JOURNAL_SUFFIX
+
+    def __init__(self, gpkg_path):
+        self.path = gpkg_path + self.SUFFIX
+
+    def extend(self, entries):
+        """Hängt mehrere Einträge an (ein fsync für den ganzen Stapel)."""
+        with open(self.path, "a", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def entries(self):
+        entries = []
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        # Abgebrochener Schreibvorgang (Absturz mitten in der Zeile)
+                        break
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def rewrite(self, entries):
+        """Ersetzt das Journal atomar durch die übrigen Einträge (leer: Datei entfernen)."""
+        if not entries:
+            self.clear()
+            return
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def apply_journal(layer, entries):
+    """Schreibt Journal-Einträge über den Data-Provider in die GeoPackage.
+
+    Die Einträge werden pro Marker (``unique_id``) zum Endzustand
+    zusammengefasst. Das Anwenden ist idempotent: bereits vorhandene Marker
+    werden nicht doppelt angelegt, fehlende nicht gelöscht. Darf in einem
+    Worker-Thread laufen, wenn ``layer`` dort angelegt wurde.
+
+    Returns:
+        tuple: (True, wenn alle Änderungen geschrieben wurden;
+        unique_id -> Feature-ID in der GeoPackage für alle hinzugefügten Marker)
+    """
+    provider = layer.dataProvider()
+    fields = provider.fields()
+    uid_index = fields.indexFromName("unique_id")
+    uids = list(dict.fromkeys(entry["uid"] for entry in entries))
+    if uid_index < 0 or not uids:
+        return uid_index >= 0, {}
+
+    # Vorhandene Marker zu den betroffenen IDs
+    expression = "\"unique_id\" IN ({})".format(", ".join(QgsExpression.quotedString(uid) for uid in uids))
+    request = QgsFeatureRequest().setFilterExpression(expression)
+    request.setFlags(QgsFeatureRequest.NoGeometry).setSubsetOfAttributes([uid_index])
+    existing = {feat.attribute(uid_index): feat.id() for feat in provider.getFeatures(request)}
+
+    # Endzustand je Marker
+    states = {}  # uid -> {"add": dict|None, "attrs": {}, "xy": None, "delete": bool}
+    for entry in entries:
+        state = states.setdefault(entry["uid"], {"add": None, "attrs": {}, "xy": None, "delete": False})
+        op = entry["op"]
+        if op == "add":
+            state.update(add=dict(entry["attrs"]), xy=(entry["x"], entry["y"]), delete=False)
+        elif op == "attr":
+            state["attrs"][entry["field"]] = entry["value"]
+        elif op == "move":
+            state["xy"] = (entry["x"], entry["y"])
+        elif op == "delete":
+            state["delete"] = True
+
+    to_add, to_delete, attribute_changes, geometry_changes = [], [], {}, {}
+    added_fids = {}
+    for uid, state in states.items():
+        fid = existing.get(uid)
+        if state["delete"]:
+            if fid is not None:
+                to_delete.append(fid)
+            continue
+        if fid is not None and state["add"] is not None:
+            added_fids[uid] = fid
+        if fid is None:
+            if state["add"] is None:
+                # Änderung an einem Marker, der nicht (mehr) existiert
+                continue
+            feat = QgsFeature(fields)
+            attrs = dict(state["add"], **state["attrs"])
+            for name, value in attrs.items():
+                idx = fields.indexFromName(name)
+                if idx >= 0:
+                    feat.setAttribute(idx, value)
+            x, y = state["xy"]
+            feat.setGeometry(QgsGeometry.fromPointXY(QgsPointXY(x, y)))
+            to_add.append(feat)
+            continue
+        # Bestehender Marker (auch ein bereits geschriebenes "add" bei erneutem Anwenden)
+        attrs = dict(state["add"] or {}, **state["attrs"])
+        changes = {fields.indexFromName(name): value for name, value in attrs.items()
+                   if fields.indexFromName(name) >= 0}
+        if changes:
+            attribute_changes[fid] = changes
+        if state["xy"] is not None:
+            geometry_changes[fid] = QgsGeometry.fromPointXY(QgsPointXY(*state["xy"]))
+
+    ok = True
+    if to_delete:
+        ok = provider.deleteFeatures(to_delete) and ok
+    if to_add:
+        added_ok, added = provider.addFeatures(to_add)
+        ok = added_ok and ok
+        added_fids.update((feat.attribute(uid_index), feat.id()) for feat in added)
+    if attribute_changes:
+        ok = provider.changeAttributeValues(attribute_changes) and ok
+    if geometry_changes:
+        ok = provider.changeGeometryValues(geometry_changes) and ok
+    return ok, added_fids
+
+
+class _FlushTask(QgsTask):
+    """Schreibt einen Stapel Journal-Einträge im Hintergrund in die GeoPackage."""
+
+    def __init__(self, uri, entries):
+        super().__init__("THW Toolbox: Marker speichern", QgsTask.CanCancel)
+        self.uri = uri
+        self.entries = entries
+        self.added_fids = {}
+        self.error = None
+
+    def run(self):
+        try:
+            # Eigener Layer im Worker-Thread (der Layer des Projekts gehört dem GUI-Thread)
+            layer = QgsVectorLayer(self.uri, "thw_flush", "ogr")
+            if not layer.isValid():
+                self.error = f"Layer ungültig: {self.uri}"
+                return False
+            ok, self.added_fids = apply_journal(layer, self.entries)
+            return ok
+        except Exception as e:
+            self.error = str(e)
+            return False
+
+
+class WriteBehindSession(QObject):
+    """Bearbeitet Marker im Speicher und speichert sie verzögert im Hintergrund.
+
+    Alle Änderungen (Platzieren, Verschieben, Attribute, Löschen) landen sofort
+    im Edit-Buffer des Layers und im Journal. Nach ``FLUSH_MS`` ohne weitere
+    Änderung - spätestens nach ``MAX_DELAY_MS`` - schreibt ein ``QgsTask`` den
+    Stapel über einen eigenen Data-Provider in die GeoPackage. Danach bleibt
+    der Edit-Buffer erhalten; nur die temporären Features neu platzierter
+    Marker werden durch die gespeicherten ersetzt (``fids_remapped``).
+    ``persist()`` speichert synchron und beendet den Bearbeitungsmodus
+    (Projekt speichern, Layer-Wechsel, Beenden).
+
+    Hat dieselbe Schnittstelle wie ``EditSession`` (``set_layer``,
+    ``change_attribute``, ``flush``) und ersetzt diese im Write-Behind-Modus.
+    """
+
+    FLUSH_MS = 2000
+    MAX_DELAY_MS = 10000
+    # Änderungen werden gesammelt und höchstens so oft ins Journal geschrieben
+    # (Schieberegler und Tastendrücke lösen sonst je ein fsync im GUI-Thread aus)
+    JOURNAL_SYNC_MS = 250
+
+    # Nach dem Speichern: temporäre -> gespeicherte Feature-ID neuer Marker.
+    # Wird gesendet, bevor die temporären Features aus dem Edit-Buffer entfernt werden.
+    fids_remapped = pyqtSignal(dict)
+
+    def __init__(self, store=None, parent=None):
+        super().__init__(parent)
+        self.layer = None
+        # MarkerStore für die Zuordnung unique_id -> Feature-ID (ohne Data-Provider)
+        self.store = store
+        self.queries = MarkerQueries()
+        self.journal = None
+        self._entries = []  # Spiegel des Journals (noch nicht gespeichert)
+        self._unsynced = []  # Einträge, die noch nicht im Journal stehen
+        self._first_pending = None  # Zeitpunkt der ältesten ungespeicherten Änderung
+        self._task = None
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.flush)
+        self._sync_timer = QTimer(self)
+        self._sync_timer.setSingleShot(True)
+        self._sync_timer.timeout.connect(self._sync_journal)
+
+    # --- Layer ---
+
+    def set_layer(self, layer):
+        """Wechselt den Layer; offene Änderungen werden vorher gespeichert.
+
+        Liegt zum neuen Layer noch ein Journal (Absturz vor dem Speichern),
+        werden dessen Einträge sofort in die GeoPackage übernommen.
+        """
+        if layer is self.layer:
+            return
+        self.persist()
+        self.layer = None
+        self.queries.set_layer(None)
+        self.journal = None
+        if layer is None or layer.providerType() != "ogr":
+            return
+        self.layer = layer
+        self.queries.set_layer(layer)
+        self.journal = ChangeJournal(layer.source().split("|")[0])
+        self._replay()
+
+    def _replay(self):
+        entries = self.journal.entries()
+        if not entries:
+            return
+        instrumentation.debug(f"DEBUG: {len(entries)} ungespeicherte Marker-Änderungen aus dem Journal wiederherstellen")
+        if apply_journal(self.layer, entries)[0]:
+            self.journal.clear()
+            self.layer.dataProvider().reloadData()
+        else:
+            instrumentation.debug(f"DEBUG: Journal konnte nicht vollständig angewendet werden: {self.journal.path}")
+
+    def has_pending_changes(self):
+        return bool(self._entries)
+
+    # --- Änderungen (sofort im Edit-Buffer, Journal für die Persistenz) ---
+
+    def _uid(self, fid):
+        if self.store is not None and self.store.layer is self.layer:
+            record = self.store.get(fid)
+            return record.unique_id if record is not None else None
+        feat = self.queries.feature("ids", fid)
+        if not feat.isValid():
+            return None
+        return feat.attribute("unique_id")
+
+    def _record(self, entry):
+        # Einträge eines laufenden Hintergrund-Speicherns dürfen nicht mehr ersetzt werden
+        in_flight = len(self._task.entries) if self._task is not None else 0
+        last = self._entries[-1] if len(self._entries) > in_flight else None
+        if (last is not None and entry["op"] == "attr" and last["op"] == "attr"
+                and last["uid"] == entry["uid"] and last["field"] == entry["field"]):
+            # Fortlaufende Änderung desselben Felds (Schieberegler, Tippen): nur der letzte Wert zählt
+            self._entries[-1] = entry
+            if self._unsynced and self._unsynced[-1] is last:
+                self._unsynced[-1] = entry
+            else:
+                self._unsynced.append(entry)
+        else:
+            self._entries.append(entry)
+            self._unsynced.append(entry)
+        if not self._sync_timer.isActive():
+            self._sync_timer.start(self.JOURNAL_SYNC_MS)
+        now = time.monotonic()
+        if self._first_pending is None:
+            self._first_pending = now
+        # Entprellen, aber nicht länger als MAX_DELAY_MS ungespeichert lassen
+        remaining_ms = self.MAX_DELAY_MS - (now - self._first_pending) * 1000.0
+        self._timer.start(int(max(0, min(self.FLUSH_MS, remaining_ms))))
+        self.layer.triggerRepaint()
+
+    def _sync_journal(self):
+        """Schreibt die gesammelten Einträge mit einem fsync ins Journal."""
+        self._sync_timer.stop()
+        if not self._unsynced or self.journal is None:
+            return
+        entries, self._unsynced = self._unsynced, []
+        self.journal.extend(entries)
+
+    def _ensure_editing(self):
+        if not self.layer.isEditable():
+            self.layer.startEditing()
+
+    def add_feature(self, feat):
+        """Fügt einen Marker hinzu (Geometrie und alle Attribute inkl. unique_id)."""
+        if not self.layer:
+            return False
+        self._ensure_editing()
+        if not self.layer.addFeature(feat):
+            return False
+        point = feat.geometry().asPoint()
+        attrs = {field.name(): _json_value(feat.attribute(field.name())) for field in feat.fields()}
+        attrs.pop("fid", None)
+        self._record({"op": "add", "uid": feat.attribute("unique_id"), "x": point.x(), "y": point.y(), "attrs": attrs})
+        return True
+
+    def change_attribute(self, fid, field_name, value):
+        if not self.layer:
+            return False
+        idx = self.layer.fields().indexFromName(field_name)
+        uid = self._uid(fid)
+        if idx < 0 or not uid:
+            instrumentation.debug(f"DEBUG: Änderung von {field_name} für Feature {fid} nicht möglich")
+            return False
+        self._ensure_editing()
+        if not self.layer.changeAttributeValue(fid, idx, value):
+            return False
+        self._record({"op": "attr", "uid": uid, "field": field_name, "value": _json_value(value)})
+        return True
+
+    def change_geometry(self, fid, point):
+        if not self.layer:
+            return False
+        uid = self._uid(fid)
+        if not uid:
+            return False
+        self._ensure_editing()
+        if not self.layer.changeGeometry(fid, QgsGeometry.fromPointXY(point)):
+            return False
+        self._record({"op": "move", "uid": uid, "x": point.x(), "y": point.y()})
+        return True
+
+    def delete_feature(self, fid):
+        if not self.layer:
+            return False
+        uid = self._uid(fid)
+        if not uid:
+            return False
+        self._ensure_editing()
+        if not self.layer.deleteFeature(fid):
+            return False
+        self._record({"op": "delete", "uid": uid})
+        return True
+
+    def fid_for(self, unique_id):
+        """Aktuelle Feature-ID eines Markers (ändert sich für neue Marker nach dem Speichern)."""
+        if not self.layer or not unique_id:
+            return None
+        if self.store is not None and self.store.layer is self.layer:
+            return self.store.fid_for(unique_id)
+        request = QgsFeatureRequest().setFilterExpression(
+            f"\"unique_id\" = {QgsExpression.quotedString(unique_id)}"
+        ).setFlags(QgsFeatureRequest.NoGeometry).setSubsetOfAttributes([])
+        for feat in self.layer.getFeatures(request):
+            return feat.id()
+        return None
+
+    # --- Speichern ---
+
+    def flush(self):
+        """Startet das Speichern der bisherigen Änderungen im Hintergrund."""
+        self._timer.stop()
+        if not self.layer or not self._entries:
+            return True
+        if self._task is not None:
+            # Läuft bereits - danach erneut versuchen
+            self._timer.start(self.FLUSH_MS)
+            return True
+        task = _FlushTask(self.layer.source(), list(self._entries))
+        task.taskCompleted.connect(lambda: self._on_task_finished(task, True))
+        task.taskTerminated.connect(lambda: self._on_task_finished(task, False))
+        self._task = task
+        QgsApplication.taskManager().addTask(task)
+        return True
+
+    def _on_task_finished(self, task, success):
+        if task is not self._task:
+            # Bereits von persist() übernommen
+            return
+        self._task = None
+        if not success:
+            # Erneutes Anwenden ist idempotent, auch nach teilweisem Schreiben
+            print(f"DEBUG: Hintergrund-Speichern fehlgeschlagen ({task.error}), neuer Versuch folgt")
+            self._timer.start(self.FLUSH_MS)
+            return
+        self._entries = self._entries[len(task.entries):]
+        # Das neue Journal enthält alle übrigen Einträge, auch die noch nicht geschriebenen
+        self._sync_timer.stop()
+        self._unsynced = []
+        self.journal.rewrite(self._entries)
+        self._first_pending = time.monotonic() if self._entries else None
+        self._replace_added(task.added_fids)
+        if self._entries:
+            self._timer.start(self.FLUSH_MS)
+
+    def _replace_added(self, added_fids):
+        """Ersetzt die temporären Features gespeicherter neuer Marker durch die aus der GeoPackage.
+
+        Alle übrigen gespeicherten Änderungen bleiben im Edit-Buffer und
+        entsprechen jetzt dem Stand der GeoPackage; der Aufwand hängt nur von
+        der Anzahl neuer Marker ab, nicht von der Größe des Layers.
+
+        Args:
+            added_fids (dict): unique_id -> Feature-ID in der GeoPackage
+        """
+        layer = self.layer
+        # Neue Zeilen auch für Feature-Anzahl und Ausdehnung des Providers sichtbar machen
+        layer.dataProvider().reloadData()
+        remap = {}
+        replay = set()
+        for uid, fid in added_fids.items():
+            old_fid = self.fid_for(uid)
+            if old_fid == fid:
+                continue
+            # Temporäres Feature noch im Edit-Buffer oder dort schon wieder gelöscht
+            replay.add(uid)
+            if old_fid is not None:
+                remap[old_fid] = fid
+        if remap:
+            # Zuerst umschlüsseln, damit featureDeleted für die temporären IDs nichts mehr entfernt
+            self.fids_remapped.emit(remap)
+            for old_fid in remap:
+                layer.deleteFeature(old_fid)
+        # Noch ungespeicherte Änderungen dieser Marker galten dem temporären Feature
+        for entry in self._entries:
+            if entry["uid"] in replay and entry["op"] != "add":
+                self._apply_to_buffer(entry, added_fids[entry["uid"]])
+        if replay:
+            # Rückgängig machen würde gelöschte temporäre Features zurückholen
+            layer.undoStack().clear()
+        layer.triggerRepaint()
+
+    def _apply_to_buffer(self, entry, fid):
+        layer = self.layer
+        op = entry["op"]
+        if op == "attr":
+            idx = layer.fields().indexFromName(entry["field"])
+            if idx >= 0:
+                layer.changeAttributeValue(fid, idx, entry["value"])
+        elif op == "move":
+            layer.changeGeometry(fid, QgsGeometry.fromPointXY(QgsPointXY(entry["x"], entry["y"])))
+        elif op == "delete":
+            layer.deleteFeature(fid)
+
+    def persist(self):
+        """Speichert alle Änderungen synchron und leert das Journal.
+
+        Ein laufendes Hintergrund-Speichern wird abgewartet; der Rest wird
+        über denselben (idempotenten) Weg direkt in die GeoPackage geschrieben.
+        """
+        self._timer.stop()
+        task = self._task
+        if task is not None:
+            task.waitForFinished()
+            self._on_task_finished(task, task.status() == QgsTask.Complete)
+            self._timer.stop()
+        if not self.layer:
+            return True
+        if self._entries:
+            # Journal vollständig halten, falls das Speichern scheitert
+            self._sync_journal()
+            ok, added_fids = apply_journal(self.layer, self._entries)
+            if not ok:
+                # Journal bleibt erhalten und wird beim nächsten Öffnen angewendet
+                print(f"DEBUG: Marker-Änderungen konnten nicht gespeichert werden: {self.journal.path}")
+                return False
+            self._entries = []
+            self._first_pending = None
+            self.journal.clear()
+            self._replace_added(added_fids)
+        # Alles steht in der GeoPackage: Edit-Buffer verwerfen und Bearbeitungsmodus beenden
+        if self.layer.isEditable():
+            self.layer.rollBack()
+        return True